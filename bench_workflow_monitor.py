@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+工作流监控方式对比：轮询 vs 实时订阅
+在API替身上并发执行等待人工输入的工作流（每轮一个 user_input 节点），由 ExecutionMonitor 自动提交输入，比较：
+- 反应时间：替身记录的从进入 waiting_input 到收到 /continue 的秒数（p50/p95/p99）；
+- 完成耗时：从发起执行到客户端得知结束；
+- 请求数：替身按接口统计的HTTP请求（不含创建 / 发布），以及每个执行平均请求数；
+- 实时模式收到的Socket.IO报文数。
+
+polling 与 test_loop_workflow.py 的 monitor_execution 相同（每 --poll-interval 秒查询一次）；
+realtime 在一个连接上订阅全部执行，轮询只作为 --fallback-interval 秒一次的兜底。
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, Any, List
+
+from workflow_load import WorkflowClient, _percentiles, input_workflow
+from workflow_realtime import ExecutionMonitor, RealtimeConnection
+from workflow_stub_server import WorkflowStubServer
+
+async def run_mode(mode: str, args) -> Dict[str, Any]:
+    """启动一个新的替身，按指定方式监控 --executions 个并发执行"""
+    server = WorkflowStubServer(args.node_latency)
+    await server.start()
+    client = WorkflowClient(server.base_url, connections=args.connections)
+    connection = None
+    try:
+        workflow_id = await client.prepare(input_workflow(args.rounds))
+        setup_requests = dict(server.request_counts)
+        if mode == 'realtime':
+            connection = RealtimeConnection(server.server_url, session=client.session)
+            await connection.connect()
+        monitor = ExecutionMonitor(client, connection, on_input=lambda execution_id, event: {'userInput': 'continue'},
+                                   poll_interval=args.poll_interval, fallback_interval=args.fallback_interval)
+
+        async def one() -> Dict[str, Any]:
+            start = time.perf_counter()
+            execution = await client.request('POST', f'/workflows/{workflow_id}/execute',
+                                             {'input': {}, 'triggerType': 'manual'})
+            result = await asyncio.wait_for(monitor.watch(execution['id']), args.timeout)
+            result['seconds'] = time.perf_counter() - start
+            return result
+
+        start = time.perf_counter()
+        runs: List[Dict[str, Any]] = await asyncio.gather(*(one() for _ in range(args.executions)))
+        elapsed = time.perf_counter() - start
+        await monitor.close()
+    finally:
+        if connection is not None:
+            await connection.close()
+        await client.close()
+        await server.stop()
+
+    requests = {route: count - setup_requests.get(route, 0) for route, count in server.request_counts.items()
+                if count > setup_requests.get(route, 0)}
+    total = sum(requests.values())
+    report = {
+        'elapsed_s': round(elapsed, 2),
+        'completed': sum(1 for run in runs if run['status'] == 'completed'),
+        'reaction': _percentiles(server.input_reactions),
+        'time_to_completion': _percentiles([run['seconds'] for run in runs]),
+        'http_requests': total,
+        'http_requests_by_route': requests,
+        'requests_per_execution': round(total / len(runs), 2),
+        'inputs_submitted': sum(run['inputs'] for run in runs),
+        'rejected_inputs': sum(run['rejected_inputs'] for run in runs),
+        'mean_polls': round(sum(run['polls'] for run in runs) / len(runs), 2)
+    }
+    if connection is not None:
+        report['socket_messages'] = {'received': connection.messages_received, 'sent': connection.messages_sent}
+    return report
+
+async def run(args) -> Dict[str, Any]:
+    results = {}
+    for mode in args.modes.split(','):
+        results[mode] = await run_mode(mode, args)
+    polling, realtime = results.get('polling'), results.get('realtime')
+    if polling and realtime:
+        results['speedup'] = {
+            'reaction_p50': round(polling['reaction']['p50_ms'] / max(realtime['reaction']['p50_ms'], 0.1), 1),
+            'requests': round(polling['http_requests'] / max(realtime['http_requests'], 1), 1)
+        }
+    return results
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Compare polling and realtime execution monitoring')
+    parser.add_argument('--executions', type=int, default=100, help='Concurrent executions per mode')
+    parser.add_argument('--rounds', type=int, default=3, help='user_input waits per execution')
+    parser.add_argument('--modes', default='polling,realtime', help='Comma-separated modes (polling, realtime)')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Polling interval in seconds')
+    parser.add_argument('--fallback-interval', type=float, default=10.0,
+                        help='Fallback polling interval while the realtime connection is up')
+    parser.add_argument('--node-latency', type=float, default=0.005, help='Stand-in per-node latency in seconds')
+    parser.add_argument('--connections', type=int, default=100, help='HTTP connection pool size')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Per-execution timeout in seconds')
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+多账户模拟交易
+所有账户的USD/BTC余额保存在两个 array('d') 中，按账户序号索引；账户ID（工作流用户ID等）映射到序号。
+余额变动在分段锁（按序号取模）内完成，不同分段的账户可以并行下单，同一账户的并发订单不会透支。
+方法都是同步的且锁内不await，线程和asyncio（直接调用或 asyncio.to_thread）都可以安全使用。
+校验规则和手续费与 BTCTradingService 相同。
+"""
+
+import math
+import threading
+import uuid
+from array import array
+from datetime import datetime
+from typing import Dict, Any, Callable, Hashable, Optional
+
+class AccountBook:
+    """数组存储的多账户余额"""
+
+    def __init__(self, initial_usd: float = 10000.0, initial_btc: float = 0.0, trading_fee: float = 0.001,
+                 stripes: int = 1024, capacity: int = 1024,
+                 on_commit: Optional[Callable[[int, str, float, float], None]] = None):
+        self.initial_usd = initial_usd
+        self.initial_btc = initial_btc
+        self.trading_fee = trading_fee
+        self.usd = array('d', [initial_usd]) * capacity
+        self.btc = array('d', [initial_btc]) * capacity
+        self._ids: Dict[Hashable, int] = {}
+        self._registry_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        # 在账户锁内、余额变更后调用 (序号, 方向, USD变动, BTC变动)，用于持久化或对接外部系统
+        self.on_commit = on_commit
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def index(self, account: Hashable) -> int:
+        """账户ID对应的序号，首次出现时开户（初始余额同 BTCTradingService）"""
+        i = self._ids.get(account)
+        if i is not None:
+            return i
+        with self._registry_lock:
+            i = self._ids.get(account)
+            if i is None:
+                i = len(self._ids)
+                if i >= len(self.usd):
+                    grow = len(self.usd)
+                    self.usd.extend(array('d', [self.initial_usd]) * grow)
+                    self.btc.extend(array('d', [self.initial_btc]) * grow)
+                self._ids[account] = i
+            return i
+
+    def lock_for(self, i: int) -> threading.Lock:
+        return self._locks[i % len(self._locks)]
+
+    def get_balance(self, account: Hashable) -> Dict[str, Any]:
+        i = self.index(account)
+        with self.lock_for(i):
+            balance = {'usd': self.usd[i], 'btc': self.btc[i]}
+        return {
+            'success': True,
+            'account': account,
+            'balance': balance,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def buy(self, account: Hashable, amount_usd: float, btc_price: float) -> Dict[str, Any]:
+        """买入：校验与扣款在账户锁内原子完成"""
+        if not math.isfinite(amount_usd) or amount_usd <= 0:
+            return {'success': False, 'error': 'Invalid amount'}
+        if not math.isfinite(btc_price) or btc_price <= 0:
+            return {'success': False, 'error': 'Invalid BTC price'}
+        total_cost = amount_usd * (1 + self.trading_fee)
+        btc_amount = amount_usd / btc_price
+        i = self.index(account)
+        with self.lock_for(i):
+            available = self.usd[i]
+            if total_cost > available:
+                return {
+                    'success': False,
+                    'error': f'Insufficient USD balance. Required: ${total_cost:.2f}, Available: ${available:.2f}'
+                }
+            self.usd[i] = available - total_cost
+            self.btc[i] += btc_amount
+            if self.on_commit:
+                self.on_commit(i, 'buy', -total_cost, btc_amount)
+            balance = {'usd': self.usd[i], 'btc': self.btc[i]}
+        return {
+            'success': True,
+            'order_id': str(uuid.uuid4()),
+            'account': account,
+            'action': 'buy',
+            'btc_amount': round(btc_amount, 8),
+            'usd_amount': amount_usd,
+            'btc_price': btc_price,
+            'fee': round(amount_usd * self.trading_fee, 2),
+            'total_cost': round(total_cost, 2),
+            'status': 'filled',
+            'new_balance': balance
+        }
+
+    def sell(self, account: Hashable, btc_amount: float, btc_price: float) -> Dict[str, Any]:
+        """卖出：校验与扣减在账户锁内原子完成"""
+        if not math.isfinite(btc_amount) or btc_amount <= 0:
+            return {'success': False, 'error': 'Invalid BTC amount'}
+        if not math.isfinite(btc_price) or btc_price <= 0:
+            return {'success': False, 'error': 'Invalid BTC price'}
+        usd_amount = btc_amount * btc_price
+        fee = usd_amount * self.trading_fee
+        net_usd = usd_amount - fee
+        i = self.index(account)
+        with self.lock_for(i):
+            available = self.btc[i]
+            if btc_amount > available:
+                return {
+                    'success': False,
+                    'error': f'Insufficient BTC balance. Required: {btc_amount:.8f}, Available: {available:.8f}'
+                }
+            self.btc[i] = available - btc_amount
+            self.usd[i] += net_usd
+            if self.on_commit:
+                self.on_commit(i, 'sell', net_usd, -btc_amount)
+            balance = {'usd': self.usd[i], 'btc': self.btc[i]}
+        return {
+            'success': True,
+            'order_id': str(uuid.uuid4()),
+            'account': account,
+            'action': 'sell',
+            'btc_amount': round(btc_amount, 8),
+            'usd_amount': round(usd_amount, 2),
+            'net_usd': round(net_usd, 2),
+            'btc_price': btc_price,
+            'fee': round(fee, 2),
+            'status': 'filled',
+            'new_balance': balance
+        }
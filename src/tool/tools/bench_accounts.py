@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+多账户引擎基准测试
+1. 并发正确性：多个线程 / asyncio任务同时向同一账户下单，确认不会透支、余额守恒；
+2. 锁竞争：10万个账户随机下单，对比全局锁（1个分段）与分段锁在不同线程数下的吞吐。
+   默认测量服务实际使用的纯内存路径（不设置 on_commit）；--io-ms 大于0时在锁内加一次模拟的持久化I/O
+   （sleep，服务本身没有这一步），结果单独报告为 simulated_io
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+from account_engine import AccountBook
+from tool_loader import load_tool
+
+trading_tool = load_tool('btc-trading-tool.py')
+
+def hammer(buy, threads: int, orders_per_thread: int) -> int:
+    """多个线程同时对同一账户买入，返回成交笔数"""
+    filled = [0] * threads
+    barrier = threading.Barrier(threads)
+
+    def worker(n: int):
+        barrier.wait()
+        for _ in range(orders_per_thread):
+            filled[n] += buy()['success']
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return sum(filled)
+
+def correctness() -> dict:
+    amount, price = 100.0, 100000.0
+    expected = int(10000.0 // (amount * 1.001))
+
+    book = AccountBook()
+    threaded = hammer(lambda: book.buy('user-1', amount, price), 16, 50)
+    threaded_usd = book.usd[book.index('user-1')]
+
+    service = trading_tool.BTCTradingService()
+    service_filled = hammer(lambda: service.execute_buy_order(amount, price), 16, 50)
+
+    async def async_orders():
+        async_book = AccountBook()
+        results = await asyncio.gather(*(asyncio.to_thread(async_book.buy, 'user-1', amount, price)
+                                         for _ in range(400)))
+        return sum(r['success'] for r in results), async_book.usd[async_book.index('user-1')]
+    async_filled, async_usd = asyncio.run(async_orders())
+
+    return {
+        'expected_fills': expected,
+        'account_book_threads': threaded,
+        'account_book_asyncio': async_filled,
+        'trading_service_threads': service_filled,
+        'no_overdraft': min(threaded_usd, async_usd, service.balance['usd']) >= 0
+    }
+
+def contention(accounts: int, stripes: int, threads: int, io_ms: float, duration: float) -> float:
+    on_commit = (lambda *_: time.sleep(io_ms / 1000)) if io_ms > 0 else None
+    book = AccountBook(stripes=stripes, capacity=accounts, on_commit=on_commit)
+    for n in range(accounts):
+        book.index(n)
+    counts = [0] * threads
+    stop = time.perf_counter() + duration
+
+    def worker(n: int):
+        rng = random.Random(n)
+        while time.perf_counter() < stop:
+            account = rng.randrange(accounts)
+            book.buy(account, 10.0, 100000.0)
+            counts[n] += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+def contention_table(accounts: int, io_ms: float, duration: float) -> dict:
+    table = {}
+    for threads in (1, 2, 4, 8, 16):
+        table[threads] = {
+            'global_lock': round(contention(accounts, 1, threads, io_ms, duration)),
+            'striped_1024': round(contention(accounts, 1024, threads, io_ms, duration))
+        }
+    return table
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Multi-account engine benchmark')
+    parser.add_argument('--accounts', type=int, default=100000, help='Number of accounts')
+    parser.add_argument('--io-ms', type=float, default=0.0,
+                        help='Also report a run with simulated I/O inside the account lock (ms); 0 disables it')
+    parser.add_argument('--duration', type=float, default=2.0, help='Seconds per contention run')
+    args = parser.parse_args()
+
+    book = AccountBook(capacity=args.accounts)
+    start = time.perf_counter()
+    for n in range(args.accounts):
+        book.index(f'user-{n}')
+    open_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for n in range(args.accounts):
+        book.buy(f'user-{n}', 10.0, 100000.0)
+    order_elapsed = time.perf_counter() - start
+
+    result = {
+        'accounts': args.accounts,
+        'open_accounts_per_s': round(args.accounts / open_elapsed),
+        'single_thread_orders_per_s': round(args.accounts / order_elapsed),
+        'balance_array_bytes_per_account': (book.usd.itemsize + book.btc.itemsize),
+        'correctness': correctness(),
+        'contention_orders_per_s': contention_table(args.accounts, 0.0, args.duration)
+    }
+    if args.io_ms > 0:
+        result['simulated_io'] = {'io_ms': args.io_ms,
+                                  'contention_orders_per_s': contention_table(args.accounts, args.io_ms, args.duration)}
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
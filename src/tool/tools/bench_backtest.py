@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+回测基准测试
+生成一年的秒级tick（几何随机游走）写入二进制tick文件，统计向量化回测的耗时；
+另取一段数据逐个信号调用 BTCTradingService，确认成交次数和最终余额与向量化回测一致
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from btc_backtest import run_backtest
+from tick_files import read_ticks, write_ticks
+from tool_loader import load_tool
+
+trading_tool = load_tool('btc-trading-tool.py')
+
+def synthetic_ticks(seconds: int, seed: int = 7, annual_vol: float = 0.6):
+    rng = np.random.default_rng(seed)
+    step_vol = annual_vol / np.sqrt(365 * 24 * 3600)
+    prices = 100000.0 * np.exp(np.cumsum(rng.normal(0, step_vol, seconds)))
+    timestamps = 1700000000.0 + np.arange(seconds, dtype=np.float64)
+    return timestamps, prices
+
+def reference_replay(timestamps, prices, buy: float, sell: float, amount: float) -> dict:
+    """逐个信号调用交易服务的参考实现"""
+    service = trading_tool.BTCTradingService()
+    trades = 0
+    for price in prices.tolist():
+        if price <= buy:
+            trades += service.execute_buy_order(amount * price, price)['success']
+        elif price >= sell:
+            trades += service.execute_sell_order(amount, price)['success']
+    return {'trades': trades, 'usd': service.balance['usd'], 'btc': service.balance['btc']}
+
+def verify(seconds: int) -> dict:
+    timestamps, prices = synthetic_ticks(seconds, seed=11, annual_vol=2.0)
+    buy, sell = np.percentile(prices, 30), np.percentile(prices, 70)
+    amount = 0.02
+    start = time.perf_counter()
+    reference = reference_replay(timestamps, prices, buy, sell, amount)
+    reference_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = run_backtest(timestamps, prices, buy, sell, amount)
+    vectorized_elapsed = time.perf_counter() - start
+    trades = result['trades']
+    usd = trades['usd_balance'][-1] if len(trades) else 10000.0
+    btc = trades['btc_balance'][-1] if len(trades) else 0.0
+    return {
+        'ticks': seconds,
+        'trades': int(len(trades)),
+        'rejected': result['summary']['rejected'],
+        'reference_trades': reference['trades'],
+        'usd_diff': abs(usd - reference['usd']),
+        'btc_diff': abs(btc - reference['btc']),
+        'reference_s': round(reference_elapsed, 3),
+        'vectorized_s': round(vectorized_elapsed, 3)
+    }
+
+def replay_year(days: int, interval: float) -> dict:
+    timestamps, prices = synthetic_ticks(days * 24 * 3600)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ticks.bin')
+        write_ticks(path, timestamps, prices)
+        del timestamps, prices
+
+        start = time.perf_counter()
+        ticks = read_ticks(path)
+        result = run_backtest(ticks['timestamp'], ticks['price'], 95000, 105000, 0.01, interval)
+        elapsed = time.perf_counter() - start
+        return {
+            'ticks': len(ticks),
+            'interval_s': interval,
+            'file_mb': round(os.path.getsize(path) / 1024 / 1024, 1),
+            'replay_s': round(elapsed, 2),
+            'ticks_per_s': round(len(ticks) / elapsed),
+            'summary': result['summary']
+        }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Backtest benchmark')
+    parser.add_argument('--days', type=int, default=365, help='Days of 1-second ticks to replay')
+    parser.add_argument('--verify-ticks', type=int, default=200000, help='Ticks replayed through BTCTradingService')
+    args = parser.parse_args()
+
+    result = {
+        'verification': verify(args.verify_ticks),
+        'every_tick': replay_year(args.days, 0),
+        'template_5min': replay_year(args.days, 300)
+    }
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
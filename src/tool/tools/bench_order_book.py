@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+限价单簿基准测试
+在交易服务中挂入数万笔限价单，用随机游走的价格tick（带成交量，产生部分成交）驱动撮合，
+统计下单、每个tick、每笔成交和撤单的耗时；并与每个tick线性扫描全部挂单的实现对比结果和耗时，
+最后撤销剩余挂单，确认冻结资金全部释放、余额与逐笔成交累计一致
+"""
+
+import argparse
+import json
+import random
+import time
+
+from order_book import LimitOrderBook, RestingOrder
+from tool_loader import load_tool
+
+trading_tool = load_tool('btc-trading-tool.py')
+
+def make_orders(count: int, price: float, seed: int) -> list:
+    """买单限价在当前价下方、卖单在上方（±5%，$1一档），数量 0.001-0.05 BTC"""
+    rng = random.Random(seed)
+    orders = []
+    for i in range(count):
+        action = 'buy' if i % 2 == 0 else 'sell'
+        offset = rng.uniform(0.001, 0.05) * price
+        limit = float(round(price - offset if action == 'buy' else price + offset))
+        orders.append((action, limit, round(rng.uniform(0.001, 0.05), 6)))
+    return orders
+
+def make_ticks(count: int, price: float, seed: int) -> list:
+    rng = random.Random(seed + 1)
+    ticks = []
+    for _ in range(count):
+        price = max(1.0, price + rng.gauss(0, price * 0.0005))
+        ticks.append((price, rng.expovariate(1 / 0.05)))
+    return ticks
+
+def linear_match(resting: list, price: float, volume: float) -> list:
+    """对照实现：每个tick扫描全部挂单，按价格优先、时间优先成交"""
+    crossed = [o for o in resting if (price <= o[1] if o[0] == 'buy' else price >= o[1])]
+    crossed.sort(key=lambda o: (o[0] != 'buy', -o[1] if o[0] == 'buy' else o[1], o[3]))
+    fills = []
+    for o in crossed:
+        if volume <= 0:
+            break
+        quantity = min(o[2], volume)
+        o[2] -= quantity
+        volume -= quantity
+        fills.append((o[3], quantity))
+    resting[:] = [o for o in resting if o[2] > 1e-12]
+    return fills
+
+def compare_linear(orders: list, ticks: list) -> dict:
+    book = LimitOrderBook()
+    resting = []
+    for n, (action, limit, quantity) in enumerate(orders):
+        book.add(RestingOrder(str(n), action, limit, quantity, 0.0))
+        resting.append([action, limit, quantity, n])
+    matched = True
+    book_elapsed = linear_elapsed = 0.0
+    for price, volume in ticks:
+        start = time.perf_counter()
+        fills = [(int(order.order_id), quantity) for order, quantity in book.match(price, volume)]
+        book_elapsed += time.perf_counter() - start
+        start = time.perf_counter()
+        expected = linear_match(resting, price, volume)
+        linear_elapsed += time.perf_counter() - start
+        matched = matched and fills == expected
+    return {
+        'ticks': len(ticks),
+        'fills_match': matched,
+        'book_tick_us': round(book_elapsed / len(ticks) * 1e6, 2),
+        'linear_scan_tick_us': round(linear_elapsed / len(ticks) * 1e6, 2),
+        'speedup': round(linear_elapsed / book_elapsed, 1)
+    }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Limit order book benchmark')
+    parser.add_argument('--orders', type=int, default=50000, help='Resting limit orders')
+    parser.add_argument('--ticks', type=int, default=100000, help='Price ticks to replay')
+    parser.add_argument('--compare-ticks', type=int, default=300, help='Ticks for the linear-scan comparison')
+    parser.add_argument('--seed', type=int, default=7, help='Random seed')
+    args = parser.parse_args()
+
+    price = 100000.0
+    orders = make_orders(args.orders, price, args.seed)
+    ticks = make_ticks(args.ticks, price, args.seed)
+
+    service = trading_tool.BTCTradingService()
+    service.balance = {'usd': 1e9, 'btc': 1e4}
+    initial = dict(service.balance)
+    start = time.perf_counter()
+    ids = []
+    for action, limit, quantity in orders:
+        if action == 'buy':
+            placed = service.execute_buy_order(quantity * limit, limit, 'limit')
+        else:
+            placed = service.execute_sell_order(quantity, limit, 'limit')
+        ids.append(placed['order_id'])
+    place_elapsed = time.perf_counter() - start
+
+    fills = partial = 0
+    start = time.perf_counter()
+    for tick_price, volume in ticks:
+        for fill in service.on_price_tick(tick_price, volume)['fills']:
+            fills += 1
+            partial += fill['status'] == 'partially_filled'
+    tick_elapsed = time.perf_counter() - start
+
+    remaining = list(service.order_book.orders)
+    filled_btc = dict(zip(ids, (quantity for _, _, quantity in orders)))
+    start = time.perf_counter()
+    for order_id in remaining:
+        filled_btc[order_id] = service.cancel_order(order_id)['filled_btc']
+    cancel_elapsed = time.perf_counter() - start
+
+    # 按每笔订单的成交数量独立计算余额变动，与服务的余额对比
+    usd, btc = initial['usd'], initial['btc']
+    for order_id, (action, limit, _) in zip(ids, orders):
+        filled = filled_btc[order_id]
+        if action == 'buy':
+            usd -= filled * limit * (1 + service.trading_fee)
+            btc += filled
+        else:
+            usd += filled * limit * (1 - service.trading_fee)
+            btc -= filled
+    result = {
+        'resting_orders': args.orders,
+        'ticks': args.ticks,
+        'place_us': round(place_elapsed / args.orders * 1e6, 2),
+        'tick_us': round(tick_elapsed / args.ticks * 1e6, 2),
+        'fills': fills,
+        'partial_fills': partial,
+        'match_us': round(tick_elapsed / max(fills, 1) * 1e6, 2),
+        'cancelled': len(remaining),
+        'cancel_us': round(cancel_elapsed / max(len(remaining), 1) * 1e6, 2),
+        'locked_released': service.locked == {'usd': 0.0, 'btc': 0.0},
+        'balance_consistent': abs(service.balance['usd'] - usd) < 0.01 and abs(service.balance['btc'] - btc) < 1e-6,
+        'linear_scan': compare_linear(orders, ticks[:args.compare_ticks])
+    }
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+订单账本基准测试
+通过交易服务写入大量订单后，统计单笔下单耗时、最近订单查询、时间范围查询、
+按订单ID查找的耗时，以及重启恢复（从快照重放尾部）与从头重放全部记录的耗时对比
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+
+from order_ledger import OrderLedger
+from tool_loader import load_tool
+
+trading_tool = load_tool('btc-trading-tool.py')
+
+def timed(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Order ledger benchmark')
+    parser.add_argument('--orders', type=int, default=1000000, help='Orders to write')
+    parser.add_argument('--snapshot-every', type=int, default=1000, help='Records between balance snapshots')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as ledger_dir:
+        service = trading_tool.BTCTradingService(OrderLedger(ledger_dir, args.snapshot_every))
+        sample_ids = []
+        start = time.perf_counter()
+        for i in range(args.orders // 2):
+            price = 100000 + (i % 1000)
+            bought = service.execute_buy_order(1.0, price)
+            service.execute_sell_order(service.balance['btc'], price)
+            if i % 1000 == 0:
+                sample_ids.append(bought['order_id'])
+        append_elapsed = time.perf_counter() - start
+        ledger = service.ledger
+        span_start = ledger._read(1)[1]
+        span_end = ledger._read(ledger.count - 1)[1]
+
+        def range_query(limit: int):
+            t = random.uniform(span_start, span_end)
+            ledger.history(limit, t, t + 1.0)
+
+        result = {
+            'orders': args.orders,
+            'records': ledger.count,
+            'file_mb': round(len(ledger._mm) / 1024 / 1024, 1),
+            'order_us': round(append_elapsed / args.orders * 1e6, 2),
+            'history_limit_10_us': round(timed(lambda: service.get_order_history(10), 2000), 2),
+            'range_query_limit_10_us': round(timed(lambda: range_query(10), 2000), 2),
+            'range_query_limit_100_us': round(timed(lambda: range_query(100), 2000), 2),
+            'lookup_by_id_us': round(timed(lambda: ledger.get_order(random.choice(sample_ids)), 2000), 2)
+        }
+        balance = dict(service.balance)
+        ledger.close()
+
+        start = time.perf_counter()
+        restarted = trading_tool.BTCTradingService(OrderLedger(ledger_dir, args.snapshot_every))
+        result['restart_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        result['restart_replayed_records'] = restarted.ledger.replayed
+        result['restart_balance_matches'] = restarted.balance == balance
+
+        full = {'usd': 0.0, 'btc': 0.0}
+        restarted.ledger.balance, restarted.ledger._seen = full, 0
+        start = time.perf_counter()
+        restarted.ledger._apply(restarted.ledger.count)
+        result['full_replay_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        restarted.ledger.close()
+
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+聚合价格基准测试
+对比逐个数据源顺序请求与并发请求的聚合延迟（使用本地模拟交易所，无需网络）
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from stub_exchanges import StubExchangeServer
+from tool_loader import load_tool
+
+price_tool = load_tool('btc-price-tool.py')
+
+def run_sequential(service, rounds: int) -> list:
+    """逐个数据源顺序请求（原有实现的行为）"""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        price_tool.aggregate_prices(
+            service.get_price_from_coingecko(),
+            service.get_price_from_binance(),
+            service.get_price_from_coinbase()
+        )
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def run_concurrent(service, rounds: int) -> list:
+    """并发请求所有数据源"""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        service.get_aggregated_price()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def summarize(samples: list) -> dict:
+    return {
+        'rounds': len(samples),
+        'mean_ms': round(statistics.mean(samples) * 1000, 2),
+        'max_ms': round(max(samples) * 1000, 2)
+    }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Aggregated price benchmark')
+    parser.add_argument('--rounds', type=int, default=5, help='Rounds per mode')
+    parser.add_argument('--coingecko-latency', type=float, default=0.3, help='Stub CoinGecko latency (seconds)')
+    parser.add_argument('--binance-latency', type=float, default=0.2, help='Stub Binance latency (seconds)')
+    parser.add_argument('--coinbase-latency', type=float, default=0.4, help='Stub Coinbase latency (seconds)')
+    args = parser.parse_args()
+
+    latency = {
+        'coingecko': args.coingecko_latency,
+        'binance': args.binance_latency,
+        'coinbase': args.coinbase_latency
+    }
+    with StubExchangeServer(latency=latency) as server:
+        service = price_tool.BTCPriceService(endpoints=server.endpoints)
+        sequential = summarize(run_sequential(service, args.rounds))
+        concurrent = summarize(run_concurrent(service, args.rounds))
+        service.close()
+
+    result = {
+        'stub_latency_s': latency,
+        'sequential': sequential,
+        'concurrent': concurrent,
+        'speedup': round(sequential['mean_ms'] / concurrent['mean_ms'], 2)
+    }
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
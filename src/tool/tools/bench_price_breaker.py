@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+熔断与自适应超时基准测试
+模拟交易所故障（Coinbase无响应），对比固定超时与“自适应超时 + 熔断”两种模式
+在正常、故障、恢复三个阶段的聚合延迟分布
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from stub_exchanges import StubExchangeServer
+from tool_loader import load_tool
+
+price_tool = load_tool('btc-price-tool.py')
+
+def _percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+    return {
+        'p50_ms': round(pick(50) * 1000, 1),
+        'p99_ms': round(pick(99) * 1000, 1),
+        'mean_ms': round(statistics.mean(samples) * 1000, 1)
+    }
+
+async def run_mode(server: StubExchangeServer, adaptive: bool, timeout: float, rounds: int) -> dict:
+    service = price_tool.AsyncBTCPriceService(
+        server.endpoints, timeout=timeout, adaptive=adaptive,
+        health_options={'open_seconds': 1.0}
+    )
+    phases = {}
+
+    async def phase(name: str, pause: float = 0.0):
+        samples = []
+        sources = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = await service.get_aggregated_price()
+            samples.append(time.perf_counter() - start)
+            sources.append(result.get('price_sources', 0))
+            if pause:
+                await asyncio.sleep(pause)
+        phases[name] = {**_percentiles(samples), 'mean_sources': round(statistics.mean(sources), 2)}
+
+    server.faults.clear()
+    await phase('healthy')
+    server.faults['coinbase'] = {'hang_rate': 1.0, 'hang_seconds': 60}
+    await phase('incident')
+    server.faults.clear()
+    await phase('recovery', pause=0.1)
+
+    phases['source_health'] = {name: report['state'] for name, report in service.health_report().items()}
+    await service.close()
+    return phases
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Circuit breaker benchmark')
+    parser.add_argument('--rounds', type=int, default=30, help='Aggregates per phase')
+    parser.add_argument('--timeout', type=float, default=2.0, help='Fixed timeout / adaptive timeout ceiling (seconds)')
+    args = parser.parse_args()
+
+    latency = {name: (lambda: max(0.005, random.gauss(0.05, 0.01))) for name in ('coingecko', 'binance', 'coinbase')}
+    with StubExchangeServer(latency=latency) as server:
+        result = {
+            'fixed_timeout': asyncio.run(run_mode(server, False, args.timeout, args.rounds)),
+            'adaptive_breaker': asyncio.run(run_mode(server, True, args.timeout, args.rounds))
+        }
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+行情缓存基准测试
+统计N个并发调用方（同进程协程 + 多个独立进程）在一个TTL周期内触发的上游请求轮数
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import tempfile
+import time
+
+from price_cache import PriceCache
+from stub_exchanges import StubExchangeServer
+from tool_loader import load_tool
+
+price_tool = load_tool('btc-price-tool.py')
+
+def _process_caller(endpoints, cache_dir: str, ttl: float, callers: int):
+    """子进程：模拟一个独立CLI进程内的多个调用方"""
+    async def _run():
+        cache = PriceCache(ttl=ttl, cache_dir=cache_dir)
+        service = price_tool.AsyncBTCPriceService(endpoints, cache=cache)
+        await asyncio.gather(*(service.get_aggregated_price() for _ in range(callers)))
+        await service.close()
+    asyncio.run(_run())
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Price cache benchmark')
+    parser.add_argument('--processes', type=int, default=8, help='Concurrent caller processes')
+    parser.add_argument('--callers', type=int, default=25, help='Concurrent callers per process')
+    parser.add_argument('--ttl', type=float, default=5.0, help='Cache TTL (seconds)')
+    parser.add_argument('--latency', type=float, default=0.2, help='Stub latency per source (seconds)')
+    args = parser.parse_args()
+
+    latency = {name: args.latency for name in ('coingecko', 'binance', 'coinbase')}
+    with StubExchangeServer(latency=latency) as server, tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        workers = [
+            multiprocessing.Process(target=_process_caller,
+                                    args=(server.endpoints, cache_dir, args.ttl, args.callers))
+            for _ in range(args.processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        upstream_requests = dict(server.request_counts)
+
+    total_callers = args.processes * args.callers
+    result = {
+        'callers': total_callers,
+        'processes': args.processes,
+        'elapsed_s': round(elapsed, 3),
+        'upstream_requests': upstream_requests,
+        'upstream_rounds': max(upstream_requests.values()),
+        'uncached_rounds': total_callers
+    }
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+本地深度簿基准测试
+1. 增量应用吞吐：加载快照后应用大量随机增量（含与不含JSON解析），并与生成方的深度簿逐档比对；
+2. 成交均价查询：不同成交量下的耗时和吃到的档位数；
+3. 实时同步：订阅本地模拟交易所的深度推送（随机丢弃部分增量制造缺口），统计重同步次数并比对最终深度簿；
+4. 交易服务按深度成交的滑点
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from price_depth import DepthBook, DepthFeed
+from stub_exchanges import StubExchangeServer
+from tool_loader import load_tool
+
+trading_tool = load_tool('btc-trading-tool.py')
+
+def snapshot_of(server: StubExchangeServer) -> dict:
+    return {
+        'lastUpdateId': server.depth_update_id,
+        'bids': [[f'{p:.2f}', f'{q:.8f}'] for p, q in sorted(server.depth_book['bids'].items(), reverse=True)],
+        'asks': [[f'{p:.2f}', f'{q:.8f}'] for p, q in sorted(server.depth_book['asks'].items())]
+    }
+
+def matches(book: DepthBook, server: StubExchangeServer) -> bool:
+    return book.bids.quantities == server.depth_book['bids'] and book.asks.quantities == server.depth_book['asks'] \
+        and book.bids.prices == sorted(server.depth_book['bids']) and book.asks.prices == sorted(server.depth_book['asks'])
+
+def apply_throughput(levels: int, diffs: int) -> dict:
+    server = StubExchangeServer(depth_levels=levels)
+    book = DepthBook()
+    snapshot = snapshot_of(server)
+    start = time.perf_counter()
+    book.load_snapshot(snapshot)
+    snapshot_ms = (time.perf_counter() - start) * 1000
+    messages = [json.dumps(server._depth_diff()) for _ in range(diffs)]
+    events = [json.loads(message) for message in messages]
+    level_changes = sum(len(event['b']) + len(event['a']) for event in events)
+
+    start = time.perf_counter()
+    for event in events:
+        book.apply_diff(event)
+    apply_elapsed = time.perf_counter() - start
+
+    parsed = DepthBook()
+    parsed.load_snapshot(snapshot)
+    start = time.perf_counter()
+    for message in messages:
+        parsed.apply_diff(json.loads(message))
+    parse_elapsed = time.perf_counter() - start
+
+    return {
+        'levels_per_side': levels,
+        'diffs': diffs,
+        'snapshot_load_ms': round(snapshot_ms, 2),
+        'diffs_per_s': round(diffs / apply_elapsed),
+        'level_updates_per_s': round(level_changes / apply_elapsed),
+        'diffs_per_s_with_json': round(diffs / parse_elapsed),
+        'book_matches_source': matches(book, server)
+    }, book
+
+def fill_queries(book: DepthBook) -> dict:
+    result = {}
+    for btc_amount in (0.1, 1.0, 10.0, 100.0):
+        rounds = 2000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fill = book.fill('buy', btc_amount)
+        result[f'{btc_amount:g}_btc'] = {
+            'us': round((time.perf_counter() - start) / rounds * 1e6, 2),
+            'levels': fill['levels'],
+            'vwap': round(fill['vwap'], 2),
+            'slippage_bps': round(fill['slippage_bps'], 3)
+        }
+    return result
+
+async def live_sync(rate: float, skip_rate: float, duration: float) -> dict:
+    with StubExchangeServer(depth_rate=rate, depth_skip_rate=skip_rate) as server:
+        feed = DepthFeed(snapshot_url=server.depth_endpoints['snapshot'], stream_url=server.depth_endpoints['stream'])
+        await feed.start()
+        synced = await feed.wait_synced()
+        await asyncio.sleep(duration)
+        server.depth_paused = True
+        await asyncio.sleep(0.5)
+        deadline = time.monotonic() + 10
+        while feed.book.last_update_id != server.depth_update_id and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        stats = feed.stats()
+        stats['book_matches_source'] = synced and matches(feed.book, server)
+        stats['source_messages'] = server.depth_messages
+        await feed.stop()
+    return stats
+
+def slippage(book: DepthBook, price: float) -> dict:
+    result = {}
+    for amount in (1000.0, 50000.0, 500000.0):
+        service = trading_tool.BTCTradingService(depth=book)
+        service.balance['usd'] = 1e7
+        filled = service.execute_buy_order(amount, price)
+        flat = trading_tool.BTCTradingService()
+        flat.balance['usd'] = 1e7
+        result[f'buy_{amount:g}_usd'] = {
+            'btc_flat_price': flat.execute_buy_order(amount, price)['btc_amount'],
+            'btc_depth': filled['btc_amount'],
+            'vwap': round(filled['btc_price'], 2),
+            **filled['depth']
+        }
+    return result
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Local order book depth benchmark')
+    parser.add_argument('--levels', type=int, default=5000, help='Price levels per side')
+    parser.add_argument('--diffs', type=int, default=200000, help='Depth diffs to apply')
+    parser.add_argument('--rate', type=float, default=5000.0, help='Live depth diffs per second')
+    parser.add_argument('--skip-rate', type=float, default=0.0005, help='Probability a live diff is dropped')
+    parser.add_argument('--duration', type=float, default=3.0, help='Seconds of live sync')
+    args = parser.parse_args()
+
+    applied, book = apply_throughput(args.levels, args.diffs)
+    print(json.dumps({
+        'apply': applied,
+        'fill_queries': fill_queries(book),
+        'live_sync': asyncio.run(live_sync(args.rate, args.skip_rate, args.duration)),
+        'trading_slippage': slippage(book, 100000.0)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+价格历史基准测试
+模拟模板的30天监控（8640次、每5分钟一次）以及每秒一个tick的30天数据流，
+统计写入吞吐、24小时统计查询耗时，并确认内存占用在第一天之后保持不变
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from price_history import PriceHistory, WINDOW_24H
+
+def simulate(ticks: int, step: float, capacity: int) -> dict:
+    tracemalloc.start()
+    history = PriceHistory(capacity=capacity)
+    baseline = tracemalloc.get_traced_memory()[0]
+    start_ts = 1700000000.0
+    price = 100000.0
+    one_day = int(WINDOW_24H / step)
+    memory_after_day = None
+    memory_end = 0
+    recent = []
+
+    start = time.perf_counter()
+    for n in range(ticks):
+        price = max(1.0, price + random.gauss(0, 20))
+        history.add(price, random.random(), start_ts + n * step)
+        if n == one_day:
+            memory_after_day = tracemalloc.get_traced_memory()[0] - baseline
+        if n == ticks - one_day - 1:
+            # 在开始收集校验数据之前采样，避免把校验列表算进内存占用
+            memory_end = tracemalloc.get_traced_memory()[0] - baseline
+        if n >= ticks - one_day:
+            recent.append(price)
+    add_elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    query_start = time.perf_counter()
+    for _ in range(10000):
+        stats = history.stats(start_ts + (ticks - 1) * step)
+    query_elapsed = time.perf_counter() - query_start
+
+    return {
+        'ticks': ticks,
+        'tick_interval_s': step,
+        'add_per_s': round(ticks / add_elapsed),
+        'stats_query_us': round(query_elapsed / 10000 * 1e6, 3),
+        'memory_after_first_day_kb': round((memory_after_day or 0) / 1024, 1),
+        'memory_before_last_day_kb': round(memory_end / 1024, 1),
+        'high_low_verified': stats['high_24h'] == max(recent) and stats['low_24h'] == min(recent)
+    }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Price history benchmark')
+    parser.add_argument('--dense-days', type=float, default=30, help='Days of 1-second ticks to simulate')
+    args = parser.parse_args()
+
+    result = {
+        'template_30d_5min': simulate(8640, 300.0, 86400),
+        'dense_1s': simulate(int(args.dense_days * WINDOW_24H), 1.0, 86400)
+    }
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
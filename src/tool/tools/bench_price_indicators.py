@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+技术指标基准测试
+对比每个tick增量更新（O(1)）与每个tick对整段历史做NumPy向量化全量计算（O(n)）的耗时，
+并校验两种方式以及 rebuild 重建后的指标值一致
+"""
+
+import argparse
+import json
+import random
+import time
+
+from price_indicators import IncrementalIndicators, compute_indicators, latest_values
+
+FIELDS = ('sma', 'ema', 'rsi', 'bb_upper', 'bb_lower', 'vwap')
+
+def random_walk(ticks: int):
+    prices, volumes = [], []
+    price = 100000.0
+    for _ in range(ticks):
+        price = max(1.0, price + random.gauss(0, 20))
+        prices.append(price)
+        volumes.append(random.uniform(0.001, 0.5))
+    return prices, volumes
+
+def max_relative_error(a: dict, b: dict) -> float:
+    worst = 0.0
+    for field in FIELDS:
+        if a[field] is None or b[field] is None:
+            if a[field] is not b[field]:
+                return float('inf')
+            continue
+        worst = max(worst, abs(a[field] - b[field]) / max(abs(b[field]), 1e-12))
+    return worst
+
+def run(ticks: int, recompute_ticks: int) -> dict:
+    prices, volumes = random_walk(ticks)
+
+    incremental = IncrementalIndicators()
+    start = time.perf_counter()
+    for price, volume in zip(prices, volumes):
+        incremental.update(price, volume)
+        incremental.snapshot()
+    incremental_elapsed = time.perf_counter() - start
+
+    # 全量计算：对最后 recompute_ticks 个tick，每个tick都重新计算整段历史
+    start = time.perf_counter()
+    for end in range(ticks - recompute_ticks + 1, ticks + 1):
+        full = latest_values(compute_indicators(prices[:end], volumes[:end]))
+    full_elapsed = time.perf_counter() - start
+
+    rebuilt = IncrementalIndicators()
+    rebuild_start = time.perf_counter()
+    rebuilt.rebuild(prices[:-100], volumes[:-100])
+    rebuild_elapsed = time.perf_counter() - rebuild_start
+    for price, volume in zip(prices[-100:], volumes[-100:]):
+        rebuilt.update(price, volume)
+
+    snapshot = incremental.snapshot()
+    incremental_us = incremental_elapsed / ticks * 1e6
+    full_us = full_elapsed / recompute_ticks * 1e6
+    return {
+        'history_ticks': ticks,
+        'incremental_per_tick_us': round(incremental_us, 2),
+        'full_recompute_per_tick_us': round(full_us, 1),
+        'speedup': round(full_us / incremental_us, 1),
+        'rebuild_ms': round(rebuild_elapsed * 1000, 2),
+        'max_relative_error_vs_full': max_relative_error(snapshot, full),
+        'max_relative_error_after_rebuild': max_relative_error(rebuilt.snapshot(), snapshot),
+        'latest': {field: round(snapshot[field], 2) for field in FIELDS}
+    }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Technical indicator benchmark')
+    parser.add_argument('--recompute-ticks', type=int, default=200, help='Ticks timed for the full-recompute mode')
+    args = parser.parse_args()
+
+    random.seed(7)
+    result = {
+        'template_30d_5min': run(8640, args.recompute_ticks),
+        'dense_1d_1s': run(86400, args.recompute_ticks)
+    }
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
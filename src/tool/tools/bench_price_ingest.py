@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+行情接入基准测试
+本地模拟行情源以指定速率推送ticker，统计接入吞吐量、断线重连次数，
+以及从内存报价表读取聚合价格的耗时
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from stub_exchanges import StubExchangeServer
+from tool_loader import load_tool
+
+price_tool = load_tool('btc-price-tool.py')
+
+async def run(server: StubExchangeServer, duration: float, reads: int) -> dict:
+    service = price_tool.AsyncBTCPriceService(server.endpoints)
+    engine = service.enable_ingestion(server.ws_endpoints, coingecko_interval=1.0)
+    await engine.start()
+    if not await engine.wait_ready():
+        raise RuntimeError('Feeds did not deliver any quote')
+
+    start_updates = engine.table.updates
+    start = time.perf_counter()
+    await asyncio.sleep(duration)
+    elapsed = time.perf_counter() - start
+    ingested = engine.table.updates - start_updates
+
+    read_start = time.perf_counter()
+    for _ in range(reads):
+        await service.get_aggregated_price()
+    read_elapsed = time.perf_counter() - read_start
+    sample = await service.get_aggregated_price()
+
+    stats = engine.stats()
+    await service.close()
+    return {
+        'duration_s': round(elapsed, 3),
+        'ingested_messages': ingested,
+        'ingested_per_s': round(ingested / elapsed),
+        'aggregate_read_us': round(read_elapsed / reads * 1e6, 2),
+        'aggregate_sources': sample['price_sources'],
+        'feeds': stats
+    }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='WebSocket ingestion benchmark')
+    parser.add_argument('--feed-rate', type=float, default=5000, help='Messages per second per stand-in feed')
+    parser.add_argument('--duration', type=float, default=3.0, help='Measurement window (seconds)')
+    parser.add_argument('--drop-after', type=int, default=5000,
+                        help='Stand-in feeds drop the connection after this many messages (0 disables)')
+    parser.add_argument('--reads', type=int, default=10000, help='Aggregated price reads')
+    args = parser.parse_args()
+
+    with StubExchangeServer(feed_rate=args.feed_rate, drop_after=args.drop_after) as server:
+        result = asyncio.run(run(server, args.duration, args.reads))
+        result['stand_in_sent'] = server.feed_messages
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+连接池基准测试
+对比每次轮询新建连接与复用keep-alive连接池的延迟和建连次数（使用本地模拟交易所）
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from stub_exchanges import StubExchangeServer
+from tool_loader import load_tool
+
+price_tool = load_tool('btc-price-tool.py')
+
+def run_fresh(endpoints, polls: int) -> list:
+    """每次轮询使用新的服务实例（每次都重新建连）"""
+    samples = []
+    for _ in range(polls):
+        service = price_tool.BTCPriceService(endpoints=endpoints)
+        start = time.perf_counter()
+        service.get_aggregated_price()
+        samples.append(time.perf_counter() - start)
+        service.close()
+    return samples
+
+def run_pooled(endpoints, polls: int) -> list:
+    """同一服务实例复用连接池，启动时预热"""
+    service = price_tool.BTCPriceService(endpoints=endpoints)
+    service.warm_up()
+    samples = []
+    for _ in range(polls):
+        start = time.perf_counter()
+        service.get_aggregated_price()
+        samples.append(time.perf_counter() - start)
+    service.close()
+    return samples
+
+def summarize(samples: list, connections: int) -> dict:
+    return {
+        'polls': len(samples),
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+        'p50_ms': round(statistics.median(samples) * 1000, 3),
+        'tcp_connections': connections
+    }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Connection pool benchmark')
+    parser.add_argument('--polls', type=int, default=200, help='Polls per mode')
+    args = parser.parse_args()
+
+    with StubExchangeServer() as server:
+        fresh = run_fresh(server.endpoints, args.polls)
+        fresh_connections = server.connection_count
+    with StubExchangeServer() as server:
+        pooled = run_pooled(server.endpoints, args.polls)
+        pooled_connections = server.connection_count
+
+    result = {
+        'fresh': summarize(fresh, fresh_connections),
+        'pooled': summarize(pooled, pooled_connections)
+    }
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
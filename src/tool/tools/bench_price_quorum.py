@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+法定数聚合基准测试
+各数据源延迟带长尾（小概率很慢），对比等待全部数据源、法定数提前返回、
+法定数 + 对冲请求三种模式的聚合延迟
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from stub_exchanges import StubExchangeServer
+from tool_loader import load_tool
+
+price_tool = load_tool('btc-price-tool.py')
+
+def heavy_tail(base: float, slow: float, slow_rate: float):
+    return lambda: slow if random.random() < slow_rate else max(0.002, random.gauss(base, base * 0.2))
+
+async def run_mode(server: StubExchangeServer, rounds: int, warmup: int, **options) -> dict:
+    service = price_tool.AsyncBTCPriceService(server.endpoints, **options)
+    samples = []
+    sources = []
+    for i in range(warmup + rounds):
+        start = time.perf_counter()
+        result = await service.fetch_aggregated_price()
+        if i >= warmup:  # 预热轮次用于积累p95样本
+            samples.append(time.perf_counter() - start)
+            sources.append(result.get('price_sources', 0))
+    hedged = service.hedged_requests
+    await service.close()
+    ordered = sorted(samples)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+    return {
+        'p50_ms': round(pick(50) * 1000, 1),
+        'p95_ms': round(pick(95) * 1000, 1),
+        'p99_ms': round(pick(99) * 1000, 1),
+        'mean_sources': round(statistics.mean(sources), 2),
+        'hedged_requests': hedged
+    }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Quorum aggregation benchmark')
+    parser.add_argument('--rounds', type=int, default=200, help='Aggregates per mode')
+    parser.add_argument('--slow-rate', type=float, default=0.1, help='Probability of a slow response per request')
+    parser.add_argument('--slow', type=float, default=0.5, help='Slow response latency (seconds)')
+    args = parser.parse_args()
+
+    latency = {
+        'coingecko': heavy_tail(0.04, args.slow, args.slow_rate),
+        'binance': heavy_tail(0.03, args.slow, args.slow_rate),
+        'coinbase': heavy_tail(0.05, args.slow, args.slow_rate)
+    }
+    warmup = 20
+    with StubExchangeServer(latency=latency) as server:
+        result = {
+            'wait_all': asyncio.run(run_mode(server, args.rounds, warmup)),
+            'quorum_2': asyncio.run(run_mode(server, args.rounds, warmup, quorum=2)),
+            'quorum_2_hedged': asyncio.run(run_mode(server, args.rounds, warmup, quorum=2, hedge=True))
+        }
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
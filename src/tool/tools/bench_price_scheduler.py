@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+自适应轮询回放基准测试
+在秒级价格路径上回放几种轮询方式：模板的固定5分钟、固定30秒、始终按自适应调度的最短间隔轮询，
+以及自适应调度（阈值距离 + 已实现波动率，每个交易所一个令牌桶）。统计上游请求数、各交易所任意60秒内的最大请求数，
+以及价格进入买入 / 卖出区间后多久被轮询发现。一次信号从价格进入区间开始，到价格回到区间外
+--hysteresis 以上为止（避免在阈值附近来回穿越被算作很多次），期间一次都没轮询到区间内价格的算漏掉。
+
+价格路径默认为波动率分段切换的几何随机游走，也可以用 --ticks 回放记录的tick文件（见 tick_files.py）。
+"""
+
+import argparse
+import json
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from price_scheduler import DEFAULT_RATE_LIMITS, PollScheduler, build_buckets
+from tick_files import read_ticks
+
+SOURCES = tuple(DEFAULT_RATE_LIMITS)
+
+def regime_path(days: int, seed: int = 7, regime_hours: float = 6.0, vols=(0.3, 0.8, 2.0)):
+    """每 regime_hours 小时随机切换一次年化波动率的秒级路径"""
+    rng = np.random.default_rng(seed)
+    seconds = days * 24 * 3600
+    regime = int(regime_hours * 3600)
+    annual = np.repeat(rng.choice(vols, seconds // regime + 1), regime)[:seconds]
+    steps = rng.normal(0, 1, seconds) * annual / np.sqrt(365 * 24 * 3600)
+    prices = 100000.0 * np.exp(np.cumsum(steps))
+    timestamps = 1700000000.0 + np.arange(seconds, dtype=np.float64)
+    return timestamps, prices
+
+class FixedInterval:
+    """固定间隔轮询（模板的 checkInterval）"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+
+    def observe(self, price: float, now: Optional[float] = None):
+        pass
+
+    def next_interval(self) -> float:
+        return self.interval
+
+def replay(timestamps: np.ndarray, prices: np.ndarray, policy, budgets: bool) -> Dict[str, Any]:
+    """按回放时钟轮询，返回每次轮询的时间、是否拿到价格，以及各交易所的请求时间"""
+    start, end = float(timestamps[0]), float(timestamps[-1])
+    buckets = build_buckets(sources=SOURCES, now=start) if budgets else {}
+    calls = {source: [] for source in SOURCES}
+    poll_times, seen = [], []
+    now = start
+    while now <= end:
+        granted = [source for source in SOURCES if source not in buckets or buckets[source].try_acquire(now=now)]
+        for source in granted:
+            calls[source].append(now)
+        poll_times.append(now)
+        seen.append(bool(granted))
+        if granted:
+            policy.observe(float(prices[np.searchsorted(timestamps, now, 'right') - 1]), now)
+        delay = policy.next_interval()
+        if buckets:
+            delay = max(delay, min(bucket.wait_time(now=now) for bucket in buckets.values()))
+        now += delay
+    return {'poll_times': np.array(poll_times), 'seen': np.array(seen),
+            'calls': {source: np.array(times) for source, times in calls.items()}}
+
+def signal_episodes(timestamps: np.ndarray, prices: np.ndarray, buy: float, sell: float, hysteresis: float):
+    """价格进入 price <= buy 或 price >= sell 区间的信号段 (开始时间, 结束时间)"""
+    inside = np.flatnonzero((prices <= buy) | (prices >= sell))
+    cleared = np.flatnonzero((prices > buy * (1 + hysteresis)) & (prices < sell * (1 - hysteresis)))
+    episodes = []
+    position = 0
+    while True:
+        entry = np.searchsorted(inside, position)
+        if entry >= len(inside):
+            return episodes
+        start = inside[entry]
+        end = np.searchsorted(cleared, start)
+        if end >= len(cleared):
+            episodes.append((timestamps[start], np.inf))
+            return episodes
+        episodes.append((timestamps[start], timestamps[cleared[end]]))
+        position = cleared[end]
+
+def _percentiles(samples: np.ndarray) -> Dict[str, Any]:
+    if not len(samples):
+        return {}
+    return {f'p{pct}_s': round(float(np.percentile(samples, pct)), 1) for pct in (50, 95, 99)} | {
+        'max_s': round(float(samples.max()), 1), 'mean_s': round(float(samples.mean()), 1)}
+
+def evaluate(timestamps: np.ndarray, prices: np.ndarray, buy: float, sell: float, hysteresis: float,
+             policy, budgets: bool) -> Dict[str, Any]:
+    result = replay(timestamps, prices, policy, budgets)
+    poll_times = result['poll_times'][result['seen']]
+    polled = prices[np.searchsorted(timestamps, poll_times, 'right') - 1]
+    signal_times = poll_times[(polled <= buy) | (polled >= sell)]
+    latencies, missed = [], 0
+    for start, end in signal_episodes(timestamps, prices, buy, sell, hysteresis):
+        position = np.searchsorted(signal_times, start)
+        if position < len(signal_times) and signal_times[position] < end:
+            latencies.append(signal_times[position] - start)
+        else:
+            missed += 1
+    days = (timestamps[-1] - timestamps[0]) / 86400
+    peak = {}
+    for source, times in result['calls'].items():
+        peak[source] = int((np.searchsorted(times, times + 60) - np.arange(len(times))).max()) if len(times) else 0
+    upstream = sum(len(times) for times in result['calls'].values())
+    return {
+        'polls': len(result['poll_times']),
+        'upstream_calls': upstream,
+        'calls_per_day': round(upstream / days, 1),
+        'max_calls_per_min': peak,
+        'events': len(latencies) + missed,
+        'detected': len(latencies),
+        'missed': missed,
+        'detection_latency': _percentiles(np.array(latencies))
+    }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Adaptive polling replay benchmark')
+    parser.add_argument('--days', type=int, default=30, help='Days of synthetic 1-second prices')
+    parser.add_argument('--seed', type=int, default=7, help='Random seed of the synthetic path')
+    parser.add_argument('--ticks', help='Replay a recorded tick file (.bin or CSV) instead')
+    parser.add_argument('--buy', type=float, help='Buy threshold (defaults to the 20th price percentile)')
+    parser.add_argument('--sell', type=float, help='Sell threshold (defaults to the 80th price percentile)')
+    parser.add_argument('--hysteresis', type=float, default=0.002,
+                        help='Relative move back past a threshold that ends a signal episode')
+    parser.add_argument('--min-interval', type=float, default=5.0, help='Shortest adaptive poll interval')
+    parser.add_argument('--max-interval', type=float, default=300.0, help='Longest adaptive poll interval')
+    args = parser.parse_args()
+
+    if args.ticks:
+        ticks = read_ticks(args.ticks)
+        timestamps, prices = np.asarray(ticks['timestamp']), np.asarray(ticks['price'])
+    else:
+        timestamps, prices = regime_path(args.days, args.seed)
+    buy = args.buy if args.buy is not None else float(np.percentile(prices, 20))
+    sell = args.sell if args.sell is not None else float(np.percentile(prices, 80))
+
+    policies = {
+        'fixed_300s': (FixedInterval(300), False),
+        'fixed_30s': (FixedInterval(30), False),
+        f'fixed_{args.min_interval:g}s': (FixedInterval(args.min_interval), False),
+        'adaptive': (PollScheduler((buy, sell), args.min_interval, args.max_interval), True)
+    }
+    results = {name: evaluate(timestamps, prices, buy, sell, args.hysteresis, policy, budgets)
+               for name, (policy, budgets) in policies.items()}
+    print(json.dumps({
+        'ticks': len(prices),
+        'thresholds': {'buy': round(buy, 2), 'sell': round(sell, 2), 'hysteresis': args.hysteresis},
+        'rate_limits': {source: {'rate_per_s': rate, 'burst': burst}
+                        for source, (rate, burst) in DEFAULT_RATE_LIMITS.items()},
+        'results': results
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+行情推送基准测试
+高频发布报价，对比快/慢SSE客户端和WebSocket客户端实际收到的报价数：
+慢客户端只收到合并后的最新报价，最终报价不会丢失，服务端每个连接最多只有一条待发报价和约4KB未发送数据。
+注意：aiohttp的WebSocket客户端自身会预读约512KB消息，慢WS客户端看到的延迟主要来自客户端缓冲
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import time
+from datetime import datetime
+
+import aiohttp
+from aiohttp import web
+
+from tool_loader import load_tool
+
+price_tool = load_tool('btc-price-tool.py')
+
+def client_session(slow: bool) -> aiohttp.ClientSession:
+    """慢客户端使用小接收缓冲：服务端背压生效后，合并发生在服务端而不是客户端缓冲区里"""
+    if not slow:
+        return aiohttp.ClientSession()
+
+    def small_buffer_socket(addr_info):
+        family, sock_type, proto = addr_info[0], addr_info[1], addr_info[2]
+        sock = socket.socket(family, sock_type, proto)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        return sock
+
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(socket_factory=small_buffer_socket),
+                                 read_bufsize=1024)
+
+def make_quote(price: float) -> dict:
+    """与聚合价格结果结构一致的报价（约700字节）"""
+    now = datetime.now().isoformat()
+    return {
+        'success': True,
+        'price': price,
+        'price_sources': 3,
+        'change_24h': 1.25,
+        'volume_24h': 35000000000.0,
+        'high_24h': price * 1.02,
+        'low_24h': price * 0.98,
+        'timestamp': now,
+        'sources': {
+            'coingecko': {'source': 'coingecko', 'price': price, 'change_24h': 1.25,
+                          'volume_24h': 35000000000.0, 'last_updated': 1700000000, 'timestamp': now},
+            'binance': {'source': 'binance', 'price': price + 5, 'change_24h': 1.3, 'volume_24h': 25000.5,
+                        'high_24h': price * 1.02, 'low_24h': price * 0.98, 'timestamp': now},
+            'coinbase': {'source': 'coinbase', 'price': price - 5, 'timestamp': now}
+        },
+        'price_variance': 10.0
+    }
+
+async def sse_client(url: str, final_price: float, delay: float, stats: dict):
+    async with client_session(delay > 0) as session:
+        async with session.get(url) as response:
+            stats['connected'].set()
+            async for line in response.content:
+                if not line.startswith(b'data: '):
+                    continue
+                quote = json.loads(line[6:])
+                stats['received'] += 1
+                if delay:
+                    await asyncio.sleep(delay)
+                if quote['price'] == final_price:
+                    stats['latency_after_final_ms'] = round((time.perf_counter() - stats['final_at']()) * 1000, 3)
+                    return
+
+async def ws_client(url: str, final_price: float, delay: float, stats: dict):
+    async with client_session(delay > 0) as session:
+        async with session.ws_connect(url) as ws:
+            stats['connected'].set()
+            async for message in ws:
+                quote = json.loads(message.data)
+                stats['received'] += 1
+                if delay:
+                    await asyncio.sleep(delay)
+                if quote['price'] == final_price:
+                    stats['latency_after_final_ms'] = round((time.perf_counter() - stats['final_at']()) * 1000, 3)
+                    return
+
+async def run(quotes: int, rate: float, slow_delay: float) -> dict:
+    app = price_tool.create_price_app(price_tool.AsyncBTCPriceService())
+    broadcaster = app['broadcaster']
+    broadcaster.fetch = None  # 由基准测试直接发布报价
+    app.on_startup.clear()  # 不预热真实交易所连接
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    base = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}'
+
+    final_price = 100000.0 + quotes
+    final_marker = {'at': 0.0}
+    clients = {
+        'sse_fast': (sse_client, '/stream/sse', 0.0),
+        'sse_slow': (sse_client, '/stream/sse', slow_delay),
+        'ws_fast': (ws_client, '/stream/ws', 0.0),
+        'ws_slow': (ws_client, '/stream/ws', slow_delay)
+    }
+    stats = {}
+    tasks = []
+    for name, (client, path, delay) in clients.items():
+        stats[name] = {'received': 0, 'connected': asyncio.Event(), 'final_at': lambda: final_marker['at']}
+        tasks.append(asyncio.ensure_future(client(base + path, final_price, delay, stats[name])))
+    for name in clients:
+        await stats[name]['connected'].wait()
+    while broadcaster.subscriber_count < len(clients):
+        await asyncio.sleep(0.01)
+
+    start = time.perf_counter()
+    for i in range(1, quotes + 1):
+        if i == quotes:
+            final_marker['at'] = time.perf_counter()
+        broadcaster.publish(make_quote(100000.0 + i))
+        # 按目标速率发布，模拟持续到达的行情
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    publish_s = time.perf_counter() - start
+    await asyncio.wait_for(asyncio.gather(*tasks), 60)
+    await runner.cleanup()
+
+    result = {'published': quotes, 'publish_s': round(publish_s, 3), 'clients': {}}
+    for name in clients:
+        result['clients'][name] = {
+            'received': stats[name]['received'],
+            'coalesced': quotes - stats[name]['received'],
+            'latency_after_final_ms': stats[name].get('latency_after_final_ms')
+        }
+    return result
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Price stream benchmark')
+    parser.add_argument('--quotes', type=int, default=20000, help='Quotes to publish')
+    parser.add_argument('--rate', type=float, default=2000, help='Published quotes per second')
+    parser.add_argument('--slow-delay', type=float, default=0.02, help='Per-message processing delay of slow clients')
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.quotes, args.rate, args.slow_delay)), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+多币种行情基准测试
+对比每个币种单独查询（每个币种3个请求，顺序或并发）与批量查询（每轮共3个请求）的
+上游请求数和耗时，并确认两种方式得到的各币种价格一致；再确认混入未知币种时其余币种照常取价，
+BTC查询不受影响（使用本地模拟交易所，无需网络）
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from price_symbols import DEFAULT_SYMBOLS
+from stub_exchanges import StubExchangeServer
+from tool_loader import load_tool
+
+price_tool = load_tool('btc-price-tool.py')
+
+async def poll(service, server: StubExchangeServer, symbols: list, mode: str, rounds: int) -> tuple:
+    before = sum(server.request_counts.values())
+    start = time.perf_counter()
+    for _ in range(rounds):
+        if mode == 'batch':
+            prices = (await service.fetch_prices(symbols))['symbols']
+        elif mode == 'per_symbol_concurrent':
+            results = await asyncio.gather(*(service.fetch_prices([symbol]) for symbol in symbols))
+            prices = {symbol: result['symbols'][symbol] for symbol, result in zip(symbols, results)}
+        else:
+            prices = {}
+            for symbol in symbols:
+                prices[symbol] = (await service.fetch_prices([symbol]))['symbols'][symbol]
+    elapsed = time.perf_counter() - start
+    requests = sum(server.request_counts.values()) - before
+    return {
+        'requests_per_poll': requests / rounds,
+        'poll_ms': round(elapsed / rounds * 1000, 2)
+    }, {symbol: quote.get('price') for symbol, quote in prices.items()}
+
+async def unknown_symbol(service, rounds: int) -> dict:
+    """批量查询中混入模拟交易所不认识的币种（Binance会对 symbols 过滤请求整体返回400）：
+    其余币种应照常有Binance报价，BTC单币种查询的熔断状态不受影响"""
+    for _ in range(max(rounds, service.health['binance'].failure_threshold)):
+        batch = await service.fetch_prices(['BTC', 'ETH', 'NOTACOIN'])
+    btc = await service.fetch_aggregated_price()
+    return {
+        'known_symbols_from_binance': sorted(symbol for symbol, quote in batch['symbols'].items()
+                                             if 'binance' in quote.get('sources', {})),
+        'unknown_symbol_success': batch['symbols']['NOTACOIN']['success'],
+        'binance_batch_state': service.batch_health['binance'].state,
+        'binance_btc_state': service.health['binance'].state,
+        'btc_sources': btc.get('price_sources')
+    }
+
+async def run(latency: float, rounds: int) -> dict:
+    result = {}
+    with StubExchangeServer(latency={name: latency for name in ('coingecko', 'binance', 'coinbase')}) as server:
+        service = price_tool.AsyncBTCPriceService(server.endpoints)
+        await service.warm_up()
+        for count in (1, 4, len(DEFAULT_SYMBOLS)):
+            symbols = list(DEFAULT_SYMBOLS)[:count]
+            entry = {}
+            prices = {}
+            for mode in ('per_symbol_sequential', 'per_symbol_concurrent', 'batch'):
+                entry[mode], prices[mode] = await poll(service, server, symbols, mode, rounds)
+            entry['prices_match'] = prices['batch'] == prices['per_symbol_sequential'] == prices['per_symbol_concurrent']
+            result[f'{count}_symbols'] = entry
+        result['unknown_symbol'] = await unknown_symbol(service, rounds)
+        await service.close()
+    return result
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Multi-symbol price benchmark')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stub latency per request (seconds)')
+    parser.add_argument('--rounds', type=int, default=5, help='Polls per mode')
+    args = parser.parse_args()
+    print(json.dumps({'latency_s': args.latency, **asyncio.run(run(args.latency, args.rounds))}, indent=2))
+
+if __name__ == '__main__':
+    main()
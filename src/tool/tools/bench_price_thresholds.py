@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+阈值订阅索引基准测试
+1. 索引：N 个订阅方的买卖阈值，每个tick二分查找被穿越的订阅，对照“每个工作流各自判断条件”的逐个检查，
+   比较每tick耗时并确认两者找出的触发完全一致；
+2. 端到端：模拟交易所按价格路径报价，价格服务每个tick请求一次上游，触发结果批量推送到本地的
+   工作流事件接口替身，统计上游请求数、推送请求数和送达的触发数（应与离线重放的触发数一致）。
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+from aiohttp import web
+
+from price_thresholds import ThresholdIndex
+from stub_exchanges import StubExchangeServer
+from tool_loader import load_tool
+
+price_tool = load_tool('btc-price-tool.py')
+
+def make_subscriptions(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """买入阈值在 90k-100k、卖出阈值在 100k-110k 之间，各占一半的订阅同时设置两个阈值"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        item = {'id': f'sub-{i}', 'event_type': 'btc_price_threshold'}
+        kind = i % 4
+        if kind != 1:
+            item['buy'] = round(rng.uniform(90000, 100000), 2)
+        if kind != 0:
+            item['sell'] = round(rng.uniform(100000, 110000), 2)
+        items.append(item)
+    return items
+
+def price_path(ticks: int, seed: int = 7, step: float = 0.002) -> List[float]:
+    rng = np.random.default_rng(seed)
+    return (100000.0 * np.exp(np.cumsum(rng.normal(0, step, ticks)))).round(2).tolist()
+
+def naive_crossings(items: List[Dict[str, Any]], previous: float, price: float) -> set:
+    """每个订阅方各自判断：上一价格在区间外、当前价格进入区间"""
+    crossed = set()
+    for item in items:
+        buy, sell = item.get('buy'), item.get('sell')
+        if buy is not None and price <= buy < previous:
+            crossed.add((item['id'], 'buy'))
+        elif sell is not None and previous < sell <= price:
+            crossed.add((item['id'], 'sell'))
+    return crossed
+
+def bench_index(subscribers: int, ticks: int, naive_ticks: int) -> Dict[str, Any]:
+    items = make_subscriptions(subscribers)
+    prices = price_path(ticks)
+    # 逐个判断的对照没有迟滞，索引同样关闭迟滞以便逐tick比对
+    index = ThresholdIndex(hysteresis=0.0)
+    start = time.perf_counter()
+    index.add_many(items)
+    build = time.perf_counter() - start
+
+    index.update(prices[0])
+    start = time.perf_counter()
+    found = [index.update(price) for price in prices[1:]]
+    index_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [naive_crossings(items, previous, price)
+                for previous, price in zip(prices[:naive_ticks], prices[1:naive_ticks + 1])]
+    naive_elapsed = time.perf_counter() - start
+    matches = all({(crossing['subscription']['id'], crossing['side']) for crossing in found[i]} == expected[i]
+                  for i in range(len(expected)))
+    crossings = sum(len(tick) for tick in found)
+    return {
+        'subscribers': subscribers,
+        'ticks': ticks - 1,
+        'build_ms': round(build * 1000, 1),
+        'crossings': crossings,
+        'mean_crossings_per_tick': round(crossings / (ticks - 1), 2),
+        'index_us_per_tick': round(index_elapsed / (ticks - 1) * 1e6, 2),
+        'naive_us_per_tick': round(naive_elapsed / naive_ticks * 1e6, 1),
+        'speedup': round(naive_elapsed / naive_ticks / (index_elapsed / (ticks - 1)), 1),
+        'matches_naive': matches
+    }
+
+def events_app(received: Dict[str, int]) -> web.Application:
+    """工作流事件接口替身：统计各接口收到的请求数和触发数"""
+    async def handler(request: web.Request) -> web.Response:
+        body = await request.json()
+        kind = request.match_info['kind']
+        received[kind] = received.get(kind, 0) + 1
+        event = body.get('eventData') or body.get('body') or {}
+        received['crossings'] = received.get('crossings', 0) + len(event.get('subscriptionIds', []))
+        return web.json_response({'message': 'Event triggered successfully'})
+
+    app = web.Application()
+    app.router.add_post('/api/workflow-events/{kind}', handler)
+    return app
+
+async def bench_push(server: StubExchangeServer, subscribers: int, ticks: int, batch_size: int) -> Dict[str, Any]:
+    received: Dict[str, int] = {}
+    runner = web.AppRunner(events_app(received), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    backend = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/api"
+
+    items = make_subscriptions(subscribers)
+    # 每20个订阅中有一个走 webhook，一个只需要 btc-price 事件
+    for i, item in enumerate(items):
+        if i % 20 == 1:
+            item.update(target='webhook', url='https://example.com/hooks/btc')
+        elif i % 20 == 2:
+            item['target'] = 'btc-price'
+    service = price_tool.AsyncBTCPriceService(server.endpoints)
+    service.enable_thresholds(backend, batch_size=batch_size, flush_interval=0.0)
+    service.subscribe(items)
+    reference = ThresholdIndex(service.thresholds.hysteresis)
+    reference.add_many(items)
+
+    upstream_before = sum(server.request_counts.values())
+    expected = 0
+    start = time.perf_counter()
+    for price in price_path(ticks, seed=11):
+        server.base_price = price
+        result = await service.fetch_aggregated_price()
+        expected += len(reference.update(result['price']))
+        await service.notifier.flush()
+    elapsed = time.perf_counter() - start
+    notifier = service.notifier.stats()
+    await service.close()
+    await runner.cleanup()
+
+    upstream = sum(server.request_counts.values()) - upstream_before
+    return {
+        'subscribers': subscribers,
+        'ticks': ticks,
+        'upstream_requests': upstream,
+        'upstream_requests_if_each_workflow_polls': upstream * subscribers,
+        'crossings_expected': expected,
+        'crossings_delivered': notifier['delivered'],
+        'push_requests': notifier['requests'],
+        'push_requests_by_route': {key: value for key, value in received.items() if key != 'crossings'},
+        'push_errors': notifier['errors'],
+        'mean_crossings_per_push': round(notifier['delivered'] / max(notifier['requests'], 1), 1),
+        'elapsed_s': round(elapsed, 2)
+    }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Threshold subscription index benchmark')
+    parser.add_argument('--subscribers', default='1000,10000,100000', help='Comma-separated subscriber counts')
+    parser.add_argument('--ticks', type=int, default=20000, help='Ticks replayed through the index')
+    parser.add_argument('--naive-ticks', type=int, default=50, help='Ticks checked subscriber by subscriber')
+    parser.add_argument('--push-subscribers', type=int, default=10000, help='Subscribers in the end-to-end run')
+    parser.add_argument('--push-ticks', type=int, default=200, help='Upstream ticks in the end-to-end run')
+    parser.add_argument('--batch-size', type=int, default=500, help='Crossings per push request')
+    args = parser.parse_args()
+
+    result = {'index': [bench_index(int(count), args.ticks, args.naive_ticks)
+                        for count in args.subscribers.split(',')]}
+    with StubExchangeServer() as server:
+        result['push'] = asyncio.run(bench_push(server, args.push_subscribers, args.push_ticks, args.batch_size))
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+离线基准测试套件
+不访问网络：启动本地模拟交易所（可配置延迟分布、错误率和无响应概率），测量
+1. 不同场景下 get_aggregated_price 的延迟分位数和成功率；
+2. 交易服务每秒处理的订单数（逐笔、批量、订单账本）；
+3. 每条报价占用的内存（价格历史每个tick、每个聚合结果）。
+结果为JSON，可以保存下来（--output），之后用 --compare 与另一次提交的结果逐项比对
+（指标名为 aggregate.healthy.p99_ms 这样的路径），超过阈值的退化会列出并以退出码1结束
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from bench_trading_batch import make_orders, single_calls
+from order_ledger import OrderLedger
+from price_history import PriceHistory
+from stub_exchanges import StubExchangeServer, latency_distribution
+from tool_loader import TOOLS_DIR, load_tool
+
+price_tool = load_tool('btc-price-tool.py')
+trading_tool = load_tool('btc-trading-tool.py')
+
+SOURCES = ('coingecko', 'binance', 'coinbase')
+
+# 场景：每个数据源的延迟分布和故障注入
+SCENARIOS = {
+    'healthy': {'latency': 'gauss:0.02,0.005'},
+    'long_tail': {'latency': 'lognormal:0.02,0.8'},
+    'faulty': {
+        'latency': 'gauss:0.02,0.005',
+        'faults': {
+            'coinbase': {'error_rate': 0.2},
+            'binance': {'hang_rate': 0.05, 'hang_seconds': 5.0}
+        }
+    }
+}
+
+# 影响测量结果的参数，比对时两次运行应一致
+MEASURE_ARGS = ('scenarios', 'latency', 'error_rate', 'hang_rate', 'hang_seconds', 'timeout', 'rounds', 'orders', 'quotes')
+
+# 这些后缀的指标越大越好，其余（耗时、内存）越小越好
+HIGHER_IS_BETTER = ('_per_s', 'success_rate', 'mean_sources')
+
+def _percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+    return {
+        'p50_ms': round(pick(50) * 1000, 2),
+        'p90_ms': round(pick(90) * 1000, 2),
+        'p95_ms': round(pick(95) * 1000, 2),
+        'p99_ms': round(pick(99) * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+        'mean_ms': round(statistics.mean(samples) * 1000, 2)
+    }
+
+async def aggregate_scenario(scenario: dict, rounds: int, timeout: float) -> dict:
+    latency = {name: latency_distribution(scenario['latency']) for name in SOURCES}
+    with StubExchangeServer(latency=latency, faults=scenario.get('faults')) as server:
+        service = price_tool.AsyncBTCPriceService(server.endpoints, timeout=timeout)
+        await service.warm_up()
+        samples = []
+        sources = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = await service.get_aggregated_price()
+            samples.append(time.perf_counter() - start)
+            sources.append(result.get('price_sources', 0) if result.get('success') else 0)
+        await service.close()
+    return {
+        **_percentiles(samples),
+        'success_rate': round(sum(1 for count in sources if count) / rounds, 4),
+        'mean_sources': round(statistics.mean(sources), 3)
+    }
+
+def trading_throughput(count: int, batch_size: int = 100) -> dict:
+    orders = make_orders(count)
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ('single', 'batch', 'ledger_single', 'ledger_batch'):
+            ledger = OrderLedger(os.path.join(tmp, mode)) if mode.startswith('ledger') else None
+            service = trading_tool.BTCTradingService(ledger)
+            start = time.perf_counter()
+            if mode.endswith('single'):
+                single_calls(service, orders)
+            else:
+                for i in range(0, len(orders), batch_size):
+                    service.execute_batch(orders[i:i + batch_size])
+            result[f'{mode}_orders_per_s'] = round(count / (time.perf_counter() - start))
+            if ledger:
+                ledger.close()
+    return result
+
+def _allocated(build) -> tuple:
+    """build() 返回的对象在存活期间占用的字节数（tracemalloc）"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, after - before
+
+def memory_per_quote(quotes: int) -> dict:
+    def history():
+        series = PriceHistory(capacity=quotes)
+        for i in range(quotes):
+            series.add(100000.0 + i % 500, 0.1, 1700000000.0 + i)
+        return series
+
+    coingecko = {'source': 'coingecko', 'price': 100000.0, 'change_24h': 1.2, 'volume_24h': 3.5e10,
+                 'timestamp': datetime.now().isoformat()}
+    binance = {'source': 'binance', 'price': 100010.0, 'change_24h': 1.1, 'volume_24h': 2.0e4,
+               'high_24h': 101000.0, 'low_24h': 99000.0, 'timestamp': datetime.now().isoformat()}
+    coinbase = {'source': 'coinbase', 'price': 99995.0, 'timestamp': datetime.now().isoformat()}
+    _, history_bytes = _allocated(history)
+    _, result_bytes = _allocated(lambda: [price_tool.aggregate_prices(coingecko, binance, coinbase)
+                                          for _ in range(quotes)])
+    return {
+        'history_bytes_per_tick': round(history_bytes / quotes, 1),
+        'aggregate_result_bytes': round(result_bytes / quotes, 1)
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=TOOLS_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def flatten(details: dict, prefix: str = '') -> dict:
+    metrics = {}
+    for key, value in details.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            metrics.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+def compare(current: dict, baseline: dict, threshold: float) -> dict:
+    """逐项比对两次结果，变差超过 threshold（百分比）的记为退化"""
+    changes = {}
+    regressions = []
+    baseline = flatten(baseline)
+    for name, value in flatten(current).items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        change = (value - old) / old * 100 if old else 0.0
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        changes[name] = {'baseline': old, 'current': value, 'change_pct': round(change, 1)}
+        if worse > threshold:
+            regressions.append(name)
+    return {'threshold_pct': threshold, 'regressions': regressions, 'changes': changes}
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Offline benchmark suite')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f'Comma-separated scenarios to run ({", ".join(SCENARIOS)})')
+    parser.add_argument('--latency',
+                        help='Add a custom scenario with this latency distribution (seconds, or uniform:/gauss:/lognormal:/tail:)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Custom scenario: probability of HTTP 503')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='Custom scenario: probability a request hangs')
+    parser.add_argument('--hang-seconds', type=float, default=5.0, help='Custom scenario: how long a hanging request stalls')
+    parser.add_argument('--timeout', type=float, default=1.0, help='Price service timeout ceiling (seconds)')
+    parser.add_argument('--rounds', type=int, default=200, help='Aggregated price calls per scenario')
+    parser.add_argument('--orders', type=int, default=20000, help='Orders per trading mode')
+    parser.add_argument('--quotes', type=int, default=50000, help='Quotes for the memory measurement')
+    parser.add_argument('--output', help='Write the JSON result to this file')
+    parser.add_argument('--compare', help='Baseline JSON result to compare against')
+    parser.add_argument('--threshold', type=float, default=20.0, help='Regression threshold (percent)')
+    args = parser.parse_args()
+
+    scenarios = {name: SCENARIOS[name] for name in args.scenarios.split(',') if name}
+    if args.latency:
+        fault = {'error_rate': args.error_rate, 'hang_rate': args.hang_rate, 'hang_seconds': args.hang_seconds}
+        scenarios['custom'] = {'latency': args.latency, 'faults': {name: dict(fault) for name in SOURCES}}
+
+    results = {
+        'aggregate': {name: asyncio.run(aggregate_scenario(scenario, args.rounds, args.timeout))
+                      for name, scenario in scenarios.items()},
+        'trading': trading_throughput(args.orders),
+        'memory': memory_per_quote(args.quotes)
+    }
+    result = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': vars(args),
+            'scenarios': scenarios
+        },
+        'results': results
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        result['comparison'] = compare(results, baseline['results'], args.threshold)
+        # 轮数、订单数等参数不同时结果不可直接比较
+        result['comparison']['args_match'] = all(
+            baseline['meta']['args'].get(name) == getattr(args, name) for name in MEASURE_ARGS)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    if result.get('comparison', {}).get('regressions'):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+参数扫描基准测试
+生成秒级tick的二进制文件，用不同工作进程数扫描同一参数网格，统计吞吐和加速比，
+并对比每个任务实际传递的数据量与把行情数组pickle给工作进程所需的数据量
+"""
+
+import argparse
+import json
+import os
+import pickle
+import tempfile
+import time
+
+from bench_backtest import synthetic_ticks
+from btc_sweep import build_grid, run_sweep
+from tick_files import write_ticks
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Parameter sweep benchmark')
+    parser.add_argument('--days', type=int, default=30, help='Days of 1-second ticks')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help='Largest worker count to test')
+    args = parser.parse_args()
+
+    grid = build_grid({
+        'buy_threshold': [94000, 96000, 98000, 99000],
+        'sell_threshold': [101000, 102000, 104000, 106000],
+        'max_trade_amount': [0.01, 0.05],
+        'interval': [0, 60, 300]
+    })
+    timestamps, prices = synthetic_ticks(args.days * 24 * 3600)
+    worker_counts = sorted({1, 2, 4, 8, args.max_workers} & set(range(1, args.max_workers + 1)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ticks.bin')
+        write_ticks(path, timestamps, prices)
+        runs = {}
+        for workers in worker_counts:
+            start = time.perf_counter()
+            results = run_sweep(path, grid, workers)
+            elapsed = time.perf_counter() - start
+            runs[workers] = {
+                'elapsed_s': round(elapsed, 2),
+                'evaluations_per_s': round(len(results) / elapsed, 1)
+            }
+        base = runs[1]['elapsed_s']
+        for run in runs.values():
+            run['speedup'] = round(base / run['elapsed_s'], 2)
+        file_bytes = os.path.getsize(path)
+
+    print(json.dumps({
+        'ticks': len(prices),
+        'grid_points': len(grid),
+        'cpu_count': os.cpu_count(),
+        'task_payload_bytes': len(pickle.dumps(grid[0])),
+        'pickled_history_bytes_per_worker': file_bytes,
+        'workers': runs
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
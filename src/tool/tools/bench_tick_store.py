@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+tick存储基准测试
+写入 --days 天、每个数据源每秒一个tick的数据（默认3个数据源），统计批量写入吞吐、轮询路径逐个追加的耗时
+和每tick磁盘占用；再以只读方式重新打开，随机查询1分钟 / 1小时 / 1天 / 7天的时间范围，统计定位（二分查找，
+返回视图）和定位后计算均价的 p50/p99 耗时，并记录查询前后的常驻内存（VmRSS）。
+"""
+
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+
+from tick_store import DAY_SECONDS, SOURCES, TickStore
+
+START = 1700006400.0  # 2023-11-15 00:00 UTC
+
+def rss_mb() -> float:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def _ms(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+            'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3)}
+
+def day_ticks(day: int, sources: int, rng: np.random.Generator, price: float):
+    """一天的多数据源秒级tick，按时间排序"""
+    seconds = START + day * DAY_SECONDS + np.arange(DAY_SECONDS, dtype=np.float64)
+    path = price * np.exp(np.cumsum(rng.normal(0, 3e-5, DAY_SECONDS)))
+    timestamps = np.repeat(seconds, sources)
+    codes = np.tile(np.arange(1, sources + 1, dtype=np.uint8), DAY_SECONDS)
+    prices = np.repeat(path, sources) + rng.normal(0, 2, len(timestamps))
+    volumes = rng.exponential(0.05, len(timestamps))
+    return timestamps, codes, prices, volumes, float(path[-1])
+
+def write(store_dir: str, days: int, sources: int) -> Dict[str, Any]:
+    store = TickStore(store_dir, day_capacity=DAY_SECONDS * sources)
+    rng = np.random.default_rng(7)
+    price, ticks, elapsed = 100000.0, 0, 0.0
+    for day in range(days):
+        timestamps, codes, prices, volumes, price = day_ticks(day, sources, rng, price)
+        start = time.perf_counter()
+        ticks += store.append_many(timestamps, codes, prices, volumes)
+        elapsed += time.perf_counter() - start
+    store.flush()
+
+    # 轮询路径：逐个追加（写在最后一天之后，不影响查询范围）
+    appends = 100000
+    base = START + days * DAY_SECONDS
+    start = time.perf_counter()
+    for i in range(appends):
+        store.append(base + i * 0.25, SOURCES[1 + i % 3], 100000.0 + i % 7, 0.01)
+    append_elapsed = time.perf_counter() - start
+    stats = store.stats()
+    store.close()
+    return {
+        'days': days,
+        'sources': sources,
+        'ticks': ticks,
+        'bulk_ticks_per_s': round(ticks / elapsed),
+        'append_us': round(append_elapsed / appends * 1e6, 2),
+        'disk_mb': round(stats['disk_bytes'] / 1024 / 1024, 1),
+        'disk_bytes_per_tick': round(stats['disk_bytes'] / stats['ticks'], 2)
+    }
+
+def query(store_dir: str, days: int, queries: int) -> Dict[str, Any]:
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    store = TickStore(store_dir, readonly=True)
+    open_ms = (time.perf_counter() - start) * 1000
+    rng = random.Random(11)
+    end_time = START + days * DAY_SECONDS
+    results: Dict[str, Any] = {'open_ms': round(open_ms, 3)}
+    for label, span in (('1m', 60), ('1h', 3600), ('1d', DAY_SECONDS), ('7d', 7 * DAY_SECONDS)):
+        locate, aggregate, counts = [], [], []
+        for _ in range(queries):
+            lo = rng.uniform(START, end_time - span)
+            t0 = time.perf_counter()
+            parts = list(store.iter_range(lo, lo + span))
+            t1 = time.perf_counter()
+            total = sum(float(part['price'].sum()) for part in parts)
+            count = sum(len(part['price']) for part in parts)
+            t2 = time.perf_counter()
+            locate.append(t1 - t0)
+            aggregate.append(t2 - t0)
+            counts.append(count)
+            del parts, total
+        results[label] = {'ticks': int(np.mean(counts)), 'locate': _ms(locate), 'locate_and_mean': _ms(aggregate)}
+
+    lo = START + DAY_SECONDS / 2
+    sample = store.query(lo, lo + 3600)
+    results['zero_copy'] = not sample['price'].flags.owndata
+    start = time.perf_counter()
+    filtered = store.query(lo, lo + 3600, source='binance')
+    results['1h_one_source_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    results['1h_one_source_ticks'] = len(filtered['price'])
+    del sample, filtered
+    results['open_days'] = store.stats()['open_days']
+    store.close()
+    results['rss_before_mb'] = round(rss_before, 1)
+    results['rss_after_mb'] = round(rss_mb(), 1)
+    return results
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Tick store benchmark')
+    parser.add_argument('--days', type=int, default=90, help='Days of 1-second ticks per source')
+    parser.add_argument('--sources', type=int, default=3, help='Sources ticking every second')
+    parser.add_argument('--queries', type=int, default=200, help='Random queries per range length')
+    parser.add_argument('--store-dir', help='Keep the generated store in this directory')
+    args = parser.parse_args()
+
+    store_dir = args.store_dir or tempfile.mkdtemp(prefix='tick-store-bench-')
+    try:
+        result = {'write': write(store_dir, args.days, args.sources),
+                  'query': query(store_dir, args.days, args.queries)}
+    finally:
+        if not args.store_dir:
+            shutil.rmtree(store_dir, ignore_errors=True)
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
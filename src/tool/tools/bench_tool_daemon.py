@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+常驻服务基准测试
+对比“每次调用启动一个进程”与“调用常驻HTTP服务”的单次调用延迟（p50/p99）
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from stub_exchanges import StubExchangeServer
+from tool_daemon import LatencyRecorder
+from tool_loader import TOOLS_DIR
+
+PRICE_CALL = '''
+import sys
+sys.path.insert(0, {tools_dir!r})
+from tool_loader import load_tool
+service = load_tool('btc-price-tool.py').BTCPriceService(endpoints={endpoints!r})
+service.get_aggregated_price()
+service.close()
+'''
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _wait_ready(url: str, timeout: float = 15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'Daemon did not start: {url}')
+
+def _measure(label: str, call, calls: int, recorder: LatencyRecorder):
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        recorder.record(label, time.perf_counter() - start)
+
+def _daemon(args: list, port: int, env=None) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable] + args + ['--port', str(port)],
+                               stdout=subprocess.DEVNULL, env=env)
+    _wait_ready(f'http://127.0.0.1:{port}/health')
+    return process
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Tool daemon benchmark')
+    parser.add_argument('--calls', type=int, default=30, help='Process-per-call invocations per tool')
+    parser.add_argument('--daemon-calls', type=int, default=1000, help='Daemon invocations per tool')
+    args = parser.parse_args()
+
+    recorder = LatencyRecorder()
+    trading_tool = os.path.join(TOOLS_DIR, 'btc-trading-tool.py')
+    price_tool = os.path.join(TOOLS_DIR, 'btc-price-tool.py')
+
+    # 交易工具：查询余额
+    _measure('trading balance / process-per-call',
+             lambda: subprocess.run([sys.executable, trading_tool, 'balance'], check=True, stdout=subprocess.DEVNULL),
+             args.calls, recorder)
+    port = _free_port()
+    daemon = _daemon([trading_tool, 'serve'], port)
+    try:
+        url = f'http://127.0.0.1:{port}/balance'
+        _measure('trading balance / daemon', lambda: urllib.request.urlopen(url).read(), args.daemon_calls, recorder)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    # 价格工具：聚合价格（本地模拟交易所）
+    with StubExchangeServer() as server:
+        code = PRICE_CALL.format(tools_dir=TOOLS_DIR, endpoints=server.endpoints)
+        _measure('price aggregate / process-per-call',
+                 lambda: subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.DEVNULL),
+                 args.calls, recorder)
+
+        port = _free_port()
+        serve_code = (f'import sys; sys.path.insert(0, {TOOLS_DIR!r}); '
+                      f'from tool_loader import load_tool; from tool_daemon import run_app; '
+                      f'm = load_tool("btc-price-tool.py"); '
+                      f'run_app(m.create_price_app(m.AsyncBTCPriceService({server.endpoints!r})), "127.0.0.1", {port})')
+        daemon = subprocess.Popen([sys.executable, '-c', serve_code], stdout=subprocess.DEVNULL)
+        try:
+            _wait_ready(f'http://127.0.0.1:{port}/health')
+            url = f'http://127.0.0.1:{port}/price'
+            _measure('price aggregate / daemon', lambda: urllib.request.urlopen(url).read(), args.daemon_calls, recorder)
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    print(json.dumps(recorder.report(), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+NDJSON管道模式基准测试
+对比“每条命令启动一个进程”与“一个进程通过标准输入输出连续处理命令”的吞吐（命令/秒）：
+管道模式分别测量一问一答（逐条等待结果）和流式（一次写入全部命令）两种用法，
+并确认管道进程的最终余额与在当前进程内重放同一串命令的结果一致
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from stub_exchanges import StubExchangeServer
+from tool_loader import TOOLS_DIR, load_tool
+
+trading_tool = load_tool('btc-trading-tool.py')
+
+PRICE_PIPE = '''
+import sys
+sys.path.insert(0, {tools_dir!r})
+from tool_loader import load_tool
+from tool_pipe import run_pipe
+m = load_tool('btc-price-tool.py')
+service = m.BTCPriceService(endpoints={endpoints!r})
+run_pipe(lambda command: m.execute_command(service, command))
+service.close()
+'''
+
+PRICE_CALL = '''
+import sys
+sys.path.insert(0, {tools_dir!r})
+from tool_loader import load_tool
+service = load_tool('btc-price-tool.py').BTCPriceService(endpoints={endpoints!r})
+service.get_aggregated_price()
+service.close()
+'''
+
+def trading_commands(count: int, seed: int = 7) -> list:
+    """小额买卖与余额查询交替的命令序列，保证余额不会耗尽"""
+    rng = random.Random(seed)
+    commands = []
+    for i in range(count):
+        price = round(100000 * (1 + rng.uniform(-0.01, 0.01)), 2)
+        kind = i % 3
+        if kind == 0:
+            commands.append({'id': i, 'action': 'buy', 'amount': round(rng.uniform(0.5, 2), 2), 'price': price})
+        elif kind == 1:
+            commands.append({'id': i, 'action': 'sell', 'btc_amount': 0.000005, 'price': price})
+        else:
+            commands.append({'id': i, 'action': 'balance'})
+    return commands
+
+def _argv(command: dict) -> list:
+    if command['action'] == 'buy':
+        return ['buy', '--amount', str(command['amount']), '--price', str(command['price'])]
+    if command['action'] == 'sell':
+        return ['sell', '--btc-amount', str(command['btc_amount']), '--price', str(command['price'])]
+    return [command['action']]
+
+def process_per_call(script: list, argvs: list) -> dict:
+    start = time.perf_counter()
+    for argv in argvs:
+        subprocess.run([sys.executable] + script + argv, check=True, stdout=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    return {'commands': len(argvs), 'commands_per_s': round(len(argvs) / elapsed, 1),
+            'ms_per_command': round(elapsed / len(argvs) * 1000, 2)}
+
+def pipe_request_response(args: list, commands: list) -> dict:
+    """一问一答：每写入一条命令就等待它的结果行"""
+    process = subprocess.Popen([sys.executable] + args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    start = time.perf_counter()
+    results = []
+    for command in commands:
+        process.stdin.write(json.dumps(command) + '\n')
+        process.stdin.flush()
+        results.append(json.loads(process.stdout.readline()))
+    elapsed = time.perf_counter() - start
+    process.stdin.close()
+    process.wait()
+    return {'commands': len(commands), 'commands_per_s': round(len(commands) / elapsed, 1),
+            'ms_per_command': round(elapsed / len(commands) * 1000, 3)}, results
+
+def pipe_streaming(args: list, commands: list) -> tuple:
+    """流式：后台线程写入全部命令，同时读取结果（含进程启动时间）"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+    def write():
+        for command in commands:
+            process.stdin.write(json.dumps(command) + '\n')
+        process.stdin.close()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    results = [json.loads(line) for line in process.stdout]
+    writer.join()
+    process.wait()
+    elapsed = time.perf_counter() - start
+    return {'commands': len(commands), 'commands_per_s': round(len(commands) / elapsed, 1),
+            'ms_per_command': round(elapsed / len(commands) * 1000, 4)}, results
+
+def replay(commands: list) -> list:
+    service = trading_tool.BTCTradingService()
+    return [trading_tool.execute_command(service, command) for command in commands]
+
+def bench_trading(calls: int, pipe_commands: int) -> dict:
+    script = [f'{TOOLS_DIR}/btc-trading-tool.py']
+    # 最后一条命令查询余额，用于与进程内重放比对
+    commands = trading_commands(pipe_commands) + [{'id': pipe_commands, 'action': 'balance'}]
+    per_call = process_per_call(script, [_argv(command) for command in commands[:calls]])
+    request_response, _ = pipe_request_response(script + ['pipe'], commands[:min(len(commands), 5000)])
+    streaming, results = pipe_streaming(script + ['pipe'], commands)
+    return {
+        'process_per_call': per_call,
+        'pipe_request_response': request_response,
+        'pipe_streaming': streaming,
+        'speedup_streaming': round(streaming['commands_per_s'] / per_call['commands_per_s'], 1),
+        'all_succeeded': all(result.get('success') for result in results),
+        'ids_in_order': [result['id'] for result in results] == [command['id'] for command in commands],
+        'final_balance': results[-1]['balance'],
+        'balance_matches_replay': results[-1]['balance'] == replay(commands)[-1]['balance']
+    }
+
+def bench_price(calls: int, pipe_commands: int) -> dict:
+    with StubExchangeServer() as server:
+        per_call_code = PRICE_CALL.format(tools_dir=TOOLS_DIR, endpoints=server.endpoints)
+        per_call = process_per_call(['-c', per_call_code], [[] for _ in range(calls)])
+        pipe_code = PRICE_PIPE.format(tools_dir=TOOLS_DIR, endpoints=server.endpoints)
+        request_response, results = pipe_request_response(['-c', pipe_code], [{'id': i} for i in range(pipe_commands)])
+    return {
+        'process_per_call': per_call,
+        'pipe_request_response': request_response,
+        'speedup': round(request_response['commands_per_s'] / per_call['commands_per_s'], 1),
+        'all_succeeded': all(result.get('success') for result in results)
+    }
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='NDJSON pipe mode benchmark')
+    parser.add_argument('--calls', type=int, default=30, help='Process-per-call invocations per tool')
+    parser.add_argument('--commands', type=int, default=20000, help='Trading commands streamed through one pipe process')
+    parser.add_argument('--price-commands', type=int, default=500, help='Price commands sent through one pipe process')
+    args = parser.parse_args()
+    print(json.dumps({
+        'trading': bench_trading(args.calls, args.commands),
+        'price': bench_price(args.calls, args.price_commands)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+批量下单基准测试
+对比逐笔调用与批量接口的下单吞吐：进程内（内存余额 / 订单账本）和常驻服务（每笔一个HTTP请求 / 一个批量请求），
+并确认两种方式的最终余额一致
+"""
+
+import argparse
+import http.client
+import json
+import os
+import tempfile
+import time
+
+from bench_tool_daemon import _daemon, _free_port
+from order_ledger import OrderLedger
+from tool_loader import TOOLS_DIR, load_tool
+
+trading_tool = load_tool('btc-trading-tool.py')
+
+def make_orders(count: int) -> list:
+    """交替买入和卖出，价格小幅波动；其中一部分卖单会因BTC不足被拒"""
+    orders = []
+    for i in range(count):
+        price = 100000.0 + (i % 50) * 10
+        if i % 3 == 2:
+            orders.append({'action': 'sell', 'btc_amount': 0.0015, 'price': price})
+        else:
+            orders.append({'action': 'buy', 'amount': 50.0, 'price': price})
+    return orders
+
+def single_calls(service, orders: list):
+    for order in orders:
+        if order['action'] == 'buy':
+            service.execute_buy_order(order['amount'], order['price'])
+        else:
+            service.execute_sell_order(order['btc_amount'], order['price'])
+
+def in_process(orders: list, batch_size: int, ledger: bool) -> dict:
+    result = {}
+    balances = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ('single', 'batch'):
+            service = trading_tool.BTCTradingService(OrderLedger(os.path.join(tmp, mode)) if ledger else None)
+            start = time.perf_counter()
+            if mode == 'single':
+                single_calls(service, orders)
+            else:
+                for i in range(0, len(orders), batch_size):
+                    service.execute_batch(orders[i:i + batch_size])
+            elapsed = time.perf_counter() - start
+            result[f'{mode}_orders_per_s'] = round(len(orders) / elapsed)
+            balances[mode] = dict(service.balance)
+            if service.ledger:
+                service.ledger.close()
+    result['speedup'] = round(result['batch_orders_per_s'] / result['single_orders_per_s'], 2)
+    result['balances_match'] = balances['single'] == balances['batch']
+    return result
+
+def over_http(orders: list, batch_size: int) -> dict:
+    result = {}
+    trading_path = os.path.join(TOOLS_DIR, 'btc-trading-tool.py')
+    for mode in ('single', 'batch'):
+        port = _free_port()
+        daemon = _daemon([trading_path, 'serve'], port)
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        headers = {'Content-Type': 'application/json'}
+        try:
+            start = time.perf_counter()
+            if mode == 'single':
+                for order in orders:
+                    path = '/buy' if order['action'] == 'buy' else '/sell'
+                    conn.request('POST', path, json.dumps(order), headers)
+                    conn.getresponse().read()
+            else:
+                for i in range(0, len(orders), batch_size):
+                    conn.request('POST', '/orders/batch', json.dumps({'orders': orders[i:i + batch_size]}), headers)
+                    conn.getresponse().read()
+            elapsed = time.perf_counter() - start
+            conn.request('GET', '/balance')
+            result[f'{mode}_balance'] = json.loads(conn.getresponse().read())['balance']
+        finally:
+            conn.close()
+            daemon.terminate()
+            daemon.wait()
+        result[f'{mode}_orders_per_s'] = round(len(orders) / elapsed)
+    result['speedup'] = round(result['batch_orders_per_s'] / result['single_orders_per_s'], 2)
+    result['balances_match'] = result.pop('single_balance') == result.pop('batch_balance')
+    return result
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Batch order benchmark')
+    parser.add_argument('--orders', type=int, default=30000, help='Orders per in-process run')
+    parser.add_argument('--http-orders', type=int, default=3000, help='Orders per daemon run')
+    parser.add_argument('--batch-size', type=int, default=500, help='Orders per batch call')
+    args = parser.parse_args()
+
+    orders = make_orders(args.orders)
+    print(json.dumps({
+        'orders': args.orders,
+        'batch_size': args.batch_size,
+        'in_memory': in_process(orders, args.batch_size, ledger=False),
+        'ledger': in_process(orders, args.batch_size, ledger=True),
+        'daemon_http': over_http(orders[:args.http_orders], args.batch_size)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -4,181 +4,822 @@ BTC价格查询工具
 从多个数据源获取实时BTC价格信息
 """
 
-import requests
+import asyncio
+import aiohttp
+import functools
+from aiohttp import web
 import json
+import sys
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 
-class BTCPriceService:
-    """BTC价格服务类"""
-    
-    def __init__(self):
-        self.sources = {
-            'coingecko': {
-                'url': 'https://api.coingecko.com/api/v3/simple/price',
-                'params': {
-                    'ids': 'bitcoin',
-                    'vs_currencies': 'usd',
-                    'include_24hr_change': 'true',
-                    'include_24hr_vol': 'true',
-                    'include_last_updated_at': 'true'
-                }
-            },
-            'binance': {
-                'url': 'https://api.binance.com/api/v3/ticker/24hr',
-                'params': {'symbol': 'BTCUSDT'}
-            },
-            'coinbase': {
-                'url': 'https://api.coinbase.com/v2/exchange-rates',
-                'params': {'currency': 'BTC'}
-            }
+from price_cache import PriceCache
+from price_depth import DepthFeed
+from price_history import PriceHistory
+from price_indicators import IncrementalIndicators
+from price_ingest import IngestionEngine, RestPollFeed, build_feeds
+from price_scheduler import PollScheduler, ScheduledPoller, TokenBucket, build_buckets
+from price_sessions import SessionPool, LoopThread
+from price_symbols import BATCH_PARSERS, batch_params, per_symbol, resolve_symbols
+from price_thresholds import CrossingNotifier, ThresholdIndex
+from source_health import SourceHealth
+
+DEFAULT_SOURCES = {
+    'coingecko': {
+        'url': 'https://api.coingecko.com/api/v3/simple/price',
+        'params': {
+            'ids': 'bitcoin',
+            'vs_currencies': 'usd',
+            'include_24hr_change': 'true',
+            'include_24hr_vol': 'true',
+            'include_last_updated_at': 'true'
+        }
+    },
+    'binance': {
+        'url': 'https://api.binance.com/api/v3/ticker/24hr',
+        'params': {'symbol': 'BTCUSDT'}
+    },
+    'coinbase': {
+        'url': 'https://api.coinbase.com/v2/exchange-rates',
+        'params': {'currency': 'BTC'}
+    }
+}
+
+def build_sources(endpoints: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, Any]]:
+    """构建数据源配置，endpoints可覆盖各数据源的URL（如本地模拟交易所）"""
+    sources = {}
+    for name, config in DEFAULT_SOURCES.items():
+        sources[name] = {
+            'url': (endpoints or {}).get(name, config['url']),
+            'params': dict(config['params'])
         }
+    return sources
+
+class AsyncBTCPriceService:
+    """异步BTC价格服务类，并发查询多个数据源"""
     
-    def get_price_from_coingecko(self) -> Optional[Dict[str, Any]]:
-        """从CoinGecko获取BTC价格"""
-        try:
-            response = requests.get(
-                self.sources['coingecko']['url'],
-                params=self.sources['coingecko']['params'],
-                timeout=10
-            )
+    def __init__(self, endpoints: Optional[Dict[str, str]] = None, timeout: float = 10,
+                 pool: Optional[SessionPool] = None, cache: Optional[PriceCache] = None,
+                 adaptive: bool = True, health_options: Optional[Dict[str, Any]] = None,
+                 quorum: int = 0, quorum_tolerance: float = 0.005, hedge: bool = False,
+                 tick_store: Optional[Any] = None):
+        self.sources = build_sources(endpoints)
+        # quorum>0 时，只要有 quorum 个数据源的价格在 quorum_tolerance（相对偏差）内一致就立即返回
+        self.quorum = quorum
+        self.quorum_tolerance = quorum_tolerance
+        # hedge 时，超过该数据源p95延迟仍未返回的请求会再发一个副本，取先成功的结果
+        self.hedge = hedge
+        self.hedged_requests = 0
+        # 本进程内观测到的报价历史（常驻服务中跨调用保留），用于K线和补齐24小时统计
+        self.history = PriceHistory()
+        # 随历史增量更新的技术指标，每次聚合结果都带上当前值，供工作流条件节点直接判断
+        self.indicators = IncrementalIndicators()
+        self.timeout = timeout  # 超时上限；adaptive 时实际超时随各数据源的p99调整
+        self.health = {
+            name: SourceHealth(name, max_timeout=timeout, adaptive=adaptive, **(health_options or {}))
+            for name in self.sources
+        }
+        # 多币种批量请求单独记录健康状态：批量请求失败不会熔断BTC单币种查询
+        self.batch_health = {
+            name: SourceHealth(f'{name}-batch', max_timeout=timeout, adaptive=adaptive, **(health_options or {}))
+            for name in self.sources
+        }
+        self.pool = pool or SessionPool()
+        self.cache = cache
+        # 持久化的tick存储（tick_store.TickStore）：每次上游查询的聚合价格和各数据源价格、以及接入的行情都追加进去
+        self.tick_store = tick_store
+        self.ingestion: Optional[IngestionEngine] = None
+        self.depth: Optional[DepthFeed] = None
+        # 各数据源的请求预算（令牌桶），为空时不限制
+        self.budgets: Dict[str, TokenBucket] = {}
+        self.poller: Optional[ScheduledPoller] = None
+        # 所有订阅方的买卖阈值；每个报价只找出被穿越的订阅，由 notifier 批量推送
+        self.thresholds: Optional[ThresholdIndex] = None
+        self.notifier: Optional[CrossingNotifier] = None
+    
+    def enable_ingestion(self, ws_endpoints: Optional[Dict[str, str]] = None,
+                         coingecko_interval: float = 15.0) -> IngestionEngine:
+        """启用WebSocket行情接入：Binance/Coinbase订阅ticker，CoinGecko低频REST轮询；
+        之后 get_aggregated_price 直接读内存报价表。需要在事件循环中调用 ingestion.start()"""
+        feeds = build_feeds(ws_endpoints) + [
+            RestPollFeed('coingecko', self.get_price_from_coingecko, coingecko_interval)
+        ]
+        self.ingestion = IngestionEngine(feeds)
+        self.ingestion.add_listener(self._on_ingested_quote)
+        return self.ingestion
+    
+    def _on_ingested_quote(self, source: str, quote: Dict[str, Any]):
+        # 历史、指标和阈值只看各数据源的聚合价格，交易所之间的价差不会被当成价格变动；
+        # 成交量取本次推送的最近成交数量。tick存储保留各数据源的原始报价
+        price = self.ingested_mid_price()
+        if price is not None:
+            self.record_tick(price, quote.get('last_size', 0.0))
+        if self.tick_store is not None:
+            self.tick_store.append(time.time(), source, quote['price'], quote.get('last_size', 0.0))
+    
+    def ingested_mid_price(self) -> Optional[float]:
+        """内存报价表中各数据源未过期报价的均价（与 aggregate_prices 一致），没有报价时返回None"""
+        table = self.ingestion.table
+        prices = [quote['price'] for quote in (table.get(source) for source in table.fresh_sources())
+                  if quote and quote.get('price')]
+        return sum(prices) / len(prices) if prices else None
+    
+    def enable_depth(self, snapshot_url: Optional[str] = None, stream_url: Optional[str] = None) -> DepthFeed:
+        """启用本地L2深度簿（Binance快照 + 增量推送），需要在事件循环中调用 depth.start()"""
+        self.depth = DepthFeed(snapshot_url=snapshot_url, stream_url=stream_url)
+        return self.depth
+    
+    def enable_scheduler(self, thresholds: Sequence[float] = (),
+                         rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                         **options) -> ScheduledPoller:
+        """启用自适应轮询：离阈值越近、波动越大轮询越快，并按交易所启用请求预算；
+        之后 get_aggregated_price 直接返回最近一次轮询结果。需要在事件循环中调用 poller.start()"""
+        self.budgets = build_buckets(rate_limits, list(self.sources))
+        scheduler = PollScheduler(thresholds, **options)
+        scheduler.index = self.thresholds
+        self.poller = ScheduledPoller(scheduler, self.fetch_aggregated_price, self.budgets)
+        return self.poller
+    
+    def enable_thresholds(self, notify_url: Optional[str] = None, auth_token: Optional[str] = None,
+                          hysteresis: float = 0.001, **options) -> ThresholdIndex:
+        """启用阈值订阅索引；notify_url（后端API地址，含 /api）给出时把触发批量推送到工作流事件接口。
+        hysteresis 为触发后价格需回到阈值外的相对幅度，之后才会再次触发"""
+        self.thresholds = ThresholdIndex(hysteresis)
+        if notify_url:
+            self.notifier = CrossingNotifier(notify_url, auth_token, **options)
+        if self.poller is not None:
+            self.poller.scheduler.index = self.thresholds
+        return self.thresholds
+    
+    def subscribe(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """新增阈值订阅，已处于触发区间的订阅立即推送；单个订阅二分插入，多个订阅合并后整体排序一次"""
+        if len(items) == 1:
+            item = items[0]
+            subscription, crossings = self.thresholds.add(
+                item.get('id'), item.get('buy'), item.get('sell'), item.get('target', 'trigger'),
+                item.get('event_type'), item.get('url'), item.get('data'))
+            added = [subscription]
+        else:
+            added, crossings = self.thresholds.add_many(items)
+        if self.notifier is not None:
+            self.notifier.enqueue(crossings)
+        return added
+    
+    def record_tick(self, price: float, volume: float = 0.0):
+        """记录一个报价tick：写入历史并增量更新指标"""
+        self.history.add(price, volume)
+        self.indicators.update(price, volume)
+        if self.thresholds is not None:
+            crossings = self.thresholds.update(price)
+            if crossings and self.notifier is not None:
+                self.notifier.enqueue(crossings)
+    
+    async def warm_up(self, connections: int = 1) -> Dict[str, bool]:
+        """预热各数据源的连接池"""
+        return await self.pool.warm_up(self.sources, connections, self.timeout)
+    
+    async def close(self):
+        """停止行情接入和轮询，等待后台缓存刷新完成并关闭连接池"""
+        if self.poller:
+            await self.poller.stop()
+        if self.notifier:
+            await self.notifier.close()
+        if self.ingestion:
+            await self.ingestion.stop()
+        if self.depth:
+            await self.depth.stop()
+        if self.cache:
+            await self.cache.drain()
+        if self.tick_store:
+            self.tick_store.flush()
+        await self.pool.close()
+    
+    def health_report(self) -> Dict[str, Dict[str, Any]]:
+        """各数据源的熔断状态、延迟百分位和当前超时"""
+        return {name: health.report() for name, health in self.health.items()}
+    
+    def batch_health_report(self) -> Dict[str, Dict[str, Any]]:
+        """各数据源多币种批量请求的熔断状态"""
+        return {name: health.report() for name, health in self.batch_health.items()}
+    
+    async def _fetch_json(self, source: str, timeout: float, params: Optional[Dict[str, str]] = None) -> Any:
+        """通过数据源自己的连接池请求并返回JSON（params 默认为BTC单币种查询参数）"""
+        async with self.pool.get(source).get(
+            self.sources[source]['url'],
+            params=params if params is not None else self.sources[source]['params'],
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
             response.raise_for_status()
-            data = response.json()
-            
-            bitcoin_data = data.get('bitcoin', {})
+            return await response.json(content_type=None)
+    
+    async def _fetch(self, source: str, parser, params: Optional[Dict[str, str]] = None,
+                     health: Optional[SourceHealth] = None) -> Optional[Dict[str, Any]]:
+        """获取并解析单个数据源，失败、熔断中或超出请求预算时返回None；health 默认为该数据源的BTC查询健康状态"""
+        bucket = self.budgets.get(source)
+        if bucket is not None and not bucket.try_acquire():
+            return None
+        health = health or self.health[source]
+        if not health.allow_request():
+            return None
+        start = time.monotonic()
+        try:
+            result = parser(await self._fetch_json(source, health.timeout(), params))
+        except asyncio.CancelledError:
+            health.record_cancelled()
+            raise
+        except Exception as e:
+            health.record_failure(repr(e))
+            print(f"{source} API error: {e!r}", file=sys.stderr)
+            return None
+        health.record_success(time.monotonic() - start)
+        return result
+    
+    @staticmethod
+    def _parse_coingecko(data: Dict[str, Any]) -> Dict[str, Any]:
+        bitcoin_data = data.get('bitcoin', {})
+        return {
+            'source': 'coingecko',
+            'price': bitcoin_data.get('usd'),
+            'change_24h': bitcoin_data.get('usd_24h_change'),
+            'volume_24h': bitcoin_data.get('usd_24h_vol'),
+            'last_updated': bitcoin_data.get('last_updated_at'),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _parse_binance(data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'source': 'binance',
+            'price': float(data.get('lastPrice', 0)),
+            'change_24h': float(data.get('priceChangePercent', 0)),
+            'volume_24h': float(data.get('volume', 0)),
+            'high_24h': float(data.get('highPrice', 0)),
+            'low_24h': float(data.get('lowPrice', 0)),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _parse_coinbase(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        rates = data.get('data', {}).get('rates', {})
+        usd_rate = rates.get('USD')
+        
+        if usd_rate:
+            price = 1 / float(usd_rate)  # BTC价格 = 1 / (USD/BTC汇率)
             return {
-                'source': 'coingecko',
-                'price': bitcoin_data.get('usd'),
-                'change_24h': bitcoin_data.get('usd_24h_change'),
-                'volume_24h': bitcoin_data.get('usd_24h_vol'),
-                'last_updated': bitcoin_data.get('last_updated_at'),
+                'source': 'coinbase',
+                'price': price,
                 'timestamp': datetime.now().isoformat()
             }
-        except Exception as e:
-            print(f"CoinGecko API error: {e}")
+        return None
+    
+    async def _fetch_hedged(self, source: str, parser, params: Optional[Dict[str, str]] = None,
+                            health: Optional[SourceHealth] = None) -> Optional[Dict[str, Any]]:
+        """对冲请求：主请求超过p95延迟仍未返回时发出副本，取先成功的一个，取消另一个"""
+        health = health or self.health[source]
+        hedge_after = health.percentile(95) if self.hedge else None
+        primary = asyncio.ensure_future(self._fetch(source, parser, params, health))
+        if hedge_after is None:
+            return await primary
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return primary.result()
+            self.hedged_requests += 1
+            pending.add(asyncio.ensure_future(self._fetch(source, parser, params, health)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result() is not None:
+                        return task.result()
             return None
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
     
-    def get_price_from_binance(self) -> Optional[Dict[str, Any]]:
+    async def get_price_from_coingecko(self) -> Optional[Dict[str, Any]]:
+        """从CoinGecko获取BTC价格"""
+        return await self._fetch_hedged('coingecko', self._parse_coingecko)
+    
+    async def get_price_from_binance(self) -> Optional[Dict[str, Any]]:
         """从Binance获取BTC价格"""
-        try:
-            response = requests.get(
-                self.sources['binance']['url'],
-                params=self.sources['binance']['params'],
-                timeout=10
+        return await self._fetch_hedged('binance', self._parse_binance)
+    
+    async def get_price_from_coinbase(self) -> Optional[Dict[str, Any]]:
+        """从Coinbase获取BTC价格"""
+        return await self._fetch_hedged('coinbase', self._parse_coinbase)
+    
+    async def get_aggregated_price(self) -> Dict[str, Any]:
+        """获取聚合价格：优先读行情接入的内存报价表或自适应轮询的最新结果，其次读缓存，最后请求上游"""
+        if self.ingestion is not None:
+            result = self.get_ingested_price()
+            if result is not None:
+                return result
+        if self.poller is not None and self.poller.latest is not None:
+            return {**self.poller.latest, 'poll_age': round(self.poller.age(), 3)}
+        if not self.cache:
+            return await self.fetch_aggregated_price()
+        value, age = await self.cache.get(self._cache_key('aggregated'), self.fetch_aggregated_price)
+        return {**value, 'cache_age': round(age, 3)}
+    
+    def _cache_key(self, name: str, quorum: bool = True) -> str:
+        """缓存key带上影响结果的聚合设置（法定数量和容差、对冲请求），
+        共用缓存目录的进程按不同设置查询时不会读到对方的结果"""
+        if quorum and self.quorum > 0:
+            name += f'-quorum{self.quorum}-tol{self.quorum_tolerance:g}'
+        if self.hedge:
+            name += '-hedged'
+        return name
+    
+    def get_ingested_price(self) -> Optional[Dict[str, Any]]:
+        """从内存报价表聚合价格，没有可用报价时返回None"""
+        table = self.ingestion.table
+        result = aggregate_prices(table.get('coingecko'), table.get('binance'), table.get('coinbase'))
+        if not result['success']:
+            return None
+        self.history.fill_missing(result)
+        result['indicators'] = self.indicators.snapshot()
+        return result
+    
+    async def fetch_aggregated_price(self) -> Dict[str, Any]:
+        """并发获取所有数据源并聚合，耗时约等于最慢的健康数据源；结果记入本地历史"""
+        if self.quorum > 0:
+            result = await self.fetch_quorum_price()
+        else:
+            coingecko_data, binance_data, coinbase_data = await asyncio.gather(
+                self.get_price_from_coingecko(),
+                self.get_price_from_binance(),
+                self.get_price_from_coinbase()
             )
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                'source': 'binance',
-                'price': float(data.get('lastPrice', 0)),
-                'change_24h': float(data.get('priceChangePercent', 0)),
-                'volume_24h': float(data.get('volume', 0)),
-                'high_24h': float(data.get('highPrice', 0)),
-                'low_24h': float(data.get('lowPrice', 0)),
-                'timestamp': datetime.now().isoformat()
+            result = aggregate_prices(coingecko_data, binance_data, coinbase_data)
+        if result['success']:
+            self.record_tick(result['price'])
+            if self.tick_store is not None:
+                self.tick_store.append_quote(result)
+            self.history.fill_missing(result)
+            result['indicators'] = self.indicators.snapshot()
+        return result
+
+    async def fetch_prices(self, symbols: List[str]) -> Dict[str, Any]:
+        """多币种查询：每个数据源发一个批量请求（共3个，与币种数无关），返回每个币种的聚合价格"""
+        resolved = resolve_symbols(symbols)
+        if not resolved:
+            return {'success': False, 'error': 'No symbols given', 'timestamp': datetime.now().isoformat()}
+        names = list(self.sources)
+        results = await asyncio.gather(*(
+            self._fetch_hedged(name, functools.partial(BATCH_PARSERS[name], symbols=resolved),
+                               batch_params(name, resolved), self.batch_health[name])
+            for name in names
+        ))
+        quotes = dict(zip(names, results))
+        prices = {symbol: aggregate_prices(*per_symbol(quotes, symbol)) for symbol in resolved}
+        return {
+            'success': any(price['success'] for price in prices.values()),
+            'symbols': prices,
+            'sources_responded': sum(1 for result in results if result is not None),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    async def get_prices(self, symbols: List[str]) -> Dict[str, Any]:
+        """多币种聚合价格，启用缓存时按币种集合共享"""
+        if not self.cache:
+            return await self.fetch_prices(symbols)
+        # 多币种查询不使用法定数量提前返回，只有对冲设置影响结果
+        key = self._cache_key('prices-' + '_'.join(sorted(resolve_symbols(symbols))), quorum=False)
+        value, age = await self.cache.get(key, lambda: self.fetch_prices(symbols))
+        return {**value, 'cache_age': round(age, 3)}
+    
+    async def fetch_quorum_price(self) -> Dict[str, Any]:
+        """法定数聚合：quorum 个数据源价格一致时立即返回，取消其余在途请求"""
+        fetchers = {
+            'coingecko': self.get_price_from_coingecko,
+            'binance': self.get_price_from_binance,
+            'coinbase': self.get_price_from_coinbase
+        }
+        tasks = {asyncio.ensure_future(fetch()): name for name, fetch in fetchers.items()}
+        pending = set(tasks)
+        received: Dict[str, Dict[str, Any]] = {}
+        agreed: list = []
+        try:
+            while pending and len(agreed) < self.quorum:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    data = task.result()
+                    if data and data['price']:
+                        received[tasks[task]] = data
+                agreed = agreeing_sources(received, self.quorum_tolerance)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        # 达到法定数时只用一致的数据源聚合，剔除偏离的报价；否则退化为使用全部已返回的数据源
+        used = agreed if len(agreed) >= self.quorum else list(received)
+        result = aggregate_prices(*(received.get(name) if name in used else None for name in fetchers))
+        if result['success']:
+            result['quorum'] = {
+                'required': self.quorum,
+                'reached': len(agreed) >= self.quorum,
+                'responded': len(received),
+                'cancelled': [tasks[task] for task in pending]
             }
-        except Exception as e:
-            print(f"Binance API error: {e}")
-            return None
+        return result
+
+def agreeing_sources(received: Dict[str, Dict[str, Any]], tolerance: float) -> list:
+    """价格相对偏差在 tolerance 内的最大数据源集合"""
+    ordered = sorted(received.items(), key=lambda item: item[1]['price'])
+    best: list = []
+    start = 0
+    for end in range(len(ordered)):
+        while ordered[end][1]['price'] - ordered[start][1]['price'] > tolerance * ordered[start][1]['price']:
+            start += 1
+        if end - start + 1 > len(best):
+            best = [name for name, _ in ordered[start:end + 1]]
+    return best
+
+def aggregate_prices(coingecko_data: Optional[Dict[str, Any]],
+                     binance_data: Optional[Dict[str, Any]],
+                     coinbase_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """聚合各数据源的BTC价格数据"""
+    prices = []
+    sources_data = {}
+    
+    for data in (coingecko_data, binance_data, coinbase_data):
+        if data and data['price']:
+            prices.append(data['price'])
+            sources_data[data['source']] = data
+    
+    if not prices:
+        return {
+            'success': False,
+            'error': 'Unable to fetch price from any source',
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    # 计算平均价格
+    avg_price = sum(prices) / len(prices)
+    
+    # 使用CoinGecko的额外数据（如果可用）
+    primary_data = coingecko_data or binance_data or coinbase_data
+    
+    return {
+        'success': True,
+        'price': round(avg_price, 2),
+        'price_sources': len(prices),
+        'change_24h': primary_data.get('change_24h', 0) if primary_data else 0,
+        'volume_24h': primary_data.get('volume_24h', 0) if primary_data else 0,
+        'high_24h': binance_data.get('high_24h', 0) if binance_data else 0,
+        'low_24h': binance_data.get('low_24h', 0) if binance_data else 0,
+        'timestamp': datetime.now().isoformat(),
+        'sources': sources_data,
+        'price_variance': max(prices) - min(prices) if len(prices) > 1 else 0
+    }
+
+class BTCPriceService:
+    """BTC价格服务类（同步接口，内部委托给AsyncBTCPriceService）"""
+    
+    def __init__(self, endpoints: Optional[Dict[str, str]] = None, timeout: float = 10,
+                 pool: Optional[SessionPool] = None, cache: Optional[PriceCache] = None, **options):
+        self.async_service = AsyncBTCPriceService(endpoints, timeout, pool, cache, **options)
+        self.sources = self.async_service.sources
+        # 会话池绑定在后台事件循环上，多次轮询复用同一批keep-alive连接
+        self._loop_thread = LoopThread()
+    
+    def warm_up(self, connections: int = 1) -> Dict[str, bool]:
+        """预热各数据源的连接池"""
+        return self._loop_thread.run(self.async_service.warm_up(connections))
+    
+    def close(self):
+        """关闭连接池和后台事件循环"""
+        self._loop_thread.run(self.async_service.close())
+        self._loop_thread.stop()
+    
+    def get_price_from_coingecko(self) -> Optional[Dict[str, Any]]:
+        """从CoinGecko获取BTC价格"""
+        return self._loop_thread.run(self.async_service.get_price_from_coingecko())
+    
+    def get_price_from_binance(self) -> Optional[Dict[str, Any]]:
+        """从Binance获取BTC价格"""
+        return self._loop_thread.run(self.async_service.get_price_from_binance())
     
     def get_price_from_coinbase(self) -> Optional[Dict[str, Any]]:
         """从Coinbase获取BTC价格"""
-        try:
-            response = requests.get(
-                self.sources['coinbase']['url'],
-                params=self.sources['coinbase']['params'],
-                timeout=10
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            rates = data.get('data', {}).get('rates', {})
-            usd_rate = rates.get('USD')
-            
-            if usd_rate:
-                price = 1 / float(usd_rate)  # BTC价格 = 1 / (USD/BTC汇率)
-                return {
-                    'source': 'coinbase',
-                    'price': price,
-                    'timestamp': datetime.now().isoformat()
-                }
-        except Exception as e:
-            print(f"Coinbase API error: {e}")
-            return None
+        return self._loop_thread.run(self.async_service.get_price_from_coinbase())
     
     def get_aggregated_price(self) -> Dict[str, Any]:
         """获取聚合的BTC价格数据"""
-        prices = []
-        sources_data = {}
-        
-        # 从多个源获取价格
-        coingecko_data = self.get_price_from_coingecko()
-        if coingecko_data and coingecko_data['price']:
-            prices.append(coingecko_data['price'])
-            sources_data['coingecko'] = coingecko_data
-        
-        binance_data = self.get_price_from_binance()
-        if binance_data and binance_data['price']:
-            prices.append(binance_data['price'])
-            sources_data['binance'] = binance_data
-        
-        coinbase_data = self.get_price_from_coinbase()
-        if coinbase_data and coinbase_data['price']:
-            prices.append(coinbase_data['price'])
-            sources_data['coinbase'] = coinbase_data
-        
-        if not prices:
-            return {
-                'success': False,
-                'error': 'Unable to fetch price from any source',
-                'timestamp': datetime.now().isoformat()
-            }
-        
-        # 计算平均价格
-        avg_price = sum(prices) / len(prices)
-        
-        # 使用CoinGecko的额外数据（如果可用）
-        primary_data = coingecko_data or binance_data or coinbase_data
-        
-        result = {
-            'success': True,
-            'price': round(avg_price, 2),
-            'price_sources': len(prices),
-            'change_24h': primary_data.get('change_24h', 0) if primary_data else 0,
-            'volume_24h': primary_data.get('volume_24h', 0) if primary_data else 0,
-            'high_24h': binance_data.get('high_24h', 0) if binance_data else 0,
-            'low_24h': binance_data.get('low_24h', 0) if binance_data else 0,
-            'timestamp': datetime.now().isoformat(),
-            'sources': sources_data,
-            'price_variance': max(prices) - min(prices) if len(prices) > 1 else 0
+        return self._loop_thread.run(self.async_service.get_aggregated_price())
+    
+    def get_prices(self, symbols: List[str]) -> Dict[str, Any]:
+        """多币种聚合价格（每轮3个HTTP请求）"""
+        return self._loop_thread.run(self.async_service.get_prices(symbols))
+
+def execute_command(service: BTCPriceService, command: Dict[str, Any]) -> Dict[str, Any]:
+    """执行管道模式的一条命令：action 为 price（默认，聚合价格）、source（单个数据源，source 字段指定）、
+    prices（多币种，symbols 为列表或逗号分隔字符串）、indicators 或 sources（数据源健康状态）"""
+    action = command.get('action', 'price')
+    if action == 'price':
+        return service.get_aggregated_price()
+    if action == 'source':
+        fetchers = {
+            'coingecko': service.get_price_from_coingecko,
+            'binance': service.get_price_from_binance,
+            'coinbase': service.get_price_from_coinbase
         }
+        source = command.get('source', 'coingecko')
+        if source not in fetchers:
+            return {'success': False, 'error': f'Unknown source: {source}'}
+        result = fetchers[source]()
+        return {'success': True, **result} if result else {'success': False, 'error': f'{source} unavailable'}
+    if action == 'prices':
+        symbols = command.get('symbols', 'BTC')
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+        return service.get_prices([symbol for symbol in symbols if str(symbol).strip()])
+    if action == 'indicators':
+        return {'success': True, 'indicators': service.async_service.indicators.snapshot()}
+    if action == 'sources':
+        return {'success': True, 'sources': service.async_service.health_report(),
+                'batch_sources': service.async_service.batch_health_report()}
+    return {'success': False, 'error': f'Unknown action: {action}'}
+
+def create_price_app(service: AsyncBTCPriceService, stream_interval: float = 1.0) -> web.Application:
+    """创建价格常驻服务：GET /price 聚合价格，GET /price/{source} 单个数据源，
+    GET /stream/sse 与 GET /stream/ws 推送价格变化，GET /scheduler 自适应轮询状态，
+    /subscriptions 管理阈值订阅"""
+    from price_stream import QuoteBroadcaster, sse_handler, websocket_handler
+    from tool_daemon import LatencyRecorder, create_app, read_params
+    
+    if service.ingestion is not None:
+        # 行情由WebSocket推入：每次报价更新都尝试广播，价格未变化时 publish 会忽略
+        broadcaster = QuoteBroadcaster()
         
-        return result
+        def on_quote(source: str, quote: Dict[str, Any]):
+            if broadcaster.subscriber_count:
+                result = service.get_ingested_price()
+                if result is not None:
+                    broadcaster.publish(result)
+        
+        service.ingestion.add_listener(on_quote)
+    else:
+        broadcaster = QuoteBroadcaster(service.get_aggregated_price, stream_interval)
+    
+    fetchers = {
+        'coingecko': service.get_price_from_coingecko,
+        'binance': service.get_price_from_binance,
+        'coinbase': service.get_price_from_coinbase
+    }
+    
+    async def aggregated(request: web.Request) -> web.Response:
+        return web.json_response(await service.get_aggregated_price())
+    
+    async def multi_symbol(request: web.Request) -> web.Response:
+        symbols = [symbol for symbol in request.query.get('symbols', 'BTC').split(',') if symbol.strip()]
+        return web.json_response(await service.get_prices(symbols))
+    
+    async def single_source(request: web.Request) -> web.Response:
+        source = request.match_info['source']
+        if source not in fetchers:
+            return web.json_response({'error': f'Unknown source: {source}'}, status=404)
+        return web.json_response(await fetchers[source]())
+    
+    async def on_startup(app: web.Application):
+        await service.warm_up()
+        if service.ingestion is not None:
+            await service.ingestion.start()
+        if service.depth is not None:
+            await service.depth.start()
+        if service.poller is not None:
+            service.poller.start()
+    
+    async def source_health(request: web.Request) -> web.Response:
+        return web.json_response({'success': True, 'sources': service.health_report(),
+                                  'batch_sources': service.batch_health_report()})
+    
+    async def history_stats(request: web.Request) -> web.Response:
+        return web.json_response({'success': True, 'stats': service.history.stats()})
+    
+    async def history_candles(request: web.Request) -> web.Response:
+        interval = request.query.get('interval', '1m')
+        series = service.history.candles.get(interval)
+        if series is None:
+            return web.json_response({'error': f'Unknown interval: {interval}'}, status=400)
+        try:
+            limit = int(request.query.get('limit', 60))
+        except ValueError:
+            return web.json_response({'error': 'Invalid limit'}, status=400)
+        return web.json_response({'success': True, 'interval': interval, 'candles': series.latest(limit)})
+    
+    async def indicators(request: web.Request) -> web.Response:
+        return web.json_response({'success': True, 'indicators': service.indicators.snapshot()})
+    
+    async def ingestion_stats(request: web.Request) -> web.Response:
+        if service.ingestion is None:
+            return web.json_response({'success': False, 'error': 'Ingestion is not enabled'}, status=404)
+        return web.json_response({'success': True, 'feeds': service.ingestion.stats()})
+    
+    async def scheduler_stats(request: web.Request) -> web.Response:
+        if service.poller is None:
+            return web.json_response({'success': False, 'error': 'Scheduler is not enabled'}, status=404)
+        return web.json_response({'success': True, **service.poller.stats()})
+    
+    def _thresholds():
+        if service.thresholds is None:
+            raise web.HTTPNotFound(text='Threshold subscriptions are not enabled')
+        return service.thresholds
+    
+    async def subscriptions(request: web.Request) -> web.Response:
+        stats = {'success': True, 'index': _thresholds().stats()}
+        if service.notifier is not None:
+            stats['notifier'] = service.notifier.stats()
+        return web.json_response(stats)
+    
+    async def subscribe(request: web.Request) -> web.Response:
+        _thresholds()
+        params = await read_params(request)
+        items = params['subscriptions'] if isinstance(params.get('subscriptions'), list) else [params]
+        try:
+            added = service.subscribe(items)
+        except (ValueError, TypeError, AttributeError) as e:
+            return web.json_response({'error': str(e)}, status=400)
+        return web.json_response({'success': True, 'subscriptions': added})
+    
+    async def unsubscribe(request: web.Request) -> web.Response:
+        removed = _thresholds().remove(request.match_info['subscription_id'])
+        if not removed:
+            return web.json_response({'error': 'Subscription not found'}, status=404)
+        return web.json_response({'success': True})
+    
+    def _depth_book():
+        if service.depth is None:
+            raise web.HTTPNotFound(text='Depth is not enabled')
+        if not service.depth.book.synced:
+            raise web.HTTPServiceUnavailable(text='Depth book is not synced')
+        return service.depth.book
+    
+    async def depth(request: web.Request) -> web.Response:
+        try:
+            levels = int(request.query.get('levels', 20))
+        except ValueError:
+            return web.json_response({'error': 'Invalid levels'}, status=400)
+        return web.json_response({'success': True, 'depth': _depth_book().snapshot(levels),
+                                  'feed': service.depth.stats()})
+    
+    async def depth_fill(request: web.Request) -> web.Response:
+        action = request.query.get('action', 'buy')
+        if action not in ('buy', 'sell'):
+            return web.json_response({'error': f'Invalid action: {action}'}, status=400)
+        try:
+            btc_amount = float(request.query['btc_amount']) if request.query.get('btc_amount') else None
+            usd_amount = float(request.query['usd_amount']) if request.query.get('usd_amount') else None
+        except ValueError:
+            return web.json_response({'error': 'Invalid amount'}, status=400)
+        if (btc_amount is None) == (usd_amount is None) or (btc_amount or usd_amount) <= 0:
+            return web.json_response({'error': 'Fill requires one of btc_amount or usd_amount'}, status=400)
+        return web.json_response({'success': True, **_depth_book().fill(action, btc_amount, usd_amount)})
+    
+    async def stream_sse(request: web.Request) -> web.StreamResponse:
+        return await sse_handler(broadcaster, request)
+    
+    async def stream_ws(request: web.Request) -> web.WebSocketResponse:
+        return await websocket_handler(broadcaster, request)
+    
+    async def on_cleanup(app: web.Application):
+        await broadcaster.close()
+        await service.close()
+    
+    app = create_app(LatencyRecorder())
+    app.router.add_get('/price', aggregated)
+    app.router.add_get('/price/{source}', single_source)
+    app.router.add_get('/prices', multi_symbol)
+    app.router.add_get('/stream/sse', stream_sse)
+    app.router.add_get('/stream/ws', stream_ws)
+    app.router.add_get('/ingestion', ingestion_stats)
+    app.router.add_get('/scheduler', scheduler_stats)
+    app.router.add_get('/subscriptions', subscriptions)
+    app.router.add_post('/subscriptions', subscribe)
+    app.router.add_delete('/subscriptions/{subscription_id}', unsubscribe)
+    app.router.add_get('/sources', source_health)
+    app.router.add_get('/history/stats', history_stats)
+    app.router.add_get('/history/candles', history_candles)
+    app.router.add_get('/indicators', indicators)
+    app.router.add_get('/depth', depth)
+    app.router.add_get('/depth/fill', depth_fill)
+    app['broadcaster'] = broadcaster
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
 
 def main():
     """主函数 - 命令行接口"""
-    import sys
-    
-    service = BTCPriceService()
-    
-    if len(sys.argv) > 1 and sys.argv[1] == '--source':
-        # 指定数据源
-        source = sys.argv[2] if len(sys.argv) > 2 else 'coingecko'
-        if source == 'coingecko':
-            result = service.get_price_from_coingecko()
-        elif source == 'binance':
-            result = service.get_price_from_binance()
-        elif source == 'coinbase':
-            result = service.get_price_from_coinbase()
-        else:
-            result = {'error': f'Unknown source: {source}'}
+    import argparse
+    import os
+    
+    parser = argparse.ArgumentParser(description='BTC Price Tool')
+    parser.add_argument('--source', nargs='?', const='coingecko', choices=['coingecko', 'binance', 'coinbase'], help='Query a single source')
+    parser.add_argument('--symbols', help='Comma-separated symbols (e.g. BTC,ETH,SOL) fetched with one request per source')
+    parser.add_argument('--cache-ttl', type=float, default=float(os.environ.get('BTC_PRICE_CACHE_TTL', 0)),
+                        help='Share aggregated prices across processes for this many seconds (0 disables)')
+    parser.add_argument('--cache-stale-ttl', type=float, default=float(os.environ.get('BTC_PRICE_CACHE_STALE_TTL', 30)),
+                        help='Serve an expired cached price for this long while refreshing in the background')
+    parser.add_argument('--cache-dir', default=None, help='Directory of the shared price cache')
+    parser.add_argument('--quorum', type=int, default=0,
+                        help='Return as soon as this many sources agree (0 waits for every source)')
+    parser.add_argument('--quorum-tolerance', type=float, default=0.005,
+                        help='Maximum relative price spread for sources to count as agreeing')
+    parser.add_argument('--hedge', action='store_true',
+                        help='Send a duplicate request to a source that is slower than its p95 latency')
+    parser.add_argument('--tick-store', nargs='?', const='', default=None,
+                        help='Append every upstream quote to the on-disk tick store (optionally in this directory)')
+    parser.add_argument('--serve', action='store_true', help='Run as a long-lived local HTTP service')
+    parser.add_argument('--pipe', action='store_true',
+                        help='Read NDJSON commands from stdin and write one JSON result line per command')
+    parser.add_argument('--host', default='127.0.0.1', help='Listen host for --serve')
+    parser.add_argument('--port', type=int, default=8701, help='Listen port for --serve')
+    parser.add_argument('--ingest', action='store_true',
+                        help='With --serve, keep exchange WebSocket ticker subscriptions and answer from memory')
+    parser.add_argument('--depth', action='store_true',
+                        help='With --serve, keep a local L2 order book from the Binance depth stream')
+    parser.add_argument('--depth-snapshot-url', help='Depth snapshot URL (defaults to Binance /api/v3/depth)')
+    parser.add_argument('--depth-stream-url', help='Depth diff WebSocket URL (defaults to Binance btcusdt@depth)')
+    parser.add_argument('--thresholds',
+                        help='With --serve, poll adaptively: faster near these comma-separated prices or when volatile')
+    parser.add_argument('--notify-url',
+                        help='With --serve, keep a threshold-subscription index and push crossings to this '
+                             'backend API base URL (including /api) in batches')
+    parser.add_argument('--notify-token', default=os.environ.get('WORKFLOW_API_TOKEN'),
+                        help='JWT used as the Bearer token for --notify-url')
+    parser.add_argument('--threshold-hysteresis', type=float, default=0.001,
+                        help='Relative move back past a threshold before a subscription can trigger again')
+    parser.add_argument('--min-interval', type=float, default=5.0, help='Shortest adaptive poll interval (seconds)')
+    parser.add_argument('--max-interval', type=float, default=300.0, help='Longest adaptive poll interval (seconds)')
+    parser.add_argument('--stream-interval', type=float, default=1.0,
+                        help='Upstream poll interval (seconds) while streaming clients are connected')
+    
+    args = parser.parse_args()
+    
+    cache = None
+    if args.cache_ttl > 0:
+        cache = PriceCache(args.cache_ttl, args.cache_stale_ttl, args.cache_dir)
+    
+    tick_store = None
+    if args.tick_store is not None:
+        from tick_store import TickStore  # 需要 numpy，只在启用 --tick-store 时导入
+        try:
+            tick_store = TickStore(args.tick_store or None)
+        except RuntimeError as e:
+            # 常驻服务已经在写同一个目录时，单次查询不再重复记录
+            print(f"Tick store disabled: {e}", file=sys.stderr)
+    
+    if args.serve:
+        from tool_daemon import run_app
+        async_service = AsyncBTCPriceService(cache=cache, quorum=args.quorum, quorum_tolerance=args.quorum_tolerance,
+                                             hedge=args.hedge, tick_store=tick_store)
+        if args.ingest:
+            async_service.enable_ingestion()
+        if args.depth:
+            async_service.enable_depth(args.depth_snapshot_url, args.depth_stream_url)
+        if args.notify_url:
+            async_service.enable_thresholds(args.notify_url, args.notify_token, args.threshold_hysteresis)
+        if args.thresholds or (args.notify_url and not args.ingest):
+            # 没有WebSocket行情时由自适应轮询提供报价，订阅方的阈值同样参与调整间隔
+            async_service.enable_scheduler([float(value) for value in (args.thresholds or '').split(',') if value.strip()],
+                                           min_interval=args.min_interval, max_interval=args.max_interval)
+        run_app(create_price_app(async_service, args.stream_interval), args.host, args.port)
+        return
+    
+    service = BTCPriceService(cache=cache, quorum=args.quorum, quorum_tolerance=args.quorum_tolerance,
+                              hedge=args.hedge, tick_store=tick_store)
+    
+    if args.pipe:
+        from tool_pipe import run_pipe
+        run_pipe(lambda command: execute_command(service, command))
+        service.close()
+        if tick_store is not None:
+            tick_store.close()
+        return
+    
+    if args.symbols:
+        result = service.get_prices(args.symbols.split(','))
+    elif args.source == 'coingecko':
+        result = service.get_price_from_coingecko()
+    elif args.source == 'binance':
+        result = service.get_price_from_binance()
+    elif args.source == 'coinbase':
+        result = service.get_price_from_coinbase()
     else:
         # 获取聚合价格
         result = service.get_aggregated_price()
     
-    print(json.dumps(result, indent=2))
+    print(json.dumps(result, indent=2), flush=True)
+    # 返回旧缓存值时，等后台刷新写回缓存后再退出
+    service.close()
+    if tick_store is not None:
+        tick_store.close()
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
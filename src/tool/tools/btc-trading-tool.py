@@ -4,16 +4,35 @@ BTC交易执行工具
 模拟BTC买入和卖出操作（实际使用时需要连接真实交易所API）
 """
 
+import functools
 import json
+import math
+import threading
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import uuid
 
+from account_engine import AccountBook
+from order_book import LimitOrderBook, RestingOrder
+from order_ledger import OrderLedger, KIND_CANCEL, KIND_FILL
+from depth_book import DepthBook
+
+def atomic_order(method):
+    """校验和余额变更在服务锁内完成，并发下单不会透支；启用账本时同时持有账本锁，多个进程共用账本时余额保持一致"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            if self.ledger is None:
+                return method(self, *args, **kwargs)
+            with self.ledger.transaction():
+                return method(self, *args, **kwargs)
+    return wrapper
+
 class BTCTradingService:
     """BTC交易服务类"""
     
-    def __init__(self):
+    def __init__(self, ledger: Optional[OrderLedger] = None, depth: Optional[DepthBook] = None):
         self.trading_enabled = True
         self.demo_mode = True  # 演示模式，不执行真实交易
         self.balance = {
@@ -21,12 +40,24 @@ class BTCTradingService:
             'btc': 0.0       # 模拟BTC余额
         }
         self.trading_fee = 0.001  # 0.1% 交易手续费
+        self._lock = threading.RLock()
+        # 订单账本：记录成交和撤单，余额在进程重启后从账本恢复（None 时余额只保存在内存中）
+        self.ledger = ledger
+        if ledger is not None:
+            ledger.attach(self.balance)
+        # 限价挂单：冻结的资金仍计入余额，但不能再用于下单；挂单只保存在内存中，进程重启后不恢复
+        self.order_book = LimitOrderBook()
+        self.locked = {'usd': 0.0, 'btc': 0.0}
+        self.last_price: Optional[float] = None  # 最近一次价格tick
+        # 本地L2深度簿：已同步时市价单按深度逐档成交（成交均价和滑点），否则按传入的价格成交
+        self.depth = depth
         
     def get_balance(self) -> Dict[str, Any]:
-        """获取账户余额"""
+        """获取账户余额（locked 为限价挂单冻结的部分）"""
         return {
             'success': True,
             'balance': self.balance.copy(),
+            'locked': self.locked.copy(),
             'timestamp': datetime.now().isoformat()
         }
     
@@ -35,17 +66,18 @@ class BTCTradingService:
         if not self.trading_enabled:
             return {'valid': False, 'error': 'Trading is disabled'}
         
-        if amount_usd <= 0:
+        if not math.isfinite(amount_usd) or amount_usd <= 0:
             return {'valid': False, 'error': 'Invalid amount'}
         
-        if btc_price <= 0:
+        if not math.isfinite(btc_price) or btc_price <= 0:
             return {'valid': False, 'error': 'Invalid BTC price'}
         
         total_cost = amount_usd * (1 + self.trading_fee)
-        if total_cost > self.balance['usd']:
+        available = self.balance['usd'] - self.locked['usd']
+        if total_cost > available:
             return {
                 'valid': False, 
-                'error': f'Insufficient USD balance. Required: ${total_cost:.2f}, Available: ${self.balance["usd"]:.2f}'
+                'error': f'Insufficient USD balance. Required: ${total_cost:.2f}, Available: ${available:.2f}'
             }
         
         btc_amount = amount_usd / btc_price
@@ -61,16 +93,17 @@ class BTCTradingService:
         if not self.trading_enabled:
             return {'valid': False, 'error': 'Trading is disabled'}
         
-        if btc_amount <= 0:
+        if not math.isfinite(btc_amount) or btc_amount <= 0:
             return {'valid': False, 'error': 'Invalid BTC amount'}
         
-        if btc_price <= 0:
+        if not math.isfinite(btc_price) or btc_price <= 0:
             return {'valid': False, 'error': 'Invalid BTC price'}
         
-        if btc_amount > self.balance['btc']:
+        available = self.balance['btc'] - self.locked['btc']
+        if btc_amount > available:
             return {
                 'valid': False,
-                'error': f'Insufficient BTC balance. Required: {btc_amount:.8f}, Available: {self.balance["btc"]:.8f}'
+                'error': f'Insufficient BTC balance. Required: {btc_amount:.8f}, Available: {available:.8f}'
             }
         
         usd_amount = btc_amount * btc_price
@@ -84,6 +117,7 @@ class BTCTradingService:
             'fee': fee
         }
     
+    @atomic_order
     def execute_buy_order(self, amount_usd: float, btc_price: float, order_type: str = 'market') -> Dict[str, Any]:
         """执行买入订单"""
         validation = self.validate_buy_order(amount_usd, btc_price)
@@ -98,13 +132,30 @@ class BTCTradingService:
         btc_amount = validation['btc_amount']
         total_cost = validation['total_cost']
         fee = validation['fee']
+        depth_fill = self._depth_fill('buy', amount_usd) if order_type == 'market' else None
+        if depth_fill is not None:
+            if not depth_fill['complete']:
+                return {
+                    'success': False,
+                    'error': 'Insufficient order book depth',
+                    'timestamp': datetime.now().isoformat()
+                }
+            btc_amount = depth_fill['btc_amount']
+            btc_price = depth_fill['vwap']
         
         if self.demo_mode:
-            # 模拟交易执行
+            if order_type == 'limit' and not self._marketable('buy', btc_price):
+                # 限价买单：冻结USD，等价格跌到限价时成交
+                order = self._rest_order(order_id, 'buy', btc_price, btc_amount, total_cost, amount_usd)
+                return self._resting_result(order, amount_usd)
+            # 模拟交易执行（限价单在当前价格已可成交时按限价立即成交）
             self.balance['usd'] -= total_cost
             self.balance['btc'] += btc_amount
+            if self.ledger is not None:
+                self.ledger.record_fill(order_id, 'buy', order_type, btc_price, btc_amount,
+                                        amount_usd, fee, -total_cost, btc_amount)
             
-            return {
+            result = {
                 'success': True,
                 'order_id': order_id,
                 'order_type': order_type,
@@ -119,6 +170,9 @@ class BTCTradingService:
                 'demo_mode': True,
                 'new_balance': self.balance.copy()
             }
+            if depth_fill is not None:
+                result['depth'] = self._depth_summary(depth_fill)
+            return result
         else:
             # 这里应该调用真实的交易所API
             return {
@@ -127,6 +181,7 @@ class BTCTradingService:
                 'timestamp': datetime.now().isoformat()
             }
     
+    @atomic_order
     def execute_sell_order(self, btc_amount: float, btc_price: float, order_type: str = 'market') -> Dict[str, Any]:
         """执行卖出订单"""
         validation = self.validate_sell_order(btc_amount, btc_price)
@@ -141,13 +196,32 @@ class BTCTradingService:
         usd_amount = validation['usd_amount']
         net_usd = validation['net_usd']
         fee = validation['fee']
+        depth_fill = self._depth_fill('sell', btc_amount) if order_type == 'market' else None
+        if depth_fill is not None:
+            if not depth_fill['complete']:
+                return {
+                    'success': False,
+                    'error': 'Insufficient order book depth',
+                    'timestamp': datetime.now().isoformat()
+                }
+            usd_amount = depth_fill['usd_amount']
+            fee = usd_amount * self.trading_fee
+            net_usd = usd_amount - fee
+            btc_price = depth_fill['vwap']
         
         if self.demo_mode:
-            # 模拟交易执行
+            if order_type == 'limit' and not self._marketable('sell', btc_price):
+                # 限价卖单：冻结BTC，等价格涨到限价时成交
+                order = self._rest_order(order_id, 'sell', btc_price, btc_amount, btc_amount, usd_amount)
+                return self._resting_result(order, usd_amount)
+            # 模拟交易执行（限价单在当前价格已可成交时按限价立即成交）
             self.balance['btc'] -= btc_amount
             self.balance['usd'] += net_usd
+            if self.ledger is not None:
+                self.ledger.record_fill(order_id, 'sell', order_type, btc_price, btc_amount,
+                                        usd_amount, fee, net_usd, -btc_amount)
             
-            return {
+            result = {
                 'success': True,
                 'order_id': order_id,
                 'order_type': order_type,
@@ -162,6 +236,9 @@ class BTCTradingService:
                 'demo_mode': True,
                 'new_balance': self.balance.copy()
             }
+            if depth_fill is not None:
+                result['depth'] = self._depth_summary(depth_fill)
+            return result
         else:
             # 这里应该调用真实的交易所API
             return {
@@ -170,9 +247,135 @@ class BTCTradingService:
                 'timestamp': datetime.now().isoformat()
             }
     
-    def get_order_history(self, limit: int = 10) -> Dict[str, Any]:
-        """获取订单历史（模拟）"""
-        # 在实际实现中，这里应该从数据库或交易所API获取历史订单
+    def _depth_fill(self, action: str, amount: float) -> Optional[Dict[str, Any]]:
+        """深度簿已同步时，按当前深度模拟市价单逐档成交（买入 amount 为USD，卖出为BTC）"""
+        if self.depth is None or not self.depth.synced:
+            return None
+        if action == 'buy':
+            return self.depth.fill('buy', usd_amount=amount)
+        return self.depth.fill('sell', btc_amount=amount)
+    
+    @staticmethod
+    def _depth_summary(depth_fill: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'best_price': depth_fill['best_price'],
+            'worst_price': depth_fill['worst_price'],
+            'levels': depth_fill['levels'],
+            'slippage_bps': round(depth_fill['slippage_bps'], 3)
+        }
+    
+    def _marketable(self, action: str, limit: float) -> bool:
+        """按最近的价格tick判断限价单能否立即成交"""
+        if self.last_price is None:
+            return False
+        return self.last_price <= limit if action == 'buy' else self.last_price >= limit
+    
+    def _rest_order(self, order_id: str, action: str, limit: float, btc_amount: float, locked: float,
+                    usd_amount: float) -> RestingOrder:
+        """挂单并冻结资金（买单冻结含手续费的USD，卖单冻结BTC）"""
+        order = RestingOrder(order_id, action, limit, btc_amount, locked)
+        self.locked['usd' if action == 'buy' else 'btc'] += locked
+        if self.ledger is not None:
+            order.ledger_seq = self.ledger.record_open(order_id, action, limit, btc_amount, usd_amount)
+        self.order_book.add(order)
+        return order
+    
+    def _resting_result(self, order: RestingOrder, usd_amount: float) -> Dict[str, Any]:
+        return {
+            'success': True,
+            'order_id': order.order_id,
+            'order_type': 'limit',
+            'action': order.action,
+            'btc_amount': round(order.quantity, 8),
+            'usd_amount': round(usd_amount, 2),
+            'btc_price': order.limit,
+            'created_at': datetime.now().isoformat(),
+            'status': 'open',
+            'demo_mode': True,
+            'new_balance': self.balance.copy(),
+            'locked': self.locked.copy()
+        }
+    
+    def _release(self, order: RestingOrder, amount: float):
+        order.locked -= amount
+        self.locked['usd' if order.action == 'buy' else 'btc'] -= amount
+        if not self.order_book:
+            # 没有挂单时清零，避免浮点误差累积
+            self.locked['usd'] = self.locked['btc'] = 0.0
+    
+    def _fill_resting(self, order: RestingOrder, btc_amount: float) -> Dict[str, Any]:
+        """挂单成交 btc_amount（按限价），从冻结资金中扣除；最后一笔成交释放剩余的全部冻结"""
+        usd_amount = btc_amount * order.limit
+        fee = usd_amount * self.trading_fee
+        if order.action == 'buy':
+            cost = order.locked if order.remaining == 0 else usd_amount + fee
+            self._release(order, cost)
+            usd_delta, btc_delta = -cost, btc_amount
+        else:
+            sold = order.locked if order.remaining == 0 else btc_amount
+            self._release(order, sold)
+            usd_delta, btc_delta = usd_amount - fee, -sold
+        self.balance['usd'] += usd_delta
+        self.balance['btc'] += btc_delta
+        if self.ledger is not None:
+            self.ledger.record_fill(order.order_id, order.action, 'limit', order.limit, btc_amount,
+                                    usd_amount, fee, usd_delta, btc_delta, partial=order.remaining > 0)
+        return {
+            'order_id': order.order_id,
+            'action': order.action,
+            'btc_price': order.limit,
+            'btc_amount': round(btc_amount, 8),
+            'usd_amount': round(usd_amount, 2),
+            'fee': round(fee, 2),
+            'remaining': round(order.remaining, 8),
+            'status': 'partially_filled' if order.remaining > 0 else 'filled'
+        }
+    
+    @atomic_order
+    def on_price_tick(self, price: float, volume: Optional[float] = None) -> Dict[str, Any]:
+        """价格tick：撮合可成交的限价挂单。volume 为该tick可成交的BTC数量（None 表示不限），
+        不足时按价格优先、时间优先部分成交"""
+        if price <= 0:
+            return {'success': False, 'error': 'Invalid BTC price', 'timestamp': datetime.now().isoformat()}
+        self.last_price = price
+        fills = [self._fill_resting(order, quantity) for order, quantity in self.order_book.match(price, volume)]
+        return {
+            'success': True,
+            'btc_price': price,
+            'fills': fills,
+            'open_orders': len(self.order_book),
+            'balance': self.balance.copy(),
+            'locked': self.locked.copy(),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def get_open_orders(self, limit: int = 100) -> Dict[str, Any]:
+        """当前的限价挂单，按下单时间倒序"""
+        with self._lock:
+            orders = self.order_book.open_orders(limit)
+            return {
+                'success': True,
+                'orders': orders,
+                'count': len(self.order_book),
+                'locked': self.locked.copy(),
+                'timestamp': datetime.now().isoformat()
+            }
+    
+    def get_order_history(self, limit: int = 10, start_time: Optional[float] = None,
+                          end_time: Optional[float] = None) -> Dict[str, Any]:
+        """获取订单历史：启用账本时按时间倒序返回最近 limit 条，可按时间范围（Unix秒）过滤"""
+        if self.ledger is not None:
+            # 账本的读锁和写事务的排他锁是同一个文件描述符上的 flock，读取时的重新映射和追赶也会改动
+            # 共用的映射和余额，因此与下单一样在服务锁内读取
+            with self._lock:
+                orders = self.ledger.history(limit, start_time, end_time)
+            return {
+                'success': True,
+                'orders': orders,
+                'count': len(orders),
+                'timestamp': datetime.now().isoformat()
+            }
+        # 未启用账本时没有历史订单
         return {
             'success': True,
             'orders': [],
@@ -180,36 +383,405 @@ class BTCTradingService:
             'timestamp': datetime.now().isoformat()
         }
     
+    @atomic_order
     def cancel_order(self, order_id: str) -> Dict[str, Any]:
-        """取消订单（模拟）"""
+        """取消订单：只有未成交（或部分成交）的限价挂单可以取消，剩余的冻结资金解冻"""
+        order = self.order_book.cancel(order_id)
+        if order is not None:
+            released = order.locked
+            self._release(order, released)
+            if self.ledger is not None:
+                self.ledger.record_cancel(order_id, order.ledger_seq)
+            return {
+                'success': True,
+                'order_id': order_id,
+                'status': 'cancelled',
+                'filled_btc': round(order.quantity - order.remaining, 8),
+                'remaining': round(order.remaining, 8),
+                'released': {('usd' if order.action == 'buy' else 'btc'): released},
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        error = f'Order not found: {order_id}'
+        if self.ledger is not None:
+            record = self.ledger.find(order_id)
+            if record is None:
+                pass
+            elif record[2] == KIND_CANCEL:
+                error = 'Order already cancelled'
+            elif record[2] == KIND_FILL:
+                error = 'Order already filled'
+            else:
+                # 账本中仍是挂单状态，但挂单不跨进程保存（其他进程的挂单或重启前的挂单）
+                error = 'Order is not resting in this process'
         return {
-            'success': True,
+            'success': False,
             'order_id': order_id,
-            'status': 'cancelled',
-            'message': 'Order cancellation not implemented in demo mode',
+            'error': error,
             'timestamp': datetime.now().isoformat()
         }
+    
+    @atomic_order
+    def execute_batch(self, orders: List[Dict[str, Any]], validate_only: bool = False) -> Dict[str, Any]:
+        """批量下单：按顺序校验并执行，每笔订单都以前面订单执行后的余额校验（与逐笔调用结果相同）。
+        validate_only 时只在余额副本上模拟，不成交。整批只加一次锁，逐笔结果只包含必要字段"""
+        if not self.demo_mode and not validate_only:
+            return {
+                'success': False,
+                'error': 'Real trading not implemented. Set demo_mode=True for simulation.',
+                'timestamp': datetime.now().isoformat()
+            }
+        live_balance = self.balance
+        if validate_only:
+            self.balance = dict(live_balance)
+        try:
+            results = [self._execute_batch_order(order, validate_only) for order in orders]
+            balance = self.balance.copy()
+        finally:
+            self.balance = live_balance
+        accepted = sum(1 for result in results if result['status'] != 'rejected')
+        return {
+            'success': True,
+            'accepted': accepted,
+            'rejected': len(results) - accepted,
+            'results': results,
+            'balance': balance,
+            'validate_only': validate_only,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _execute_batch_order(self, order: Dict[str, Any], validate_only: bool) -> Dict[str, Any]:
+        """批量中的一笔订单：买入 amount 为USD，卖出 btc_amount（或 amount）为BTC；
+        order_type 为 limit 时 price 为限价，不能立即成交的订单挂单（status 为 open）"""
+        if not isinstance(order, dict):
+            return {'status': 'rejected', 'error': 'order must be an object'}
+        action = order.get('action')
+        if action not in ('buy', 'sell'):
+            return {'status': 'rejected', 'error': f'Invalid action: {action}'}
+        try:
+            price = float(order.get('price') or 0)
+            if action == 'buy':
+                amount = float(order.get('amount') or 0)
+            else:
+                amount = float(order.get('btc_amount') or order.get('amount') or 0)
+        except (TypeError, ValueError):
+            return {'status': 'rejected', 'error': 'Invalid number'}
+        
+        order_type = order.get('order_type', 'market')
+        if action == 'buy':
+            validation = self.validate_buy_order(amount, price)
+        else:
+            validation = self.validate_sell_order(amount, price)
+        if not validation['valid']:
+            return {'status': 'rejected', 'error': validation['error']}
+        depth_fill = self._depth_fill(action, amount) if order_type == 'market' else None
+        if depth_fill is not None and not depth_fill['complete']:
+            return {'status': 'rejected', 'error': 'Insufficient order book depth'}
+        
+        if action == 'buy':
+            btc_amount, usd_amount, fee = validation['btc_amount'], amount, validation['fee']
+            if depth_fill is not None:
+                btc_amount, price = depth_fill['btc_amount'], depth_fill['vwap']
+            usd_delta, btc_delta = -validation['total_cost'], btc_amount
+            locked = validation['total_cost']
+        else:
+            btc_amount, usd_amount, fee = amount, validation['usd_amount'], validation['fee']
+            usd_delta = validation['net_usd']
+            if depth_fill is not None:
+                usd_amount, price = depth_fill['usd_amount'], depth_fill['vwap']
+                fee = usd_amount * self.trading_fee
+                usd_delta = usd_amount - fee
+            btc_delta = -btc_amount
+            locked = btc_amount
+        
+        # validate_only 时限价单按立即成交模拟，同样占用余额
+        resting = order_type == 'limit' and not validate_only and not self._marketable(action, price)
+        if not resting:
+            self.balance['usd'] += usd_delta
+            self.balance['btc'] += btc_delta
+        
+        result = {
+            'status': 'valid' if validate_only else ('open' if resting else 'filled'),
+            'action': action,
+            'btc_amount': round(btc_amount, 8),
+            'usd_amount': round(usd_amount, 2),
+            'fee': round(fee, 2)
+        }
+        if not validate_only:
+            result['order_id'] = str(uuid.uuid4())
+            if resting:
+                self._rest_order(result['order_id'], action, price, btc_amount, locked, usd_amount)
+            elif self.ledger is not None:
+                self.ledger.record_fill(result['order_id'], action, order_type, price,
+                                        btc_amount, usd_amount, fee, usd_delta, btc_delta)
+        return result
+
+def parse_stream_quote(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """解析价格服务 /stream/ws 推送的聚合报价"""
+    if not message.get('success', True) or not message.get('price'):
+        return None
+    return {'price': float(message['price'])}
+
+def execute_command(service: BTCTradingService, command: Dict[str, Any]) -> Dict[str, Any]:
+    """执行管道模式的一条命令：action 为 buy/sell/balance/history/cancel/batch/tick/open_orders，
+    其余字段与HTTP接口的参数同名（amount、price、btc_amount、order_type、order_id、orders 等）"""
+    def number(*names: str) -> Optional[float]:
+        for name in names:
+            if command.get(name) not in (None, ''):
+                return float(command[name])
+        return None
+
+    action = command.get('action')
+    try:
+        if action == 'balance':
+            return service.get_balance()
+        if action == 'history':
+            limit = number('limit')
+            return service.get_order_history(int(limit) if limit else 10, number('start_time'), number('end_time'))
+        if action == 'open_orders':
+            limit = number('limit')
+            return service.get_open_orders(int(limit) if limit else 100)
+        if action == 'buy':
+            amount, price = number('amount'), number('price')
+            if not amount or not price:
+                return {'success': False, 'error': 'Buy order requires amount and price'}
+            return service.execute_buy_order(amount, price, command.get('order_type', 'market'))
+        if action == 'sell':
+            btc_amount, price = number('btc_amount', 'amount'), number('price')
+            if not btc_amount or not price:
+                return {'success': False, 'error': 'Sell order requires btc_amount (or amount) and price'}
+            return service.execute_sell_order(btc_amount, price, command.get('order_type', 'market'))
+        if action == 'tick':
+            price = number('price')
+            if not price:
+                return {'success': False, 'error': 'Tick requires price'}
+            return service.on_price_tick(price, number('volume'))
+    except (TypeError, ValueError):
+        return {'success': False, 'error': 'Invalid number'}
+    if action == 'cancel':
+        if not command.get('order_id'):
+            return {'success': False, 'error': 'Cancel requires order_id'}
+        return service.cancel_order(str(command['order_id']))
+    if action == 'batch':
+        orders = command.get('orders')
+        if not isinstance(orders, list):
+            return {'success': False, 'error': 'Batch requires an orders array'}
+        return service.execute_batch(orders, bool(command.get('validate_only')))
+    return {'success': False, 'error': f'Unknown action: {action}'}
+
+def create_trading_app(service: BTCTradingService, accounts: Optional[AccountBook] = None,
+                       price_feed: Optional[str] = None, depth_feed: Optional[Any] = None):
+    """创建交易常驻服务，余额在多次调用之间保留在内存中；
+    请求带 account 参数时使用多账户余额（accounts），每个账户独立。
+    限价挂单由 POST /ticks 推入的价格撮合，或订阅价格服务的WebSocket推送（price_feed）；
+    depth_feed 为 price_depth.DepthFeed，维护本地深度簿（需同时作为 service.depth），市价单按深度模拟成交"""
+    import asyncio
+    import aiohttp
+    from aiohttp import web
+    from price_ingest import ExchangeFeed
+    from tool_daemon import LatencyRecorder, create_app, read_params
+    
+    def _float(params: Dict[str, Any], *names: str) -> Optional[float]:
+        for name in names:
+            if params.get(name) not in (None, ''):
+                try:
+                    return float(params[name])
+                except (TypeError, ValueError):
+                    raise web.HTTPBadRequest(text=f'Invalid number for {name}')
+        return None
+    
+    async def balance(request: web.Request) -> web.Response:
+        account = request.query.get('account')
+        if account and accounts is not None:
+            return web.json_response(accounts.get_balance(account))
+        return web.json_response(service.get_balance())
+    
+    async def history(request: web.Request) -> web.Response:
+        limit = _float(request.query, 'limit')
+        return web.json_response(service.get_order_history(
+            int(limit) if limit else 10,
+            _float(request.query, 'start_time'),
+            _float(request.query, 'end_time')
+        ))
+    
+    async def buy(request: web.Request) -> web.Response:
+        params = await read_params(request)
+        amount = _float(params, 'amount')
+        price = _float(params, 'price')
+        if not amount or not price:
+            return web.json_response({'error': 'Buy order requires amount and price'}, status=400)
+        if params.get('account') and accounts is not None:
+            if params.get('order_type', 'market') != 'market':
+                # 多账户余额没有挂单簿、账本和深度成交，只支持按传入价格成交的市价单
+                return web.json_response({'error': 'Per-account orders support order_type=market only'}, status=400)
+            return web.json_response(accounts.buy(params['account'], amount, price))
+        return web.json_response(service.execute_buy_order(amount, price, params.get('order_type', 'market')))
+    
+    async def sell(request: web.Request) -> web.Response:
+        params = await read_params(request)
+        btc_amount = _float(params, 'btc_amount', 'amount')
+        price = _float(params, 'price')
+        if not btc_amount or not price:
+            return web.json_response({'error': 'Sell order requires btc_amount (or amount) and price'}, status=400)
+        if params.get('account') and accounts is not None:
+            if params.get('order_type', 'market') != 'market':
+                # 多账户余额没有挂单簿、账本和深度成交，只支持按传入价格成交的市价单
+                return web.json_response({'error': 'Per-account orders support order_type=market only'}, status=400)
+            return web.json_response(accounts.sell(params['account'], btc_amount, price))
+        return web.json_response(service.execute_sell_order(btc_amount, price, params.get('order_type', 'market')))
+    
+    async def batch(request: web.Request) -> web.Response:
+        params = await read_params(request)
+        if params.get('account'):
+            return web.json_response({'error': 'Batch orders are not supported for per-account wallets'}, status=400)
+        orders = params.get('orders')
+        if isinstance(orders, str):
+            try:
+                orders = json.loads(orders)
+            except ValueError:
+                orders = None
+        if not isinstance(orders, list):
+            return web.json_response({'error': 'Batch requires an orders array'}, status=400)
+        validate_only = str(params.get('validate_only', '')).lower() in ('1', 'true', 'yes')
+        return web.json_response(service.execute_batch(orders, validate_only))
+    
+    async def cancel(request: web.Request) -> web.Response:
+        return web.json_response(service.cancel_order(request.match_info['order_id']))
+    
+    async def open_orders(request: web.Request) -> web.Response:
+        limit = _float(request.query, 'limit')
+        return web.json_response(service.get_open_orders(int(limit) if limit else 100))
+    
+    async def tick(request: web.Request) -> web.Response:
+        params = await read_params(request)
+        price = _float(params, 'price')
+        if not price:
+            return web.json_response({'error': 'Tick requires price'}, status=400)
+        return web.json_response(service.on_price_tick(price, _float(params, 'volume')))
+    
+    async def on_startup(app: web.Application):
+        if depth_feed is not None:
+            await depth_feed.start()
+        if price_feed:
+            feed = ExchangeFeed('price', price_feed, parse_stream_quote)
+            app['price_session'] = aiohttp.ClientSession()
+            app['price_feed'] = asyncio.ensure_future(
+                feed.run(app['price_session'], lambda source, quote: service.on_price_tick(quote['price'])))
+    
+    async def on_cleanup(app: web.Application):
+        if depth_feed is not None:
+            await depth_feed.stop()
+        if price_feed:
+            app['price_feed'].cancel()
+            await app['price_session'].close()
+    
+    app = create_app(LatencyRecorder())
+    app.router.add_get('/balance', balance)
+    app.router.add_get('/history', history)
+    app.router.add_post('/buy', buy)
+    app.router.add_post('/sell', sell)
+    app.router.add_post('/orders/batch', batch)
+    app.router.add_post('/orders/{order_id}/cancel', cancel)
+    app.router.add_get('/orders/open', open_orders)
+    app.router.add_post('/ticks', tick)
+    if price_feed or depth_feed is not None:
+        app.on_startup.append(on_startup)
+        app.on_cleanup.append(on_cleanup)
+    return app
 
 def main():
     """主函数 - 命令行接口"""
     import sys
+    import os
     import argparse
     
     parser = argparse.ArgumentParser(description='BTC Trading Tool')
-    parser.add_argument('action', choices=['buy', 'sell', 'balance', 'history'], help='Trading action')
+    parser.add_argument('action', choices=['buy', 'sell', 'balance', 'history', 'cancel', 'batch', 'serve', 'pipe'],
+                        help='Trading action (pipe: read NDJSON commands from stdin, one JSON result line per command)')
     parser.add_argument('--amount', type=float, help='Amount to trade (USD for buy, BTC for sell)')
     parser.add_argument('--price', type=float, help='BTC price')
     parser.add_argument('--btc-amount', type=float, help='BTC amount for sell orders')
     parser.add_argument('--order-type', default='market', choices=['market', 'limit'], help='Order type')
+    parser.add_argument('--order-id', help='Order ID for cancel')
+    parser.add_argument('--orders', help='JSON array of orders for batch, @file to read a file, - for stdin')
+    parser.add_argument('--validate-only', action='store_true', help='Validate a batch without executing it')
+    parser.add_argument('--limit', type=int, default=10, help='Number of orders for history')
+    parser.add_argument('--start-time', type=float, help='History range start (Unix seconds)')
+    parser.add_argument('--end-time', type=float, help='History range end (Unix seconds)')
+    parser.add_argument('--ledger', action='store_true',
+                        help='Persist orders and balances in the order ledger (also enabled by BTC_LEDGER_DIR)')
+    parser.add_argument('--ledger-dir', help='Order ledger directory (implies --ledger)')
+    parser.add_argument('--host', default='127.0.0.1', help='Listen host for serve')
+    parser.add_argument('--port', type=int, default=8702, help='Listen port for serve')
+    parser.add_argument('--price-feed',
+                        help='Price daemon WebSocket (e.g. ws://127.0.0.1:8701/stream/ws) that drives limit order matching in serve')
+    parser.add_argument('--depth', action='store_true',
+                        help='In serve, keep a local L2 order book and fill market orders against its depth')
+    parser.add_argument('--depth-snapshot-url', help='Depth snapshot URL (defaults to Binance /api/v3/depth)')
+    parser.add_argument('--depth-stream-url', help='Depth diff WebSocket URL (defaults to Binance btcusdt@depth)')
+    parser.add_argument('--account-initial-usd', type=float, default=10000.0,
+                        help='Opening USD balance of each per-account wallet in serve')
+    parser.add_argument('--account-initial-btc', type=float, default=0.0,
+                        help='Opening BTC balance of each per-account wallet in serve')
     
     args = parser.parse_args()
     
-    service = BTCTradingService()
+    ledger = None
+    if args.ledger or args.ledger_dir or os.environ.get('BTC_LEDGER_DIR'):
+        ledger = OrderLedger(args.ledger_dir)
+    depth_feed = None
+    if args.action == 'serve' and args.depth:
+        from price_depth import DepthFeed  # 需要 aiohttp，只在启用深度时导入
+        depth_feed = DepthFeed(snapshot_url=args.depth_snapshot_url, stream_url=args.depth_stream_url)
+    service = BTCTradingService(ledger, depth_feed.book if depth_feed else None)
     
-    if args.action == 'balance':
+    if args.action == 'serve':
+        from tool_daemon import run_app
+        # 新账户按固定的初始余额开户，与单一账户（启用账本时为恢复后的余额）无关
+        accounts = AccountBook(args.account_initial_usd, args.account_initial_btc, service.trading_fee)
+        run_app(create_trading_app(service, accounts, args.price_feed, depth_feed), args.host, args.port)
+        return
+
+    if args.action == 'pipe':
+        from tool_pipe import run_pipe
+        run_pipe(lambda command: execute_command(service, command))
+        return
+
+    # 一次性CLI没有后续价格tick，挂单会随进程退出丢失，账本中却永远是挂单状态，因此只能在 serve / pipe 中下限价单
+    cli_limit_error = {'error': 'Limit orders need a running serve or pipe process to rest and fill'}
+    if args.action in ('buy', 'sell') and args.order_type == 'limit':
+        result = cli_limit_error
+    elif args.action == 'balance':
         result = service.get_balance()
     elif args.action == 'history':
-        result = service.get_order_history()
+        result = service.get_order_history(args.limit, args.start_time, args.end_time)
+    elif args.action == 'batch':
+        if not args.orders:
+            result = {'error': 'Batch requires --orders'}
+        else:
+            if args.orders == '-':
+                text = sys.stdin.read()
+            elif args.orders.startswith('@'):
+                with open(args.orders[1:]) as f:
+                    text = f.read()
+            else:
+                text = args.orders
+            try:
+                orders = json.loads(text)
+            except ValueError:
+                orders = None
+            if not isinstance(orders, list):
+                result = {'error': '--orders must be a JSON array'}
+            elif not args.validate_only and any(isinstance(order, dict) and order.get('order_type') == 'limit'
+                                                for order in orders):
+                result = cli_limit_error
+            else:
+                result = service.execute_batch(orders, args.validate_only)
+    elif args.action == 'cancel':
+        if not args.order_id:
+            result = {'error': 'Cancel requires --order-id'}
+        else:
+            result = service.cancel_order(args.order_id)
     elif args.action == 'buy':
         if not args.amount or not args.price:
             result = {'error': 'Buy order requires --amount and --price'}
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+阈值策略回测
+按 btc-trading-workflow 模板的策略回放历史tick：每隔 checkInterval 检查一次价格，
+价格 <= buyThreshold 时买入 maxTradeAmount BTC，价格 >= sellThreshold 时卖出 maxTradeAmount BTC。
+成交规则与 BTCTradingService 一致（手续费、余额不足时拒单），计算全部用NumPy向量化完成，
+只在连续的同向信号段之间用Python循环。
+"""
+
+import argparse
+import csv
+import json
+import math
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from tick_files import read_ticks
+from tool_loader import load_tool
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+TRADE_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('action', 'i1'),        # 1 买入，-1 卖出
+    ('price', '<f8'),
+    ('btc_amount', '<f8'),
+    ('usd_amount', '<f8'),
+    ('fee', '<f8'),
+    ('usd_balance', '<f8'),
+    ('btc_balance', '<f8')
+])
+
+def service_defaults() -> Dict[str, float]:
+    """从 BTCTradingService 读取初始余额和手续费，保证回测与交易工具一致"""
+    service = load_tool('btc-trading-tool.py').BTCTradingService()
+    return {
+        'initial_usd': service.balance['usd'],
+        'initial_btc': service.balance['btc'],
+        'fee': service.trading_fee
+    }
+
+def sample_checks(timestamps: np.ndarray, interval: float) -> np.ndarray:
+    """每隔 interval 秒检查一次，取检查时刻之前最新的tick；interval<=0 时每个tick都检查"""
+    if interval <= 0 or len(timestamps) == 0:
+        return np.arange(len(timestamps))
+    grid = np.arange(timestamps[0], timestamps[-1] + interval / 2, interval)
+    return np.unique(np.searchsorted(timestamps, grid, side='right') - 1)
+
+def _running(balance: float, deltas: np.ndarray) -> np.ndarray:
+    """依次累加的余额序列 [balance, balance+d1, (balance+d1)+d2, ...]，与逐笔更新的浮点结果一致"""
+    return np.cumsum(np.concatenate(([balance], deltas)))
+
+def _fill_buys(costs: np.ndarray, usd: float) -> np.ndarray:
+    """按顺序执行一段买入信号，余额不足的单被拒绝但不影响后面更便宜的单，返回成交位置"""
+    filled = []
+    pos = 0
+    while pos < len(costs):
+        balances = _running(usd, -costs[pos:])
+        rejected = np.flatnonzero(costs[pos:] > balances[:-1])
+        n = int(rejected[0]) if len(rejected) else len(costs) - pos
+        if n:
+            filled.append(np.arange(pos, pos + n))
+            usd = balances[n]
+            pos += n
+        affordable = np.flatnonzero(costs[pos:] <= usd)
+        if not len(affordable):
+            break
+        pos += int(affordable[0])
+    return np.concatenate(filled) if filled else np.empty(0, dtype=np.int64)
+
+def _fill_sells(count: int, amount: float, btc: float) -> int:
+    """一段卖出信号的成交笔数：余额逐笔减少，amount 大于剩余余额时拒单（之后的卖单也都会被拒）"""
+    steps = min(count, int(btc / amount) + 1)
+    balances = _running(btc, np.full(steps, -amount))
+    rejected = np.flatnonzero(amount > balances[:-1])
+    return int(rejected[0]) if len(rejected) else steps
+
+def run_backtest(timestamps, prices, buy_threshold: float, sell_threshold: float,
+                 max_trade_amount: float, interval: float = 0.0,
+                 initial_usd: Optional[float] = None, initial_btc: Optional[float] = None,
+                 fee: Optional[float] = None, trading_enabled: bool = True) -> Dict[str, Any]:
+    """回测阈值策略，返回汇总指标、权益曲线（检查时刻）和成交列表"""
+    if initial_usd is None or initial_btc is None or fee is None:
+        defaults = service_defaults()
+        initial_usd = defaults['initial_usd'] if initial_usd is None else initial_usd
+        initial_btc = defaults['initial_btc'] if initial_btc is None else initial_btc
+        fee = defaults['fee'] if fee is None else fee
+
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    checks = sample_checks(timestamps, interval)
+    check_ts = timestamps[checks]
+    check_price = prices[checks]
+
+    # 与模板的路由规则一致：买入条件优先于卖出条件；价格<=0的单在交易服务中会被拒绝
+    signal = np.zeros(len(checks), dtype=np.int8)
+    if trading_enabled and max_trade_amount > 0:
+        valid = check_price > 0
+        signal[valid & (check_price >= sell_threshold)] = -1
+        signal[valid & (check_price <= buy_threshold)] = 1
+
+    active = np.flatnonzero(signal)
+    # 金额计算方式与 BTCTradingService 相同（逐笔的浮点结果一致）
+    usd_amount = max_trade_amount * check_price
+    buy_cost = usd_amount * (1 + fee)                    # 买入扣除的USD（含手续费）
+    buy_btc = usd_amount / np.where(check_price > 0, check_price, 1)  # 买入获得的BTC
+    sell_proceeds = usd_amount - usd_amount * fee        # 卖出获得的USD（扣除手续费）
+    filled_parts = []
+    usd, btc = initial_usd, initial_btc
+    if len(active):
+        # 按信号方向切分成连续的同向段，段内向量化撮合
+        breaks = np.flatnonzero(np.diff(signal[active])) + 1
+        for run in np.split(active, breaks):
+            if signal[run[0]] == 1:
+                filled = run[_fill_buys(buy_cost[run], usd)]
+                usd = _running(usd, -buy_cost[filled])[-1]
+                btc = _running(btc, buy_btc[filled])[-1]
+            else:
+                filled = run[:_fill_sells(len(run), max_trade_amount, btc)]
+                usd = _running(usd, sell_proceeds[filled])[-1]
+                btc = _running(btc, np.full(len(filled), -max_trade_amount))[-1]
+            filled_parts.append(filled)
+    filled = np.concatenate(filled_parts) if filled_parts else np.empty(0, dtype=np.int64)
+
+    # 余额曲线：成交处的变动量依次累加
+    usd_delta = np.zeros(len(checks))
+    btc_delta = np.zeros(len(checks))
+    is_buy = signal[filled] == 1
+    usd_delta[filled] = np.where(is_buy, -buy_cost[filled], sell_proceeds[filled])
+    btc_delta[filled] = np.where(is_buy, buy_btc[filled], -max_trade_amount)
+    usd_curve = _running(initial_usd, usd_delta)[1:]
+    btc_curve = _running(initial_btc, btc_delta)[1:]
+    equity = usd_curve + btc_curve * check_price
+
+    trades = np.zeros(len(filled), dtype=TRADE_DTYPE)
+    trades['timestamp'] = check_ts[filled]
+    trades['action'] = signal[filled]
+    trades['price'] = check_price[filled]
+    trades['btc_amount'] = np.abs(btc_delta[filled])
+    trades['usd_amount'] = usd_amount[filled]
+    trades['fee'] = trades['usd_amount'] * fee
+    trades['usd_balance'] = usd_curve[filled]
+    trades['btc_balance'] = btc_curve[filled]
+
+    return {
+        'summary': summarize(equity, check_ts, trades, initial_usd + initial_btc * (check_price[0] if len(checks) else 0),
+                             int(len(active) - len(filled))),
+        'equity': {'timestamp': check_ts, 'equity': equity},
+        'trades': trades
+    }
+
+def sharpe_ratio(equity: np.ndarray, timestamps: np.ndarray) -> float:
+    """按检查间隔收益率计算的年化夏普比率（无风险利率取0）"""
+    if len(equity) < 3 or timestamps[-1] <= timestamps[0]:
+        return 0.0
+    returns = np.diff(equity) / np.where(equity[:-1] > 0, equity[:-1], 1)
+    std = returns.std()
+    if std == 0:
+        return 0.0
+    periods_per_year = SECONDS_PER_YEAR / ((timestamps[-1] - timestamps[0]) / (len(timestamps) - 1))
+    return float(returns.mean() / std * math.sqrt(periods_per_year))
+
+def summarize(equity: np.ndarray, timestamps: np.ndarray, trades: np.ndarray,
+              initial_equity: float, rejected: int) -> Dict[str, Any]:
+    """权益曲线和成交列表的汇总指标"""
+    if len(equity) == 0:
+        return {'checks': 0, 'trades': 0}
+    peak = np.maximum.accumulate(equity)
+    drawdown = (peak - equity) / np.where(peak > 0, peak, 1)
+    final = float(equity[-1])
+    return {
+        'checks': int(len(equity)),
+        'trades': int(len(trades)),
+        'buys': int((trades['action'] == 1).sum()),
+        'sells': int((trades['action'] == -1).sum()),
+        'rejected': rejected,
+        'fees': round(float(trades['fee'].sum()), 2),
+        'initial_equity': round(initial_equity, 2),
+        'final_equity': round(final, 2),
+        'pnl': round(final - initial_equity, 2),
+        'return_pct': round((final - initial_equity) / initial_equity * 100, 4) if initial_equity else 0,
+        'max_drawdown_pct': round(float(drawdown.max()) * 100, 4),
+        'sharpe': round(sharpe_ratio(equity, timestamps), 4)
+    }
+
+def write_equity(path: str, equity: Dict[str, np.ndarray]):
+    np.savetxt(path, np.column_stack([equity['timestamp'], equity['equity']]),
+               delimiter=',', fmt=['%.3f', '%.2f'], header='timestamp,equity', comments='')
+
+def trade_records(trades: np.ndarray) -> list:
+    """成交列表转为字典列表，action 显示为 buy / sell"""
+    records = []
+    for trade in trades.tolist():
+        record = dict(zip(TRADE_DTYPE.names, trade))
+        record['action'] = 'buy' if record['action'] == 1 else 'sell'
+        records.append(record)
+    return records
+
+def write_trades(path: str, trades: np.ndarray):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=TRADE_DTYPE.names)
+        writer.writeheader()
+        writer.writerows(trade_records(trades))
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Threshold strategy backtest')
+    parser.add_argument('ticks', help='Tick file (.csv, or .bin/.ticks binary)')
+    parser.add_argument('--buy-threshold', type=float, default=90000, help='Buy when price <= this')
+    parser.add_argument('--sell-threshold', type=float, default=110000, help='Sell when price >= this')
+    parser.add_argument('--max-trade-amount', type=float, default=0.1, help='BTC per trade')
+    parser.add_argument('--interval', type=float, default=300, help='Check interval in seconds (0 = every tick)')
+    parser.add_argument('--initial-usd', type=float, help='Initial USD balance (default: trading service balance)')
+    parser.add_argument('--initial-btc', type=float, help='Initial BTC balance (default: trading service balance)')
+    parser.add_argument('--equity-out', help='Write the equity curve to this CSV file')
+    parser.add_argument('--trades-out', help='Write the trade list to this CSV file')
+    parser.add_argument('--show-trades', type=int, default=10, help='Number of trades to include in the output')
+    args = parser.parse_args()
+
+    ticks = read_ticks(args.ticks)
+    result = run_backtest(ticks['timestamp'], ticks['price'], args.buy_threshold, args.sell_threshold,
+                          args.max_trade_amount, args.interval, args.initial_usd, args.initial_btc)
+    if args.equity_out:
+        write_equity(args.equity_out, result['equity'])
+    if args.trades_out:
+        write_trades(args.trades_out, result['trades'])
+
+    print(json.dumps({
+        'success': True,
+        'summary': result['summary'],
+        'trades': trade_records(result['trades'][:args.show_trades])
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
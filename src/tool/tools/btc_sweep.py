@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+策略参数扫描
+在 buyThreshold / sellThreshold / maxTradeAmount / checkInterval 的网格（或网格上的随机采样）上
+并行回测阈值策略，按夏普比率、最大回撤、PnL等指标排序。
+各工作进程以只读方式内存映射同一个二进制tick文件，行情数据不经过pickle传递。
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from btc_backtest import run_backtest, service_defaults
+from tick_files import is_binary, read_ticks, convert
+
+PARAMETERS = ('buy_threshold', 'sell_threshold', 'max_trade_amount', 'interval')
+# 越小越好的指标，其余指标越大越好
+ASCENDING_METRICS = {'max_drawdown_pct', 'fees', 'rejected'}
+
+_worker: Dict[str, Any] = {}
+
+def parse_values(spec: str) -> List[float]:
+    """参数取值：逗号分隔的列表（90000,95000），或 start:stop:step 区间（含stop）"""
+    if ':' in spec:
+        start, stop, step = (float(part) for part in spec.split(':'))
+        return [float(v) for v in np.arange(start, stop + step / 2, step)]
+    return [float(part) for part in spec.split(',')]
+
+def build_grid(values: Dict[str, List[float]], samples: int = 0, seed: int = 0) -> List[Dict[str, float]]:
+    """参数网格（去掉买入阈值不低于卖出阈值的组合）；samples>0 时在网格上随机采样"""
+    grid = [dict(zip(PARAMETERS, combo)) for combo in itertools.product(*(values[name] for name in PARAMETERS))]
+    grid = [params for params in grid if params['buy_threshold'] < params['sell_threshold']]
+    if 0 < samples < len(grid):
+        grid = random.Random(seed).sample(grid, samples)
+    return grid
+
+def _init_worker(path: str, account: Dict[str, float]):
+    ticks = read_ticks(path)
+    _worker['timestamps'] = ticks['timestamp']
+    _worker['prices'] = ticks['price']
+    _worker['account'] = account
+
+def _evaluate(params: Dict[str, float]) -> Dict[str, Any]:
+    result = run_backtest(_worker['timestamps'], _worker['prices'], **params, **_worker['account'])
+    return {'params': params, **result['summary']}
+
+def rank(results: List[Dict[str, Any]], metrics: List[str]) -> List[Dict[str, Any]]:
+    """按指标依次排序（第一个指标优先）"""
+    def key(result):
+        return tuple(result.get(m, 0) if m in ASCENDING_METRICS else -result.get(m, 0) for m in metrics)
+    return sorted(results, key=key)
+
+def run_sweep(path: str, grid: List[Dict[str, float]], workers: Optional[int] = None,
+              account: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """并行回测参数网格；path 必须是二进制tick文件"""
+    account = account or service_defaults()
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(grid) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path, account)) as pool:
+        return list(pool.map(_evaluate, grid, chunksize=chunksize))
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Threshold strategy parameter sweep')
+    parser.add_argument('ticks', help='Tick file (.csv is converted to a temporary binary file first)')
+    parser.add_argument('--buy-thresholds', default='85000:95000:2500', help='List (a,b,c) or range (start:stop:step)')
+    parser.add_argument('--sell-thresholds', default='105000:115000:2500', help='List or range')
+    parser.add_argument('--max-trade-amounts', default='0.05,0.1', help='List or range (BTC)')
+    parser.add_argument('--intervals', default='300', help='List or range of check intervals (seconds)')
+    parser.add_argument('--samples', type=int, default=0, help='Evaluate a random sample of this many grid points')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for --samples')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--rank-by', default='sharpe,pnl', help='Comma-separated metrics, e.g. sharpe,max_drawdown_pct,pnl')
+    parser.add_argument('--top', type=int, default=10, help='Number of results to print')
+    args = parser.parse_args()
+
+    grid = build_grid({
+        'buy_threshold': parse_values(args.buy_thresholds),
+        'sell_threshold': parse_values(args.sell_thresholds),
+        'max_trade_amount': parse_values(args.max_trade_amounts),
+        'interval': parse_values(args.intervals)
+    }, args.samples, args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.ticks
+        if not is_binary(path):
+            path = os.path.join(tmp, 'ticks.bin')
+            convert(args.ticks, path)
+        start = time.perf_counter()
+        results = run_sweep(path, grid, args.workers)
+        elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'success': True,
+        'evaluated': len(results),
+        'elapsed_s': round(elapsed, 2),
+        'evaluations_per_s': round(len(results) / elapsed, 1) if elapsed else None,
+        'rank_by': args.rank_by.split(','),
+        'results': rank(results, args.rank_by.split(','))[:args.top]
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
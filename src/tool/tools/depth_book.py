@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+本地L2深度簿
+每一侧的价格档保存在有序列表中（二分查找定位），“成交X BTC的均价”从最优档位开始遍历，
+为 O(log n + k)，k 为用到的档位数。只依赖标准库，交易工具不启用深度时无需 aiohttp；
+按交易所推送维护深度簿的 DepthFeed 在 price_depth 中。
+"""
+
+import bisect
+import time
+from typing import Dict, Any, Iterator, List, Optional
+
+class DepthSide:
+    """单边深度：升序价格列表 + 价格 -> 数量"""
+
+    def __init__(self, descending: bool):
+        self.descending = descending  # 买盘从高价开始遍历
+        self.prices: List[float] = []
+        self.quantities: Dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def clear(self):
+        self.prices = []
+        self.quantities = {}
+
+    def set(self, price: float, quantity: float):
+        """更新一档，数量为0时删除该档"""
+        if quantity > 0:
+            if price not in self.quantities:
+                bisect.insort(self.prices, price)
+            self.quantities[price] = quantity
+        elif self.quantities.pop(price, None) is not None:
+            del self.prices[bisect.bisect_left(self.prices, price)]
+
+    def best(self) -> Optional[float]:
+        if not self.prices:
+            return None
+        return self.prices[-1] if self.descending else self.prices[0]
+
+    def walk(self, limit_price: Optional[float] = None) -> Iterator[float]:
+        """从最优档开始遍历价格，limit_price 限定最差可接受价格（二分定位遍历终点）"""
+        if self.descending:
+            stop = bisect.bisect_left(self.prices, limit_price) if limit_price is not None else 0
+            for i in range(len(self.prices) - 1, stop - 1, -1):
+                yield self.prices[i]
+        else:
+            stop = bisect.bisect_right(self.prices, limit_price) if limit_price is not None else len(self.prices)
+            for i in range(stop):
+                yield self.prices[i]
+
+    def top(self, levels: int) -> List[List[float]]:
+        prices = self.prices[-levels:][::-1] if self.descending else self.prices[:levels]
+        return [[price, self.quantities[price]] for price in prices]
+
+class DepthBook:
+    """本地L2深度簿"""
+
+    def __init__(self):
+        self.bids = DepthSide(descending=True)
+        self.asks = DepthSide(descending=False)
+        self.last_update_id = 0
+        self.synced = False  # 已加载快照且增量连续
+        self.updates = 0
+        self.updated_at: Optional[float] = None
+
+    def load_snapshot(self, snapshot: Dict[str, Any]):
+        """加载REST快照：{'lastUpdateId', 'bids': [[价格, 数量], ...], 'asks': [...]}"""
+        for side, levels in ((self.bids, snapshot['bids']), (self.asks, snapshot['asks'])):
+            side.clear()
+            for price, quantity in levels:
+                side.set(float(price), float(quantity))
+        self.last_update_id = snapshot['lastUpdateId']
+        self.synced = True
+        self.updated_at = time.time()
+
+    def apply_diff(self, event: Dict[str, Any]) -> bool:
+        """应用一条增量（Binance depthUpdate：U/u 为首末更新ID，b/a 为变动的档位）。
+        快照之前的增量直接忽略；出现缺口时返回 False，需要重新加载快照"""
+        if event['u'] <= self.last_update_id:
+            return True
+        if not self.synced or event['U'] > self.last_update_id + 1:
+            self.synced = False
+            return False
+        for price, quantity in event['b']:
+            self.bids.set(float(price), float(quantity))
+        for price, quantity in event['a']:
+            self.asks.set(float(price), float(quantity))
+        self.last_update_id = event['u']
+        self.updates += 1
+        self.updated_at = time.time()
+        return True
+
+    def _side(self, action: str) -> DepthSide:
+        # 买入吃卖盘，卖出吃买盘
+        return self.asks if action == 'buy' else self.bids
+
+    def fill(self, action: str, btc_amount: Optional[float] = None,
+             usd_amount: Optional[float] = None) -> Dict[str, Any]:
+        """模拟按当前深度成交 btc_amount BTC（或花费/换得 usd_amount USD）：返回成交均价、
+        吃到的档位数、最差价格和相对最优价的滑点（基点）；深度不足时 complete 为 False"""
+        side = self._side(action)
+        best = side.best()
+        by_btc = btc_amount is not None
+        target = (btc_amount if by_btc else usd_amount) * (1 - 1e-12)  # 容忍浮点误差
+        filled_btc = filled_usd = 0.0
+        worst = None
+        levels = 0
+        for price in side.walk():
+            remaining = btc_amount - filled_btc if by_btc else (usd_amount - filled_usd) / price
+            take = min(side.quantities[price], remaining)
+            filled_btc += take
+            filled_usd += take * price
+            worst = price
+            levels += 1
+            if (filled_btc if by_btc else filled_usd) >= target:
+                break
+        target_met = (filled_btc if by_btc else filled_usd) >= target
+        vwap = filled_usd / filled_btc if filled_btc else None
+        return {
+            'action': action,
+            'btc_amount': filled_btc,
+            'usd_amount': filled_usd,
+            'vwap': vwap,
+            'best_price': best,
+            'worst_price': worst,
+            'levels': levels,
+            'slippage_bps': abs(vwap - best) / best * 10000 if vwap else None,
+            'complete': bool(levels) and target_met
+        }
+
+    def liquidity(self, action: str, limit_price: float) -> Dict[str, float]:
+        """价格不差于 limit_price 的档位上可成交的BTC数量和USD金额"""
+        side = self._side(action)
+        btc = usd = 0.0
+        for price in side.walk(limit_price):
+            btc += side.quantities[price]
+            usd += side.quantities[price] * price
+        return {'btc_amount': btc, 'usd_amount': usd}
+
+    def snapshot(self, levels: int = 20) -> Dict[str, Any]:
+        best_bid, best_ask = self.bids.best(), self.asks.best()
+        return {
+            'synced': self.synced,
+            'last_update_id': self.last_update_id,
+            'bid_levels': len(self.bids),
+            'ask_levels': len(self.asks),
+            'best_bid': best_bid,
+            'best_ask': best_ask,
+            'spread': best_ask - best_bid if best_bid is not None and best_ask is not None else None,
+            'bids': self.bids.top(levels),
+            'asks': self.asks.top(levels),
+            'updated_at': self.updated_at
+        }
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+限价单簿
+挂单按价格分档，每档一个FIFO队列，档位价格保存在堆中：
+买单在市场价 <= 限价时成交（限价高的优先），卖单在市场价 >= 限价时成交（限价低的优先）。
+每个价格tick只检查堆顶，成交一笔 O(log n)；撤单为惰性删除，被撤的订单在到达队首时丢弃。
+"""
+
+import heapq
+import itertools
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Deque
+
+class RestingOrder:
+    """挂单；数量单位为BTC，locked 为该订单剩余冻结的资金（买单为USD，卖单为BTC）"""
+
+    __slots__ = ('order_id', 'action', 'limit', 'quantity', 'remaining', 'locked', 'seq', 'ledger_seq', 'active')
+
+    def __init__(self, order_id: str, action: str, limit: float, quantity: float, locked: float):
+        self.order_id = order_id
+        self.action = action
+        self.limit = limit
+        self.quantity = quantity
+        self.remaining = quantity
+        self.locked = locked
+        self.seq = 0
+        self.ledger_seq = -1
+        self.active = True
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'order_id': self.order_id,
+            'action': self.action,
+            'order_type': 'limit',
+            'limit_price': self.limit,
+            'btc_amount': round(self.quantity, 8),
+            'remaining': round(self.remaining, 8),
+            'status': 'partially_filled' if self.remaining < self.quantity else 'open'
+        }
+
+class _Side:
+    """单边订单簿：价格档堆 + 每档FIFO队列"""
+
+    def __init__(self, sign: int):
+        self.sign = sign  # 买单 -1（堆顶为最高限价），卖单 1（堆顶为最低限价）
+        self.prices: List[float] = []
+        self.levels: Dict[float, Deque[RestingOrder]] = {}
+        self.live: Dict[float, int] = {}
+
+    def add(self, order: RestingOrder):
+        level = self.levels.get(order.limit)
+        if level is None:
+            level = self.levels[order.limit] = deque()
+            self.live[order.limit] = 0
+            heapq.heappush(self.prices, self.sign * order.limit)
+        level.append(order)
+        self.live[order.limit] += 1
+
+    def discard(self, order: RestingOrder):
+        """撤单：只更新计数，队列中的订单惰性删除"""
+        self.live[order.limit] -= 1
+        if self.live[order.limit] == 0:
+            del self.levels[order.limit]
+            del self.live[order.limit]
+
+    def best(self) -> Optional[float]:
+        """最优档位价格（跳过已清空的档位）"""
+        while self.prices:
+            price = self.sign * self.prices[0]
+            if price in self.levels:
+                return price
+            heapq.heappop(self.prices)
+        return None
+
+    def head(self, price: float) -> RestingOrder:
+        level = self.levels[price]
+        while not level[0].active:
+            level.popleft()
+        return level[0]
+
+    def pop_head(self, price: float):
+        level = self.levels[price]
+        level.popleft()
+        self.discard_filled(price)
+
+    def discard_filled(self, price: float):
+        self.live[price] -= 1
+        if self.live[price] == 0:
+            del self.levels[price]
+            del self.live[price]
+            heapq.heappop(self.prices)
+
+class LimitOrderBook:
+    """限价单簿，只负责排序与撮合；资金冻结和记账由交易服务完成"""
+
+    def __init__(self):
+        self.bids = _Side(-1)
+        self.asks = _Side(1)
+        self.orders: Dict[str, RestingOrder] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def add(self, order: RestingOrder):
+        order.seq = next(self._seq)
+        self.orders[order.order_id] = order
+        (self.bids if order.action == 'buy' else self.asks).add(order)
+
+    def get(self, order_id: str) -> Optional[RestingOrder]:
+        return self.orders.get(order_id)
+
+    def cancel(self, order_id: str) -> Optional[RestingOrder]:
+        order = self.orders.pop(order_id, None)
+        if order is not None:
+            order.active = False
+            (self.bids if order.action == 'buy' else self.asks).discard(order)
+        return order
+
+    def match(self, price: float, volume: Optional[float] = None) -> List[Tuple[RestingOrder, float]]:
+        """价格tick到达时撮合可成交的挂单，返回 [(订单, 成交数量)]。
+        volume 为该tick可成交的BTC数量（None 表示不限），不足时按优先级部分成交"""
+        fills: List[Tuple[RestingOrder, float]] = []
+        available = float('inf') if volume is None else volume
+        for side, crosses in ((self.bids, lambda limit: price <= limit), (self.asks, lambda limit: price >= limit)):
+            while available > 0:
+                best = side.best()
+                if best is None or not crosses(best):
+                    break
+                order = side.head(best)
+                quantity = min(order.remaining, available)
+                order.remaining -= quantity
+                available -= quantity
+                if order.remaining <= 1e-12:
+                    order.remaining = 0.0
+                    order.active = False
+                    del self.orders[order.order_id]
+                    side.pop_head(best)
+                fills.append((order, quantity))
+        return fills
+
+    def open_orders(self, limit: int = 100) -> List[Dict[str, object]]:
+        """最近的挂单，按下单时间倒序"""
+        recent = sorted(self.orders.values(), key=lambda order: order.seq, reverse=True)[:limit]
+        return [order.to_dict() for order in recent]
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+订单账本
+只追加的定长记录文件（内存映射），记录成交、挂单、撤单和定期的余额快照；
+重启时从最近的快照开始重放尾部记录恢复余额。订单ID通过内存映射的哈希索引定位，
+时间范围查询在记录的时间戳上二分查找（时间戳单调不减）。
+多个进程可以共用同一个账本：写入和查询都在文件锁内进行，并先追上其他进程写入的记录。
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+DEFAULT_LEDGER_DIR = os.path.join(tempfile.gettempdir(), 'joyhouse-btc-ledger')
+
+LEDGER_MAGIC = b'JHLEDG01'
+# 文件头：magic, 记录数, 最近快照的序号
+HEADER = struct.Struct('<8sQq')
+HEADER_SIZE = 64
+# 记录：序号, 时间戳, 类型, 方向, 订单类型, 订单ID, 价格, BTC数量, USD金额, 手续费,
+#       USD变动, BTC变动（快照记录为余额）, 关联记录序号
+RECORD = struct.Struct('<QdBBB5x16sddddddq')
+RECORD_SIZE = RECORD.size
+
+KIND_SNAPSHOT = 0
+KIND_FILL = 1
+KIND_CANCEL = 2
+KIND_OPEN = 3     # 限价单挂单（资金冻结不改变余额，变动为0）
+KIND_PARTIAL = 4  # 限价单部分成交
+
+STATUSES = {KIND_FILL: 'filled', KIND_CANCEL: 'cancelled', KIND_OPEN: 'open', KIND_PARTIAL: 'partially_filled'}
+TIME_FIELDS = {KIND_FILL: 'executed_at', KIND_CANCEL: 'cancelled_at', KIND_OPEN: 'created_at',
+               KIND_PARTIAL: 'executed_at'}
+
+ACTIONS = {0: None, 1: 'buy', 2: 'sell'}
+ACTION_CODES = {'buy': 1, 'sell': 2}
+ORDER_TYPES = {0: 'market', 1: 'limit'}
+ORDER_TYPE_CODES = {'market': 0, 'limit': 1}
+
+INDEX_MAGIC = b'JHLIDX01'
+# 索引文件头：magic, 槽位数, 已用槽位数, 已建索引的记录数
+INDEX_HEADER = struct.Struct('<8sQQQ')
+# 槽位：订单ID, 最新记录序号+1（0表示空槽）
+INDEX_SLOT = struct.Struct('<16sQ')
+
+def _format_id(order_id: bytes) -> str:
+    """16字节订单ID格式化为UUID字符串（比 uuid.UUID 快数倍，历史查询的主要开销）"""
+    h = order_id.hex()
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
+def _grow_file(fd: int, size: int):
+    if os.fstat(fd).st_size < size:
+        os.ftruncate(fd, size)
+
+class OrderIndex:
+    """订单ID -> 最新记录序号 的开放寻址哈希表（线性探测，装载率超过1/2时翻倍重建）"""
+
+    def __init__(self, path: str, capacity: int = 1 << 16):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < INDEX_HEADER.size:
+            self._create(capacity)
+        self._map()
+
+    def _create(self, capacity: int):
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, INDEX_HEADER.size + capacity * INDEX_SLOT.size)
+        os.pwrite(self._fd, INDEX_HEADER.pack(INDEX_MAGIC, capacity, 0, 0), 0)
+
+    def _map(self):
+        self._mm = mmap.mmap(self._fd, 0)
+        magic, self.capacity, _, _ = INDEX_HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f'Not an order index: {self.path}')
+
+    def refresh(self):
+        """其他进程重建索引后重新映射"""
+        if INDEX_HEADER.unpack_from(self._mm, 0)[1] != self.capacity or len(self._mm) != os.fstat(self._fd).st_size:
+            self._mm.close()
+            self._map()
+
+    @property
+    def indexed(self) -> int:
+        return INDEX_HEADER.unpack_from(self._mm, 0)[3]
+
+    def _slot(self, key: bytes) -> int:
+        mask = self.capacity - 1
+        i = int.from_bytes(key[:8], 'little') & mask
+        while True:
+            offset = INDEX_HEADER.size + i * INDEX_SLOT.size
+            stored, seq_plus_one = INDEX_SLOT.unpack_from(self._mm, offset)
+            if seq_plus_one == 0 or stored == key:
+                return offset
+            i = (i + 1) & mask
+
+    def get(self, key: bytes) -> Optional[int]:
+        stored, seq_plus_one = INDEX_SLOT.unpack_from(self._mm, self._slot(key))
+        return seq_plus_one - 1 if seq_plus_one else None
+
+    def put(self, key: bytes, seq: int):
+        offset = self._slot(key)
+        magic, capacity, used, indexed = INDEX_HEADER.unpack_from(self._mm, 0)
+        if INDEX_SLOT.unpack_from(self._mm, offset)[1] == 0:
+            used += 1
+        INDEX_SLOT.pack_into(self._mm, offset, key, seq + 1)
+        INDEX_HEADER.pack_into(self._mm, 0, magic, capacity, used, max(indexed, seq + 1))
+
+    def needs_rebuild(self) -> bool:
+        return INDEX_HEADER.unpack_from(self._mm, 0)[2] * 2 >= self.capacity
+
+    def reset(self, capacity: int):
+        self._mm.close()
+        self._create(capacity)
+        self._map()
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+class OrderLedger:
+    """只追加的订单账本，balance 为账本重放得到的当前余额（与交易服务共用同一个dict）。
+    文件锁只在进程之间互斥（flock 属于打开的文件描述，同一进程的线程共用），
+    同一个进程内的读写需要由调用方串行化（交易服务使用服务锁）"""
+
+    def __init__(self, ledger_dir: Optional[str] = None, snapshot_every: int = 1000,
+                 durable: bool = False):
+        self.ledger_dir = ledger_dir or os.environ.get('BTC_LEDGER_DIR', DEFAULT_LEDGER_DIR)
+        os.makedirs(self.ledger_dir, exist_ok=True)
+        self.path = os.path.join(self.ledger_dir, 'orders.ledger')
+        self.snapshot_every = snapshot_every
+        self.durable = durable  # 每次追加后msync，掉电也不丢记录，但每笔多约1ms
+        self.balance: Dict[str, float] = {}
+        self.replayed = 0  # 恢复时重放的记录数
+        self.recovery_seconds = 0.0
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._mm: Optional[mmap.mmap] = None
+        self._seen = 0  # 已应用到 balance 的记录数
+        with self._locked(fcntl.LOCK_EX):
+            if os.fstat(self._fd).st_size < HEADER_SIZE:
+                _grow_file(self._fd, HEADER_SIZE + 4096 * RECORD_SIZE)
+                os.pwrite(self._fd, HEADER.pack(LEDGER_MAGIC, 0, -1), 0)
+            self._remap()
+            if HEADER.unpack_from(self._mm, 0)[0] != LEDGER_MAGIC:
+                raise ValueError(f'Not an order ledger: {self.path}')
+            self.index = OrderIndex(os.path.join(self.ledger_dir, 'orders.index'))
+            self._catch_up_index()
+
+    # ---- 文件映射与锁 ----
+
+    def _remap(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mmap.mmap(self._fd, 0)
+
+    @property
+    def count(self) -> int:
+        return HEADER.unpack_from(self._mm, 0)[1]
+
+    @contextmanager
+    def _locked(self, mode: int):
+        fcntl.flock(self._fd, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _refresh(self, exclusive: bool = False):
+        """追上其他进程写入的记录"""
+        if len(self._mm) != os.fstat(self._fd).st_size:
+            self._remap()
+        self.index.refresh()
+        self._apply(self.count)
+        if exclusive:
+            self._catch_up_index()
+
+    @contextmanager
+    def transaction(self):
+        """写事务：持有排他锁，期间余额与账本一致"""
+        with self._locked(fcntl.LOCK_EX):
+            self._refresh(exclusive=True)
+            yield self
+
+    @contextmanager
+    def reading(self):
+        with self._locked(fcntl.LOCK_SH):
+            self._refresh()
+            yield self
+
+    # ---- 恢复 ----
+
+    def attach(self, balance: Dict[str, float]) -> Dict[str, float]:
+        """把交易服务的余额dict交给账本：账本为空时写入初始快照，否则从最近快照重放恢复"""
+        with self._locked(fcntl.LOCK_EX):
+            self.balance = balance
+            last_snapshot = HEADER.unpack_from(self._mm, 0)[2]
+            if last_snapshot < 0:
+                self._append(KIND_SNAPSHOT, usd=balance['usd'], btc=balance['btc'])
+                self._seen = self.count
+            else:
+                self._seen = last_snapshot
+                before = time.perf_counter()
+                self._apply(self.count)
+                self.replayed = self.count - last_snapshot
+                self.recovery_seconds = time.perf_counter() - before
+        return balance
+
+    def _apply(self, upto: int):
+        if not self.balance:
+            return  # 尚未 attach，恢复时从快照开始重放
+        while self._seen < upto:
+            record = self._read(self._seen)
+            kind, usd, btc = record[2], record[10], record[11]
+            if kind == KIND_SNAPSHOT:
+                self.balance['usd'], self.balance['btc'] = usd, btc
+            else:
+                self.balance['usd'] += usd
+                self.balance['btc'] += btc
+            self._seen += 1
+
+    def _catch_up_index(self):
+        """为尚未建索引的记录建索引（进程在写入记录和更新索引之间退出时），装载率过高时翻倍重建"""
+        seq = self.index.indexed
+        while seq < self.count:
+            record = self._read(seq)
+            if record[2] != KIND_SNAPSHOT:
+                self.index.put(record[5], seq)
+                if self.index.needs_rebuild():
+                    self.index.reset(self.index.capacity * 2)
+                    seq = 0
+                    continue
+            seq += 1
+
+    # ---- 写入 ----
+
+    def _append(self, kind: int, order_id: bytes = bytes(16), action: int = 0, order_type: int = 0,
+                price: float = 0.0, btc_amount: float = 0.0, usd_amount: float = 0.0, fee: float = 0.0,
+                usd: float = 0.0, btc: float = 0.0, ref: int = -1) -> int:
+        _, count, last_snapshot = HEADER.unpack_from(self._mm, 0)
+        offset = HEADER_SIZE + count * RECORD_SIZE
+        if offset + RECORD_SIZE > len(self._mm):
+            _grow_file(self._fd, HEADER_SIZE + max(4096, count * 2) * RECORD_SIZE)
+            self._remap()
+        ts = time.time()
+        if count:
+            ts = max(ts, RECORD.unpack_from(self._mm, offset - RECORD_SIZE)[1])  # 时间戳单调不减，保证可二分
+        RECORD.pack_into(self._mm, offset, count, ts, kind, action, order_type, order_id,
+                         price, btc_amount, usd_amount, fee, usd, btc, ref)
+        if kind == KIND_SNAPSHOT:
+            last_snapshot = count
+        HEADER.pack_into(self._mm, 0, LEDGER_MAGIC, count + 1, last_snapshot)
+        if self.durable:
+            self._mm.flush()
+        if kind != KIND_SNAPSHOT:
+            self.index.put(order_id, count)
+            if self.index.needs_rebuild():
+                self.index.reset(self.index.capacity * 2)
+                self._catch_up_index()
+        return count
+
+    def record_fill(self, order_id: str, action: str, order_type: str, price: float, btc_amount: float,
+                    usd_amount: float, fee: float, usd_delta: float, btc_delta: float,
+                    partial: bool = False) -> int:
+        """记录一笔成交（余额变动已由调用方应用到 balance），需要在 transaction() 内调用；
+        partial 表示限价单的部分成交，订单仍在挂单中"""
+        seq = self._append(KIND_PARTIAL if partial else KIND_FILL, uuid.UUID(order_id).bytes, ACTION_CODES[action],
+                           ORDER_TYPE_CODES.get(order_type, 0), price, btc_amount, usd_amount, fee,
+                           usd_delta, btc_delta)
+        self._seen = seq + 1
+        self._maybe_snapshot()
+        return seq
+
+    def record_open(self, order_id: str, action: str, price: float, btc_amount: float, usd_amount: float) -> int:
+        """记录一笔限价挂单，返回记录序号（撤单时作为关联记录），需要在 transaction() 内调用"""
+        seq = self._append(KIND_OPEN, uuid.UUID(order_id).bytes, ACTION_CODES[action], ORDER_TYPE_CODES['limit'],
+                           price, btc_amount, usd_amount)
+        self._seen = seq + 1
+        self._maybe_snapshot()
+        return seq
+
+    def record_cancel(self, order_id: str, ref: int, usd_delta: float = 0.0, btc_delta: float = 0.0) -> int:
+        """记录一次撤单（解冻的余额变动已由调用方应用），需要在 transaction() 内调用"""
+        original = self._read(ref)
+        seq = self._append(KIND_CANCEL, original[5], original[3], original[4], original[6], original[7],
+                           original[8], 0.0, usd_delta, btc_delta, ref)
+        self._seen = seq + 1
+        self._maybe_snapshot()
+        return seq
+
+    def _maybe_snapshot(self):
+        if self.count - 1 - HEADER.unpack_from(self._mm, 0)[2] >= self.snapshot_every:
+            self._append(KIND_SNAPSHOT, usd=self.balance['usd'], btc=self.balance['btc'])
+            self._seen = self.count
+
+    # ---- 查询 ----
+
+    def _read(self, seq: int) -> tuple:
+        return RECORD.unpack_from(self._mm, HEADER_SIZE + seq * RECORD_SIZE)
+
+    def _to_order(self, record: tuple) -> Dict[str, Any]:
+        seq, ts, kind, action, order_type, order_id, price, btc_amount, usd_amount, fee, _, _, ref = record
+        order = {
+            'order_id': _format_id(order_id),
+            'seq': seq,
+            'action': ACTIONS[action],
+            'order_type': ORDER_TYPES.get(order_type, 'market'),
+            'btc_amount': round(btc_amount, 8),
+            'usd_amount': round(usd_amount, 2),
+            'btc_price': price,
+            'fee': round(fee, 2),
+            'status': STATUSES[kind]
+        }
+        order[TIME_FIELDS[kind]] = datetime.fromtimestamp(ts).isoformat()
+        return order
+
+    def find(self, order_id: str) -> Optional[tuple]:
+        """按订单ID返回该订单最新的记录（原始元组），需要在 reading()/transaction() 内调用"""
+        try:
+            key = uuid.UUID(order_id).bytes
+        except (TypeError, ValueError):
+            return None
+        seq = self.index.get(key)
+        return self._read(seq) if seq is not None else None
+
+    def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        with self.reading():
+            record = self.find(order_id)
+            return self._to_order(record) if record else None
+
+    def _bisect(self, ts: float, right: bool = False) -> int:
+        """第一条时间戳 >= ts（right 时为 > ts）的记录序号"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            stored = self._read(mid)[1]
+            if stored < ts or (right and stored == ts):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def history(self, limit: int = 10, start_time: Optional[float] = None,
+                end_time: Optional[float] = None) -> List[Dict[str, Any]]:
+        """时间范围内（Unix秒，含起止）最新的 limit 条订单记录，按时间倒序，不含快照"""
+        with self.reading():
+            lo = self._bisect(start_time) if start_time is not None else 0
+            seq = (self._bisect(end_time, right=True) if end_time is not None else self.count) - 1
+            orders = []
+            while seq >= lo and len(orders) < limit:
+                record = self._read(seq)
+                if record[2] != KIND_SNAPSHOT:
+                    orders.append(self._to_order(record))
+                seq -= 1
+            return orders
+
+    def close(self):
+        self.index.close()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        os.close(self._fd)
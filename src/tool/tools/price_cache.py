@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+行情缓存
+带TTL的共享价格缓存：过期后在宽限期内先返回旧值并在后台刷新（stale-while-revalidate），
+并发调用方共享同一次上游请求（single-flight）。缓存落在文件中，多个CLI进程之间同样生效。
+"""
+
+import asyncio
+import errno
+import fcntl
+import json
+import os
+import tempfile
+import time
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'joyhouse-btc-price-cache')
+
+Fetcher = Callable[[], Awaitable[Dict[str, Any]]]
+
+class PriceCache:
+    """文件共享的TTL缓存"""
+
+    def __init__(self, ttl: float = 5.0, stale_ttl: float = 30.0, cache_dir: Optional[str] = None,
+                 lock_poll_interval: float = 0.01):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl  # TTL过期后仍可返回旧值的宽限时间
+        self.cache_dir = cache_dir or os.environ.get('BTC_PRICE_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.lock_poll_interval = lock_poll_interval
+        self.upstream_fetches = 0
+        self._memory: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.{suffix}')
+
+    def _read_file(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        try:
+            with open(self._path(key, 'json'), 'r') as f:
+                entry = json.load(f)
+            return entry['fetched_at'], entry['value']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _read(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """读取缓存，内存中的条目新鲜时不访问文件"""
+        entry = self._memory.get(key)
+        if entry and time.time() - entry[0] < self.ttl:
+            return entry
+        file_entry = self._read_file(key)
+        if file_entry and (not entry or file_entry[0] > entry[0]):
+            self._memory[key] = file_entry
+            return file_entry
+        return entry
+
+    def _write(self, key: str, value: Dict[str, Any], fetched_at: float):
+        """原子写入：先写临时文件再替换"""
+        self._memory[key] = (fetched_at, value)
+        tmp_path = self._path(key, f'{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'fetched_at': fetched_at, 'value': value}, f)
+        os.replace(tmp_path, self._path(key, 'json'))
+
+    async def _acquire_file_lock(self, fd: int):
+        """非阻塞轮询获取跨进程文件锁，不占用事件循环线程"""
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+                await asyncio.sleep(self.lock_poll_interval)
+
+    async def _fetch_locked(self, key: str, fetch: Fetcher) -> Dict[str, Any]:
+        """持有跨进程锁时请求上游；拿到锁后若其他进程已刷新则直接使用其结果"""
+        fd = os.open(self._path(key, 'lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            await self._acquire_file_lock(fd)
+            entry = self._read_file(key)
+            if entry and time.time() - entry[0] < self.ttl:
+                self._memory[key] = entry
+                return entry[1]
+
+            self.upstream_fetches += 1
+            fetched_at = time.time()
+            value = await fetch()
+            if value.get('success'):
+                self._write(key, value, fetched_at)
+            return value
+        finally:
+            os.close(fd)  # 关闭文件描述符即释放flock
+
+    def _single_flight(self, key: str, fetch: Fetcher) -> asyncio.Task:
+        """同一进程内对同一key只保留一个上游请求"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_locked(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def get(self, key: str, fetch: Fetcher) -> Tuple[Dict[str, Any], float]:
+        """读取缓存值，返回 (值, 缓存年龄秒数)"""
+        entry = self._read(key)
+        if entry:
+            age = time.time() - entry[0]
+            if age < self.ttl:
+                return entry[1], age
+            if age < self.ttl + self.stale_ttl:
+                self._single_flight(key, fetch)  # 后台刷新，先返回旧值
+                return entry[1], age
+
+        value = await asyncio.shield(self._single_flight(key, fetch))
+        entry = self._memory.get(key)
+        return value, time.time() - entry[0] if entry and entry[1] is value else 0.0
+
+    async def drain(self):
+        """等待后台刷新完成（一次性CLI进程退出前调用）"""
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+本地L2深度簿
+按Binance的同步方式维护：先订阅增量深度推送并缓存，再拉取REST快照，丢弃快照之前的增量，
+之后每条增量的首个更新ID必须紧接上一条的末尾，出现缺口时重新拉取快照。
+深度簿本身（DepthBook）在 depth_book 中，不依赖 aiohttp。
+"""
+
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+
+from depth_book import DepthBook
+
+DEFAULT_DEPTH_ENDPOINTS = {
+    'snapshot': 'https://api.binance.com/api/v3/depth',
+    'stream': 'wss://stream.binance.com:9443/ws/btcusdt@depth@100ms'
+}
+
+class DepthFeed:
+    """订阅增量深度推送并保持本地深度簿同步；断线按指数退避重连，缺口时重新拉取快照"""
+
+    def __init__(self, book: Optional[DepthBook] = None, snapshot_url: Optional[str] = None,
+                 stream_url: Optional[str] = None, symbol: str = 'BTCUSDT', snapshot_limit: int = 5000,
+                 min_backoff: float = 0.5, max_backoff: float = 30.0):
+        self.book = book or DepthBook()
+        self.snapshot_url = snapshot_url or DEFAULT_DEPTH_ENDPOINTS['snapshot']
+        self.stream_url = stream_url or DEFAULT_DEPTH_ENDPOINTS['stream']
+        self.params = {'symbol': symbol, 'limit': snapshot_limit}
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.messages = 0
+        self.connects = 0
+        self.resyncs = 0  # 因增量缺口重新拉取快照的次数
+        self.errors = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _fetch_snapshot(self, session: aiohttp.ClientSession) -> Dict[str, Any]:
+        async with session.get(self.snapshot_url, params=self.params,
+                               timeout=aiohttp.ClientTimeout(total=10)) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def _consume(self, session: aiohttp.ClientSession, ws: aiohttp.ClientWebSocketResponse):
+        """快照到达前缓存增量；快照加载后依次应用缓存和后续增量"""
+        self.book.synced = False
+        pending: List[Dict[str, Any]] = []
+        snapshot = asyncio.ensure_future(self._fetch_snapshot(session))
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    if message.type == aiohttp.WSMsgType.ERROR:
+                        break
+                    continue
+                event = json.loads(message.data)
+                if event.get('e') != 'depthUpdate':
+                    continue
+                self.messages += 1
+                if self.book.synced:
+                    if self.book.apply_diff(event):
+                        continue
+                    # 缺口：重新拉取快照，期间继续缓存增量
+                    self.resyncs += 1
+                    snapshot = asyncio.ensure_future(self._fetch_snapshot(session))
+                pending.append(event)
+                if snapshot.done():
+                    self.book.load_snapshot(snapshot.result())
+                    for buffered in pending:
+                        if not self.book.apply_diff(buffered):
+                            # 快照早于缓存的第一条增量，再拉一次
+                            self.resyncs += 1
+                            snapshot = asyncio.ensure_future(self._fetch_snapshot(session))
+                            break
+                    else:
+                        pending = []
+        finally:
+            snapshot.cancel()
+            self.book.synced = False
+
+    async def run(self, session: aiohttp.ClientSession):
+        backoff = self.min_backoff
+        while True:
+            try:
+                async with session.ws_connect(self.stream_url, heartbeat=20) as ws:
+                    self.connects += 1
+                    backoff = self.min_backoff
+                    await self._consume(session, ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"depth feed error: {e!r}", file=sys.stderr)
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def start(self):
+        if self._task is None:
+            self._session = aiohttp.ClientSession()
+            self._task = asyncio.ensure_future(self.run(self._session))
+
+    async def wait_synced(self, timeout: float = 10.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.book.synced:
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'messages': self.messages,
+            'updates': self.book.updates,
+            'connects': self.connects,
+            'resyncs': self.resyncs,
+            'errors': self.errors,
+            'synced': self.book.synced,
+            'bid_levels': len(self.book.bids),
+            'ask_levels': len(self.book.asks)
+        }
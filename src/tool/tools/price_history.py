@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+价格历史
+定长环形缓冲（array('d')）保存带时间戳的报价，增量生成1m/5m/1h OHLCV K线，
+并用单调队列维护滚动24小时最高/最低价和成交量，查询为O(1)，内存占用固定。
+"""
+
+import time
+from array import array
+from collections import deque
+from typing import Dict, Any, List, Optional, Deque, Tuple
+
+WINDOW_24H = 24 * 60 * 60
+
+CANDLE_INTERVALS = {
+    '1m': (60, 24 * 60),          # 周期（秒）, 保留根数：24小时
+    '5m': (5 * 60, 7 * 24 * 12),  # 7天
+    '1h': (60 * 60, 30 * 24)      # 30天
+}
+
+class CandleSeries:
+    """单一周期的K线环形缓冲，按tick增量更新最后一根K线"""
+
+    def __init__(self, interval: int, capacity: int):
+        self.interval = interval
+        self.capacity = capacity
+        self._open_time = array('d', bytes(8 * capacity))
+        self._open = array('d', bytes(8 * capacity))
+        self._high = array('d', bytes(8 * capacity))
+        self._low = array('d', bytes(8 * capacity))
+        self._close = array('d', bytes(8 * capacity))
+        self._volume = array('d', bytes(8 * capacity))
+        self._count = 0  # 累计生成的K线数（最后一根的序号 = count - 1）
+
+    def add(self, ts: float, price: float, volume: float):
+        bucket = ts - ts % self.interval
+        last = (self._count - 1) % self.capacity
+        if self._count and self._open_time[last] == bucket:
+            if price > self._high[last]:
+                self._high[last] = price
+            if price < self._low[last]:
+                self._low[last] = price
+            self._close[last] = price
+            self._volume[last] += volume
+            return
+        if self._count and bucket < self._open_time[last]:
+            return  # 乱序tick早于当前K线，忽略
+        i = self._count % self.capacity
+        self._open_time[i] = bucket
+        self._open[i] = self._high[i] = self._low[i] = self._close[i] = price
+        self._volume[i] = volume
+        self._count += 1
+
+    def latest(self, limit: int = 60) -> List[Dict[str, float]]:
+        """最近 limit 根K线，按时间升序"""
+        n = min(limit, self._count, self.capacity)
+        candles = []
+        for seq in range(self._count - n, self._count):
+            i = seq % self.capacity
+            candles.append({
+                'open_time': self._open_time[i],
+                'open': self._open[i],
+                'high': self._high[i],
+                'low': self._low[i],
+                'close': self._close[i],
+                'volume': self._volume[i]
+            })
+        return candles
+
+class PriceHistory:
+    """报价环形缓冲 + 增量K线 + 滚动窗口统计"""
+
+    def __init__(self, capacity: int = 86400, window: float = WINDOW_24H):
+        self.capacity = capacity  # 窗口内tick数超过容量时，最早的tick被覆盖并移出窗口
+        self.window = window
+        self._ts = array('d', bytes(8 * capacity))
+        self._price = array('d', bytes(8 * capacity))
+        self._volume = array('d', bytes(8 * capacity))
+        self._count = 0          # 累计写入的tick数
+        self._window_start = 0   # 窗口内最早tick的序号
+        self._window_volume = 0.0
+        # 单调队列保存 (序号, 价格)：最大值队列价格递减，最小值队列价格递增
+        self._max_queue: Deque[Tuple[int, float]] = deque()
+        self._min_queue: Deque[Tuple[int, float]] = deque()
+        self.candles = {name: CandleSeries(interval, size) for name, (interval, size) in CANDLE_INTERVALS.items()}
+
+    def __len__(self) -> int:
+        return self._count - self._window_start
+
+    def add(self, price: float, volume: float = 0.0, ts: Optional[float] = None):
+        """追加一个tick，均摊O(1)"""
+        ts = time.time() if ts is None else ts
+        seq = self._count
+        if seq - self._window_start >= self.capacity:
+            self._evict_one()  # 环形缓冲已满，被覆盖的tick移出窗口
+        i = seq % self.capacity
+        self._ts[i] = ts
+        self._price[i] = price
+        self._volume[i] = volume
+        self._count += 1
+        self._window_volume += volume
+
+        while self._max_queue and self._max_queue[-1][1] <= price:
+            self._max_queue.pop()
+        self._max_queue.append((seq, price))
+        while self._min_queue and self._min_queue[-1][1] >= price:
+            self._min_queue.pop()
+        self._min_queue.append((seq, price))
+
+        for series in self.candles.values():
+            series.add(ts, price, volume)
+        self._expire(ts)
+
+    def _evict_one(self):
+        i = self._window_start % self.capacity
+        self._window_volume -= self._volume[i]
+        self._window_start += 1
+        if self._max_queue and self._max_queue[0][0] < self._window_start:
+            self._max_queue.popleft()
+        if self._min_queue and self._min_queue[0][0] < self._window_start:
+            self._min_queue.popleft()
+
+    def _expire(self, now: float):
+        cutoff = now - self.window
+        while self._window_start < self._count and self._ts[self._window_start % self.capacity] < cutoff:
+            self._evict_one()
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """滚动窗口内的最高价、最低价、成交量和涨跌幅，O(1)。now 默认为当前时间，先移出过期的tick；
+        window_s 为实际覆盖的时长（最早tick到 now），启动不久或tick超过容量时小于窗口长度"""
+        now = time.time() if now is None else now
+        self._expire(now)
+        if len(self) == 0:
+            return {'samples': 0}
+        first = self._price[self._window_start % self.capacity]
+        last = self._price[(self._count - 1) % self.capacity]
+        since = self._ts[self._window_start % self.capacity]
+        return {
+            'samples': len(self),
+            'high_24h': self._max_queue[0][1],
+            'low_24h': self._min_queue[0][1],
+            'volume_24h': self._window_volume,
+            'change_24h': (last - first) / first * 100 if first else 0,
+            'since': since,
+            'window_s': max(0.0, now - since)
+        }
+
+    def fill_missing(self, result: Dict[str, Any], min_coverage: float = 0.9) -> Dict[str, Any]:
+        """交易所未提供24小时字段时，用本地历史补齐（只补值为空或0的字段）。
+        本地历史覆盖不到窗口的 min_coverage 时不补，避免把几分钟的数据当成24小时统计；
+        补齐时附带 history_window_s（实际覆盖的秒数）"""
+        stats = self.stats()
+        if not stats['samples'] or stats['window_s'] < self.window * min_coverage:
+            return result
+        filled = False
+        for field in ('high_24h', 'low_24h', 'volume_24h', 'change_24h'):
+            if not result.get(field) and stats[field]:
+                result[field] = stats[field]
+                filled = True
+        if filled:
+            result['history_window_s'] = round(stats['window_s'])
+        return result
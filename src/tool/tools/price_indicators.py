@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+技术指标
+SMA、EMA、RSI（Wilder）、布林带、VWAP。IncrementalIndicators 每个tick O(1) 更新；
+compute_indicators 对整段历史做NumPy向量化全量计算，结果与增量计算一致，也用于从历史重建增量状态。
+"""
+
+import math
+from collections import deque
+from typing import Dict, Any, Optional, Sequence, Deque, Tuple
+
+DEFAULT_PERIODS = {
+    'sma_period': 20,    # SMA与布林带中轨
+    'ema_period': 20,
+    'rsi_period': 14,
+    'bb_k': 2.0,         # 布林带宽度（标准差倍数）
+    'vwap_period': 288   # 按tick数滚动；模板每5分钟一次时为24小时
+}
+
+def _rsi(avg_gain: float, avg_loss: float) -> float:
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+class IncrementalIndicators:
+    """逐tick增量更新的指标状态"""
+
+    def __init__(self, sma_period: int = 20, ema_period: int = 20, rsi_period: int = 14,
+                 bb_k: float = 2.0, vwap_period: int = 288):
+        self.sma_period = sma_period
+        self.ema_period = ema_period
+        self.rsi_period = rsi_period
+        self.bb_k = bb_k
+        self.vwap_period = vwap_period
+        self._reset()
+
+    def _reset(self):
+        self.samples = 0
+        self._window: Deque[float] = deque(maxlen=self.sma_period)
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._ema: Optional[float] = None
+        self._prev: Optional[float] = None
+        self._changes = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+        self._vwap_window: Deque[Tuple[float, float]] = deque(maxlen=self.vwap_period)
+        self._pv_sum = 0.0
+        self._v_sum = 0.0
+
+    def update(self, price: float, volume: float = 0.0):
+        """追加一个tick，O(1)"""
+        self.samples += 1
+
+        if len(self._window) == self.sma_period:
+            old = self._window[0]
+            self._sum -= old
+            self._sumsq -= old * old
+        self._window.append(price)
+        self._sum += price
+        self._sumsq += price * price
+
+        alpha = 2.0 / (self.ema_period + 1)
+        self._ema = price if self._ema is None else self._ema + alpha * (price - self._ema)
+
+        if self._prev is not None:
+            change = price - self._prev
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            self._changes += 1
+            n = self.rsi_period
+            if self._changes <= n:
+                # 前 n 个变化取简单平均作为初值
+                self._avg_gain += gain / n
+                self._avg_loss += loss / n
+            else:
+                self._avg_gain = (self._avg_gain * (n - 1) + gain) / n
+                self._avg_loss = (self._avg_loss * (n - 1) + loss) / n
+        self._prev = price
+
+        if len(self._vwap_window) == self.vwap_period:
+            old_pv, old_v = self._vwap_window[0]
+            self._pv_sum -= old_pv
+            self._v_sum -= old_v
+        self._vwap_window.append((price * volume, volume))
+        self._pv_sum += price * volume
+        self._v_sum += volume
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前指标值，数据不足的指标为None；窗口内没有成交量（只有REST轮询报价）时不返回 vwap"""
+        result: Dict[str, Any] = {
+            'samples': self.samples,
+            'sma': None,
+            'ema': self._ema,
+            'rsi': _rsi(self._avg_gain, self._avg_loss) if self._changes >= self.rsi_period else None,
+            'bb_upper': None,
+            'bb_middle': None,
+            'bb_lower': None
+        }
+        if self._v_sum > 0:
+            result['vwap'] = self._pv_sum / self._v_sum
+        if len(self._window) == self.sma_period:
+            n = self.sma_period
+            mean = self._sum / n
+            std = math.sqrt(max(0.0, self._sumsq / n - mean * mean))
+            result.update({
+                'sma': mean,
+                'bb_upper': mean + self.bb_k * std,
+                'bb_middle': mean,
+                'bb_lower': mean - self.bb_k * std
+            })
+        return result
+
+    def rebuild(self, prices: Sequence[float], volumes: Optional[Sequence[float]] = None):
+        """用NumPy向量化计算整段历史，并把增量状态设置为处理完这些tick后的状态"""
+        self._reset()
+        if len(prices) == 0:
+            return
+        full = compute_indicators(prices, volumes, sma_period=self.sma_period, ema_period=self.ema_period,
+                                  rsi_period=self.rsi_period, bb_k=self.bb_k, vwap_period=self.vwap_period,
+                                  state=True)
+        state = full['state']
+        self.samples = len(prices)
+        self._window.extend(float(p) for p in prices[-self.sma_period:])
+        self._sum = math.fsum(self._window)
+        self._sumsq = math.fsum(p * p for p in self._window)
+        self._ema = state['ema']
+        self._prev = float(prices[-1])
+        self._changes = len(prices) - 1
+        self._avg_gain = state['avg_gain']
+        self._avg_loss = state['avg_loss']
+        tail_prices = prices[-self.vwap_period:]
+        tail_volumes = volumes[-self.vwap_period:] if volumes is not None else [0.0] * len(tail_prices)
+        self._vwap_window.extend((float(p) * float(v), float(v)) for p, v in zip(tail_prices, tail_volumes))
+        self._pv_sum = math.fsum(pv for pv, _ in self._vwap_window)
+        self._v_sum = math.fsum(v for _, v in self._vwap_window)
+
+def ema_series(values, alpha: float, init: float):
+    """向量化计算 e_t = (1-alpha)*e_{t-1} + alpha*x_t（e_{-1} = init）。
+    分块使用闭式解 e_t = b^(t+1) * (init + alpha * Σ x_i * b^-(i+1))，块长保证 b^-k 不溢出"""
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    b = 1.0 - alpha
+    if b <= 0:
+        out[:] = values
+        return out
+    block = max(1, int(500 / -math.log(b)))
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        k = np.arange(1, len(chunk) + 1, dtype=np.float64)
+        decay = b ** k
+        out[start:start + len(chunk)] = decay * (init + alpha * np.cumsum(chunk / decay))
+        init = out[start + len(chunk) - 1]
+    return out
+
+def _rolling_sum(values, period: int):
+    import numpy as np
+
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        out[period - 1:] = csum[period:] - csum[:-period]
+    return out
+
+def compute_indicators(prices: Sequence[float], volumes: Optional[Sequence[float]] = None,
+                       sma_period: int = 20, ema_period: int = 20, rsi_period: int = 14,
+                       bb_k: float = 2.0, vwap_period: int = 288, state: bool = False) -> Dict[str, Any]:
+    """整段历史的向量化全量计算，返回每个指标的完整序列（numpy数组，数据不足处为NaN）"""
+    import numpy as np
+
+    p = np.asarray(prices, dtype=np.float64)
+    v = np.zeros_like(p) if volumes is None else np.asarray(volumes, dtype=np.float64)
+    n = len(p)
+
+    sma = _rolling_sum(p, sma_period) / sma_period
+    mean_sq = _rolling_sum(p * p, sma_period) / sma_period
+    std = np.sqrt(np.maximum(0.0, mean_sq - sma * sma))
+
+    ema = np.empty(n)
+    if n:
+        ema[0] = p[0]
+        ema[1:] = ema_series(p[1:], 2.0 / (ema_period + 1), p[0])
+
+    rsi = np.full(n, np.nan)
+    avg_gain = avg_loss = 0.0
+    changes = np.diff(p)
+    gains = np.where(changes > 0, changes, 0.0)
+    losses = np.where(changes < 0, -changes, 0.0)
+    if len(changes) >= rsi_period:
+        seed_gain = gains[:rsi_period].sum() / rsi_period
+        seed_loss = losses[:rsi_period].sum() / rsi_period
+        alpha = 1.0 / rsi_period
+        ag = np.concatenate(([seed_gain], ema_series(gains[rsi_period:], alpha, seed_gain)))
+        al = np.concatenate(([seed_loss], ema_series(losses[rsi_period:], alpha, seed_loss)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = 100.0 - 100.0 / (1.0 + ag / al)
+        values = np.where(al == 0, np.where(ag > 0, 100.0, 50.0), values)
+        rsi[rsi_period:] = values
+        avg_gain, avg_loss = float(ag[-1]), float(al[-1])
+    elif len(changes):
+        avg_gain = gains.sum() / rsi_period
+        avg_loss = losses.sum() / rsi_period
+
+    # VWAP：前 vwap_period 个tick用累计值，之后用滚动窗口
+    pv_sum = np.cumsum(p * v)
+    v_sum = np.cumsum(v)
+    if n > vwap_period:
+        pv_sum[vwap_period:] -= pv_sum[:-vwap_period].copy()
+        v_sum[vwap_period:] -= v_sum[:-vwap_period].copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = np.where(v_sum > 0, pv_sum / v_sum, np.nan)
+
+    result: Dict[str, Any] = {
+        'sma': sma,
+        'ema': ema,
+        'rsi': rsi,
+        'bb_upper': sma + bb_k * std,
+        'bb_middle': sma,
+        'bb_lower': sma - bb_k * std,
+        'vwap': vwap
+    }
+    if state:
+        result['state'] = {
+            'ema': float(ema[-1]) if n else None,
+            'avg_gain': float(avg_gain),
+            'avg_loss': float(avg_loss)
+        }
+    return result
+
+def latest_values(full: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """取全量计算结果的最后一个值（NaN转为None），格式与 IncrementalIndicators.snapshot 一致"""
+    latest = {}
+    for name in ('sma', 'ema', 'rsi', 'bb_upper', 'bb_middle', 'bb_lower', 'vwap'):
+        series = full[name]
+        value = float(series[-1]) if len(series) else float('nan')
+        latest[name] = None if math.isnan(value) else value
+    if latest['vwap'] is None:
+        del latest['vwap']
+    return latest
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+交易所WebSocket行情接入
+为每个交易所保持一个常驻的ticker订阅，断线后按指数退避重连，并把各交易所的最新报价
+合并到内存表中。聚合价格直接读这张表（O(1)，无网络请求）。
+CoinGecko没有公开的WebSocket接口，由低频REST轮询写入同一张表。
+"""
+
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+
+import aiohttp
+
+DEFAULT_WS_ENDPOINTS = {
+    'binance': 'wss://stream.binance.com:9443/ws/btcusdt@ticker',
+    'coinbase': 'wss://ws-feed.exchange.coinbase.com'
+}
+
+class QuoteTable:
+    """各数据源的最新报价表"""
+
+    def __init__(self, max_age: float = 30.0):
+        self.max_age = max_age  # 超过该时间未更新的报价不参与聚合
+        self._quotes: Dict[str, Dict[str, Any]] = {}
+        self._received_at: Dict[str, float] = {}
+        self.updates = 0
+
+    def update(self, source: str, quote: Dict[str, Any]):
+        self._quotes[source] = quote
+        self._received_at[source] = time.monotonic()
+        self.updates += 1
+
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        """读取数据源的最新报价，过期返回None"""
+        received_at = self._received_at.get(source)
+        if received_at is None or time.monotonic() - received_at > self.max_age:
+            return None
+        return self._quotes[source]
+
+    def fresh_sources(self) -> List[str]:
+        return [source for source in self._quotes if self.get(source) is not None]
+
+def parse_binance_ticker(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """解析Binance 24hrTicker推送"""
+    if message.get('e') != '24hrTicker':
+        return None
+    return {
+        'source': 'binance',
+        'price': float(message['c']),
+        'change_24h': float(message.get('P', 0)),
+        'volume_24h': float(message.get('v', 0)),
+        'high_24h': float(message.get('h', 0)),
+        'low_24h': float(message.get('l', 0)),
+        'last_size': float(message.get('Q', 0)),  # 最近一笔成交数量，用作tick成交量
+        'timestamp': datetime.now().isoformat()
+    }
+
+def parse_coinbase_ticker(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """解析Coinbase ticker推送"""
+    if message.get('type') != 'ticker':
+        return None
+    price = float(message['price'])
+    open_24h = float(message.get('open_24h') or 0)
+    return {
+        'source': 'coinbase',
+        'price': price,
+        'change_24h': (price - open_24h) / open_24h * 100 if open_24h else 0,
+        'volume_24h': float(message.get('volume_24h') or 0),
+        'high_24h': float(message.get('high_24h') or 0),
+        'low_24h': float(message.get('low_24h') or 0),
+        'last_size': float(message.get('last_size') or 0),
+        'timestamp': datetime.now().isoformat()
+    }
+
+class ExchangeFeed:
+    """单个交易所的WebSocket订阅"""
+
+    def __init__(self, source: str, url: str, parser: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+                 subscribe_message: Optional[Dict[str, Any]] = None,
+                 min_backoff: float = 0.5, max_backoff: float = 30.0):
+        self.source = source
+        self.url = url
+        self.parser = parser
+        self.subscribe_message = subscribe_message
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.messages = 0
+        self.connects = 0
+        self.errors = 0
+        self.connected = False
+
+    async def run(self, session: aiohttp.ClientSession, on_quote: Callable[[str, Dict[str, Any]], None]):
+        """保持订阅，断线后按指数退避（带抖动）重连；收到行情后退避时间重置"""
+        backoff = self.min_backoff
+        while True:
+            try:
+                async with session.ws_connect(self.url, heartbeat=20) as ws:
+                    self.connects += 1
+                    self.connected = True
+                    if self.subscribe_message:
+                        await ws.send_json(self.subscribe_message)
+                    async for message in ws:
+                        if message.type != aiohttp.WSMsgType.TEXT:
+                            if message.type == aiohttp.WSMsgType.ERROR:
+                                break
+                            continue
+                        quote = self.parser(json.loads(message.data))
+                        if quote is not None:
+                            self.messages += 1
+                            backoff = self.min_backoff
+                            on_quote(self.source, quote)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"{self.source} feed error: {e!r}", file=sys.stderr)
+            finally:
+                self.connected = False
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, self.max_backoff)
+
+class RestPollFeed:
+    """没有WebSocket接口的数据源：定期REST轮询写入报价表"""
+
+    def __init__(self, source: str, fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+                 interval: float = 15.0):
+        self.source = source
+        self.fetch = fetch
+        self.interval = interval
+        self.messages = 0
+        self.errors = 0
+
+    async def run(self, session: aiohttp.ClientSession, on_quote: Callable[[str, Dict[str, Any]], None]):
+        while True:
+            quote = await self.fetch()
+            if quote and quote.get('price'):
+                self.messages += 1
+                on_quote(self.source, quote)
+            else:
+                self.errors += 1
+            await asyncio.sleep(self.interval)
+
+def build_feeds(ws_endpoints: Optional[Dict[str, str]] = None) -> List[ExchangeFeed]:
+    """构建Binance与Coinbase的ticker订阅，ws_endpoints可替换为本地模拟行情源"""
+    endpoints = {**DEFAULT_WS_ENDPOINTS, **(ws_endpoints or {})}
+    return [
+        ExchangeFeed('binance', endpoints['binance'], parse_binance_ticker),
+        ExchangeFeed('coinbase', endpoints['coinbase'], parse_coinbase_ticker, {
+            'type': 'subscribe',
+            'product_ids': ['BTC-USD'],
+            'channels': ['ticker']
+        })
+    ]
+
+class IngestionEngine:
+    """管理所有行情订阅，维护合并后的最新报价表"""
+
+    def __init__(self, feeds: List[Any], table: Optional[QuoteTable] = None):
+        self.feeds = feeds
+        self.table = table or QuoteTable()
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """注册报价更新回调（在事件循环线程中同步调用，需保持轻量）"""
+        self._listeners.append(listener)
+
+    def _on_quote(self, source: str, quote: Dict[str, Any]):
+        self.table.update(source, quote)
+        for listener in self._listeners:
+            listener(source, quote)
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._session = aiohttp.ClientSession()
+        self._tasks = [asyncio.ensure_future(feed.run(self._session, self._on_quote)) for feed in self.feeds]
+
+    async def wait_ready(self, timeout: float = 10.0, sources: Optional[List[str]] = None) -> bool:
+        """等待指定数据源（默认全部）收到第一条报价"""
+        wanted = set(sources or [feed.source for feed in self.feeds])
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if wanted.issubset(self.table.fresh_sources()):
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            feed.source: {
+                'messages': feed.messages,
+                'errors': feed.errors,
+                'connects': getattr(feed, 'connects', None),
+                'connected': getattr(feed, 'connected', None)
+            }
+            for feed in self.feeds
+        }
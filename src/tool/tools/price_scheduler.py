@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+自适应轮询调度
+按价格离买卖阈值的距离和已实现波动率决定下一次轮询的间隔：在当前波动率下，价格在一个间隔内
+走出 confidence 个标准差也碰不到最近的阈值时才放慢，即 间隔 = (距离 / (confidence * 每秒波动率))²，
+限制在 [min_interval, max_interval] 之间。没有阈值时用 calm_move 代替距离，只随波动率调整。
+设置 index（price_thresholds.ThresholdIndex）后，订阅方的阈值同样参与计算最近距离。
+
+每个交易所一个令牌桶，请求前先取令牌，取不到就跳过该数据源，保证不超过各API的频率限制。
+时间都可以由调用方传入（now），回放历史行情时使用回放时钟。
+"""
+
+import asyncio
+import math
+import time
+from typing import Dict, Any, Callable, Awaitable, List, Optional, Sequence, Tuple
+
+# 各交易所公开接口的请求预算：(每秒补充的令牌数, 桶容量)
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    'coingecko': (8 / 60, 2),    # 免费接口约每分钟10次：任意60秒内最多 8 + 2 次
+    'binance': (10.0, 50),       # ticker/24hr 权重较高，远低于每分钟6000权重的上限
+    'coinbase': (5.0, 20)        # 公开接口每秒10次，留一半余量
+}
+
+# 年化波动率换算为每秒波动率
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积攒 burst 个"""
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.granted = 0
+        self.denied = 0
+        self._updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0, now: Optional[float] = None) -> bool:
+        """取令牌，不足时返回False（不等待）"""
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            self.granted += 1
+            return True
+        self.denied += 1
+        return False
+
+    def wait_time(self, tokens: float = 1.0, now: Optional[float] = None) -> float:
+        """还需等待多少秒才有足够的令牌"""
+        self._refill(time.monotonic() if now is None else now)
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def report(self) -> Dict[str, Any]:
+        return {'rate_per_s': self.rate, 'burst': self.burst, 'tokens': round(self.tokens, 2),
+                'granted': self.granted, 'denied': self.denied}
+
+def build_buckets(rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                  sources: Sequence[str] = tuple(DEFAULT_RATE_LIMITS),
+                  now: Optional[float] = None) -> Dict[str, TokenBucket]:
+    """为每个数据源创建令牌桶，rate_limits 可覆盖默认预算"""
+    limits = {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}
+    return {source: TokenBucket(*limits[source], now=now) for source in sources if source in limits}
+
+class PollScheduler:
+    """根据阈值距离和已实现波动率计算轮询间隔"""
+
+    def __init__(self, thresholds: Sequence[float] = (), min_interval: float = 5.0, max_interval: float = 300.0,
+                 confidence: float = 3.0, calm_move: float = 0.01, initial_volatility: float = 0.6,
+                 window: int = 20):
+        self.thresholds = sorted(thresholds)
+        self.index = None  # 可选的阈值订阅索引，提供 distance(price)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.confidence = confidence  # 一个间隔内允许的价格波动（标准差个数）
+        self.calm_move = calm_move    # 没有阈值时，一个间隔内允许的相对波动
+        self.alpha = 2 / (window + 1)
+        # 每秒对数收益率方差的指数移动平均，初始值来自年化波动率
+        self.variance_rate = initial_volatility ** 2 / SECONDS_PER_YEAR
+        self.last_price: Optional[float] = None
+        self.last_time: Optional[float] = None
+        self.observations = 0
+
+    def observe(self, price: float, now: Optional[float] = None):
+        """记录一次轮询到的价格，更新已实现波动率"""
+        now = time.monotonic() if now is None else now
+        if self.last_price and price > 0 and now > self.last_time:
+            log_return = math.log(price / self.last_price)
+            self.variance_rate += self.alpha * (log_return * log_return / (now - self.last_time) - self.variance_rate)
+        self.last_price = price
+        self.last_time = now
+        self.observations += 1
+
+    @property
+    def volatility(self) -> float:
+        """当前估计的年化波动率"""
+        return math.sqrt(self.variance_rate * SECONDS_PER_YEAR)
+
+    def distance(self, price: float) -> Optional[float]:
+        """到最近阈值的相对距离（对数），没有阈值时返回None"""
+        if price <= 0:
+            return None
+        distances = [abs(math.log(threshold / price)) for threshold in self.thresholds]
+        if self.index is not None:
+            distances.append(self.index.distance(price))
+        distances = [distance for distance in distances if distance is not None]
+        return min(distances) if distances else None
+
+    def next_interval(self, price: Optional[float] = None) -> float:
+        """下一次轮询前等待的秒数"""
+        price = self.last_price if price is None else price
+        if price is None:
+            return self.min_interval
+        band = self.distance(price)
+        if band is None:
+            band = self.calm_move
+        step = self.confidence * math.sqrt(self.variance_rate)
+        interval = (band / step) ** 2 if step > 0 else self.max_interval
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'thresholds': self.thresholds,
+            'last_price': self.last_price,
+            'volatility': round(self.volatility, 4),
+            'next_interval_s': round(self.next_interval(), 2),
+            'observations': self.observations
+        }
+
+class ScheduledPoller:
+    """按调度器给出的间隔循环获取价格，令牌全部用完时等到最早有令牌的数据源"""
+
+    def __init__(self, scheduler: PollScheduler, fetch: Callable[[], Awaitable[Dict[str, Any]]],
+                 buckets: Dict[str, TokenBucket]):
+        self.scheduler = scheduler
+        self.fetch = fetch
+        self.buckets = buckets
+        self.polls = 0
+        self.errors = 0
+        self.latest: Optional[Dict[str, Any]] = None
+        self._latest_at = 0.0
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """每次轮询成功后回调 callback(result)"""
+        self._listeners.append(callback)
+
+    def age(self) -> float:
+        """最近一次成功轮询距今的秒数"""
+        return time.monotonic() - self._latest_at
+
+    async def _run(self):
+        while True:
+            try:
+                result = await self.fetch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = {'success': False, 'error': repr(e)}
+            self.polls += 1
+            if result.get('success'):
+                self.latest = result
+                self._latest_at = time.monotonic()
+                self.scheduler.observe(result['price'], self._latest_at)
+                for callback in self._listeners:
+                    callback(result)
+            else:
+                self.errors += 1
+            delay = self.scheduler.next_interval()
+            if self.buckets:
+                delay = max(delay, min(bucket.wait_time() for bucket in self.buckets.values()))
+            await asyncio.sleep(delay)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'polls': self.polls,
+            'errors': self.errors,
+            'scheduler': self.scheduler.report(),
+            'budgets': {source: bucket.report() for source, bucket in self.buckets.items()}
+        }
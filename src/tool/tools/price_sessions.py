@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+行情数据源HTTP会话池
+每个数据源持有一个长连接会话（keep-alive + DNS缓存 + 连接数上限），在多次轮询之间复用
+"""
+
+import asyncio
+import threading
+from typing import Dict, Any, Optional, Awaitable, TypeVar
+
+import aiohttp
+
+T = TypeVar('T')
+
+class SessionPool:
+    """按数据源划分的aiohttp会话池"""
+
+    def __init__(self, limit_per_source: int = 10, keepalive_timeout: float = 60,
+                 dns_cache_ttl: int = 300):
+        self.limit_per_source = limit_per_source
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+
+    def get(self, source: str) -> aiohttp.ClientSession:
+        """获取数据源的会话，首次调用时创建（必须在事件循环内调用）"""
+        session = self._sessions.get(source)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit_per_source,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[source] = session
+        return session
+
+    async def warm_up(self, sources: Dict[str, Dict[str, Any]], connections: int = 1,
+                      timeout: float = 10) -> Dict[str, bool]:
+        """预热连接：向每个数据源并发发起请求，建立好TCP/TLS连接留在池中"""
+        async def _touch(name: str, config: Dict[str, Any]) -> bool:
+            try:
+                async with self.get(name).get(
+                    config['url'],
+                    params=config['params'],
+                    timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    await response.read()
+                    return response.status < 500
+            except Exception:
+                return False
+
+        names = []
+        tasks = []
+        for name, config in sources.items():
+            for _ in range(max(1, min(connections, self.limit_per_source))):
+                names.append(name)
+                tasks.append(_touch(name, config))
+        results = await asyncio.gather(*tasks)
+
+        warmed: Dict[str, bool] = {}
+        for name, ok in zip(names, results):
+            warmed[name] = warmed.get(name, False) or ok
+        return warmed
+
+    async def close(self):
+        """关闭所有会话"""
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            await session.close()
+
+class LoopThread:
+    """后台事件循环线程，让同步调用方也能跨调用复用会话池"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """在后台循环中执行协程并等待结果"""
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def stop(self):
+        """停止后台循环"""
+        with self._lock:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+            self._loop.close()
+            self._loop = None
+            self._thread = None
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+行情推送
+把聚合价格的每次变化推送给SSE/WebSocket订阅方。每个订阅方只有一个“最新报价”槽位，
+消费慢的客户端只会收到最新报价，不会积压历史数据。
+"""
+
+import asyncio
+import json
+import socket
+import sys
+from typing import Dict, Any, Optional, Callable, Awaitable, Set
+
+from aiohttp import web, WSMsgType
+
+STREAM_SEND_BUFFER = 4096  # 推送连接的发送缓冲上限（字节），缓冲满时由槽位合并报价
+
+def limit_send_buffer(request: web.Request, size: int = STREAM_SEND_BUFFER):
+    """缩小推送连接的内核和传输层发送缓冲，慢客户端尽早触发背压而不是在缓冲区里积压报价"""
+    transport = request.transport
+    if transport is None:
+        return
+    sock = transport.get_extra_info('socket')
+    if sock is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, size)
+    transport.set_write_buffer_limits(high=size)
+
+async def wait_writable(request: web.Request, limit: int = STREAM_SEND_BUFFER, poll: float = 0.005):
+    """等待传输层写缓冲降到上限以下（WebSocket写入方每64KB才检查一次背压，这里逐条检查）"""
+    transport = request.transport
+    while transport is not None and not transport.is_closing() and transport.get_write_buffer_size() > limit:
+        await asyncio.sleep(poll)
+
+class Subscription:
+    """单个订阅方的最新报价槽位"""
+
+    def __init__(self):
+        self._latest: Optional[Dict[str, Any]] = None
+        self._event = asyncio.Event()
+        self.delivered = 0
+        self.coalesced = 0  # 被更新报价覆盖、未发送的报价数
+
+    def offer(self, quote: Dict[str, Any]):
+        """放入新报价，覆盖尚未发送的旧报价"""
+        if self._latest is not None:
+            self.coalesced += 1
+        self._latest = quote
+        self._event.set()
+
+    async def next(self) -> Dict[str, Any]:
+        """等待并取出最新报价"""
+        await self._event.wait()
+        self._event.clear()
+        quote, self._latest = self._latest, None
+        self.delivered += 1
+        return quote
+
+class QuoteBroadcaster:
+    """轮询（或由外部推入）聚合价格，只在价格变化时广播给所有订阅方"""
+
+    def __init__(self, fetch: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None,
+                 interval: float = 1.0):
+        self.fetch = fetch
+        self.interval = interval
+        self.latest: Optional[Dict[str, Any]] = None
+        self.published = 0
+        self._subscribers: Set[Subscription] = set()
+        self._poller: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _quote_key(quote: Dict[str, Any]):
+        return quote.get('price'), quote.get('price_sources')
+
+    def publish(self, quote: Dict[str, Any]) -> bool:
+        """发布报价，价格未变化时忽略；返回是否广播"""
+        if not quote.get('success', True):
+            return False
+        if self.latest is not None and self._quote_key(quote) == self._quote_key(self.latest):
+            return False
+        self.latest = quote
+        self.published += 1
+        for subscription in self._subscribers:
+            subscription.offer(quote)
+        return True
+
+    async def _poll(self):
+        while True:
+            try:
+                self.publish(await self.fetch())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Price stream poll error: {e!r}", file=sys.stderr)
+            await asyncio.sleep(self.interval)
+
+    def subscribe(self) -> Subscription:
+        """订阅报价；已有报价时立即可读，首个订阅方到来时启动轮询"""
+        subscription = Subscription()
+        if self.latest is not None:
+            subscription.offer(self.latest)
+        self._subscribers.add(subscription)
+        if self.fetch is not None and self._poller is None:
+            self._poller = asyncio.ensure_future(self._poll())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """取消订阅，没有订阅方时停止轮询"""
+        self._subscribers.discard(subscription)
+        if not self._subscribers and self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def close(self):
+        for subscription in list(self._subscribers):
+            self.unsubscribe(subscription)
+
+async def sse_handler(broadcaster: QuoteBroadcaster, request: web.Request,
+                      heartbeat: float = 15.0) -> web.StreamResponse:
+    """SSE推送：每条报价一个 data 事件，空闲时发送注释行保活"""
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    limit_send_buffer(request)
+    await response.prepare(request)
+    subscription = broadcaster.subscribe()
+    try:
+        while True:
+            try:
+                quote = await asyncio.wait_for(subscription.next(), heartbeat)
+            except asyncio.TimeoutError:
+                await response.write(b': keep-alive\n\n')
+                continue
+            # write 会等待发送缓冲区排空，慢客户端在这里被限速，期间的新报价合并到槽位中
+            await response.write(f'data: {json.dumps(quote)}\n\n'.encode())
+    except ConnectionResetError:
+        pass
+    finally:
+        # 客户端断开或服务关闭时任务被取消，CancelledError 继续向上抛出，清理在这里完成
+        broadcaster.unsubscribe(subscription)
+    return response
+
+async def websocket_handler(broadcaster: QuoteBroadcaster, request: web.Request) -> web.WebSocketResponse:
+    """WebSocket推送：每条报价一个JSON文本消息"""
+    ws = web.WebSocketResponse(heartbeat=30)
+    limit_send_buffer(request)
+    await ws.prepare(request)
+    subscription = broadcaster.subscribe()
+
+    async def _drain_incoming():
+        # 客户端不需要发送消息，这里只用于及时发现连接关闭
+        async for message in ws:
+            if message.type == WSMsgType.ERROR:
+                break
+
+    reader = asyncio.ensure_future(_drain_incoming())
+    next_quote: Optional[asyncio.Future] = None
+    try:
+        while not ws.closed:
+            next_quote = asyncio.ensure_future(subscription.next())
+            done, _ = await asyncio.wait({next_quote, reader}, return_when=asyncio.FIRST_COMPLETED)
+            if next_quote not in done:
+                break
+            await ws.send_json(next_quote.result())
+            await wait_writable(request)
+    except ConnectionResetError:
+        pass
+    finally:
+        # 任务被取消时同样在这里清理，CancelledError 继续向上抛出
+        if next_quote is not None:
+            next_quote.cancel()
+        reader.cancel()
+        broadcaster.unsubscribe(subscription)
+        await ws.close()
+    return ws
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+多币种批量行情
+每个数据源每轮只发一个批量请求：CoinGecko 的 ids 列表、Binance 不带过滤的全部交易对24hr ticker、
+Coinbase 以USD为基准的汇率表，N个币种一轮共3个HTTP请求。
+Binance 的 symbols 过滤参数只要有一个无效交易对就整个请求返回400，因此取全部交易对后在本地筛选，
+未知或已下架的币种只是没有该数据源的报价。
+"""
+
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# 币种 -> 各数据源的标识
+DEFAULT_SYMBOLS = {
+    'BTC': {'coingecko': 'bitcoin', 'binance': 'BTCUSDT', 'coinbase': 'BTC'},
+    'ETH': {'coingecko': 'ethereum', 'binance': 'ETHUSDT', 'coinbase': 'ETH'},
+    'SOL': {'coingecko': 'solana', 'binance': 'SOLUSDT', 'coinbase': 'SOL'},
+    'BNB': {'coingecko': 'binancecoin', 'binance': 'BNBUSDT', 'coinbase': 'BNB'},
+    'XRP': {'coingecko': 'ripple', 'binance': 'XRPUSDT', 'coinbase': 'XRP'},
+    'ADA': {'coingecko': 'cardano', 'binance': 'ADAUSDT', 'coinbase': 'ADA'},
+    'DOGE': {'coingecko': 'dogecoin', 'binance': 'DOGEUSDT', 'coinbase': 'DOGE'},
+    'AVAX': {'coingecko': 'avalanche-2', 'binance': 'AVAXUSDT', 'coinbase': 'AVAX'},
+    'DOT': {'coingecko': 'polkadot', 'binance': 'DOTUSDT', 'coinbase': 'DOT'},
+    'LINK': {'coingecko': 'chainlink', 'binance': 'LINKUSDT', 'coinbase': 'LINK'},
+    'LTC': {'coingecko': 'litecoin', 'binance': 'LTCUSDT', 'coinbase': 'LTC'},
+    'POL': {'coingecko': 'polygon-ecosystem-token', 'binance': 'POLUSDT', 'coinbase': 'POL'}
+}
+
+def resolve_symbols(specs: List[str]) -> Dict[str, Dict[str, str]]:
+    """解析币种列表：'ETH' 使用内置映射，'PEPE:pepe' 指定CoinGecko的id；
+    未知币种的Binance交易对为 <币种>USDT，Coinbase为币种代码"""
+    symbols = {}
+    for spec in specs:
+        symbol, _, coingecko_id = spec.strip().partition(':')
+        symbol = symbol.upper()
+        if not symbol:
+            continue
+        ids = dict(DEFAULT_SYMBOLS.get(symbol, {
+            'coingecko': symbol.lower(),
+            'binance': f'{symbol}USDT',
+            'coinbase': symbol
+        }))
+        if coingecko_id:
+            ids['coingecko'] = coingecko_id
+        symbols[symbol] = ids
+    return symbols
+
+def batch_params(source: str, symbols: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    """数据源批量请求的查询参数"""
+    if source == 'coingecko':
+        return {
+            'ids': ','.join(ids['coingecko'] for ids in symbols.values()),
+            'vs_currencies': 'usd',
+            'include_24hr_change': 'true',
+            'include_24hr_vol': 'true',
+            'include_last_updated_at': 'true'
+        }
+    if source == 'binance':
+        return {}  # 全部交易对，在 parse_binance_batch 中按币种筛选
+    return {'currency': 'USD'}
+
+def parse_coingecko_batch(data: Dict[str, Any], symbols: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, Any]]:
+    quotes = {}
+    now = datetime.now().isoformat()
+    for symbol, ids in symbols.items():
+        entry = data.get(ids['coingecko'])
+        if entry and entry.get('usd'):
+            quotes[symbol] = {
+                'source': 'coingecko',
+                'price': entry['usd'],
+                'change_24h': entry.get('usd_24h_change'),
+                'volume_24h': entry.get('usd_24h_vol'),
+                'last_updated': entry.get('last_updated_at'),
+                'timestamp': now
+            }
+    return quotes
+
+def parse_binance_batch(data: List[Dict[str, Any]], symbols: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, Any]]:
+    """从全部交易对的24hr ticker列表中取出所需币种"""
+    tickers = {ticker.get('symbol'): ticker for ticker in data}
+    quotes = {}
+    now = datetime.now().isoformat()
+    for symbol, ids in symbols.items():
+        ticker = tickers.get(ids['binance'])
+        if ticker and float(ticker.get('lastPrice', 0)):
+            quotes[symbol] = {
+                'source': 'binance',
+                'price': float(ticker['lastPrice']),
+                'change_24h': float(ticker.get('priceChangePercent', 0)),
+                'volume_24h': float(ticker.get('volume', 0)),
+                'high_24h': float(ticker.get('highPrice', 0)),
+                'low_24h': float(ticker.get('lowPrice', 0)),
+                'timestamp': now
+            }
+    return quotes
+
+def parse_coinbase_batch(data: Dict[str, Any], symbols: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, Any]]:
+    """解析以USD为基准的汇率表：rates[币种] 为 1 USD 可兑换的数量，价格为其倒数"""
+    rates = data.get('data', {}).get('rates', {})
+    quotes = {}
+    now = datetime.now().isoformat()
+    for symbol, ids in symbols.items():
+        rate = rates.get(ids['coinbase'])
+        if rate and float(rate):
+            quotes[symbol] = {'source': 'coinbase', 'price': 1 / float(rate), 'timestamp': now}
+    return quotes
+
+BATCH_PARSERS = {
+    'coingecko': parse_coingecko_batch,
+    'binance': parse_binance_batch,
+    'coinbase': parse_coinbase_batch
+}
+
+def per_symbol(quotes: Dict[str, Optional[Dict[str, Dict[str, Any]]]], symbol: str) -> List[Optional[Dict[str, Any]]]:
+    """按 coingecko/binance/coinbase 顺序取出某个币种的报价，供 aggregate_prices 使用"""
+    return [(quotes.get(source) or {}).get(symbol) for source in ('coingecko', 'binance', 'coinbase')]
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+阈值订阅索引
+集中保存所有订阅方（工作流）的买入 / 卖出阈值，买、卖各一个按价格排序的数组。每个新报价只在
+上一价格与当前价格之间二分查找被穿越的阈值，O(log n + k)：
+价格下行时 当前价 <= 买入阈值 < 上一价 的订阅触发买入，上行时 上一价 < 卖出阈值 <= 当前价 的订阅触发卖出。
+第一个报价和新增订阅时，已经处于买入 / 卖出区间内的订阅立即触发一次。
+触发后的阈值移到待重新启用的数组（按 阈值 * (1 ± hysteresis) 排序），价格回到区间外超过 hysteresis 后才会再次触发，
+避免价格在阈值附近来回波动时反复推送。
+
+触发结果由 CrossingNotifier 合并后批量推送到后端的工作流事件接口
+（/workflow-events/trigger、/workflow-events/btc-price、/workflow-events/webhook），
+无论有多少工作流在等待，上游每个tick只查询一次价格。
+"""
+
+import asyncio
+import math
+import sys
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+TARGETS = ('trigger', 'btc-price', 'webhook')
+DEFAULT_EVENT_TYPE = 'btc_price_threshold'
+
+class _SortedThresholds:
+    """按价格排序的阈值数组，ids 与 prices 一一对应"""
+
+    def __init__(self):
+        self.prices: List[float] = []
+        self.ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def insert(self, price: float, subscription_id: str):
+        position = bisect_right(self.prices, price)
+        self.prices.insert(position, price)
+        self.ids.insert(position, subscription_id)
+
+    def remove(self, price: float, subscription_id: str) -> bool:
+        position = bisect_left(self.prices, price)
+        end = bisect_right(self.prices, price)
+        for i in range(position, end):
+            if self.ids[i] == subscription_id:
+                del self.prices[i]
+                del self.ids[i]
+                return True
+        return False
+
+    def rebuild(self, items: List[Tuple[float, str]]):
+        items.sort()
+        self.prices = [price for price, _ in items]
+        self.ids = [subscription_id for _, subscription_id in items]
+
+    def pop_range(self, start: int, end: int) -> List[str]:
+        """移除并返回 [start, end) 内的订阅ID"""
+        ids = self.ids[start:end]
+        del self.prices[start:end]
+        del self.ids[start:end]
+        return ids
+
+class ThresholdIndex:
+    """所有订阅方的买卖阈值索引"""
+
+    def __init__(self, hysteresis: float = 0.001):
+        self.subscriptions: Dict[str, Dict[str, Any]] = {}
+        self.hysteresis = hysteresis  # 触发后价格需回到阈值外的相对幅度，之后才再次触发
+        # 等待触发的阈值
+        self.buy = _SortedThresholds()
+        self.sell = _SortedThresholds()
+        # 已触发、等待重新启用的阈值，按重新启用价格排序
+        self.buy_rearm = _SortedThresholds()
+        self.sell_rearm = _SortedThresholds()
+        self.last_price: Optional[float] = None
+        self.updates = 0
+        self.crossings = 0
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
+
+    @staticmethod
+    def _subscription(subscription_id: Optional[str], buy: Optional[float], sell: Optional[float],
+                      target: str, event_type: Optional[str], url: Optional[str],
+                      data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if buy is None and sell is None:
+            raise ValueError('Subscription requires buy or sell threshold')
+        if target not in TARGETS:
+            raise ValueError(f'Unknown target: {target}')
+        if target == 'webhook' and not url:
+            raise ValueError('Webhook target requires url')
+        return {
+            'id': subscription_id or uuid.uuid4().hex,
+            'buy': float(buy) if buy is not None else None,
+            'sell': float(sell) if sell is not None else None,
+            'target': target,
+            'event_type': event_type or DEFAULT_EVENT_TYPE,
+            'url': url,
+            'data': data or {}
+        }
+
+    def add(self, subscription_id: Optional[str] = None, buy: Optional[float] = None, sell: Optional[float] = None,
+            target: str = 'trigger', event_type: Optional[str] = None, url: Optional[str] = None,
+            data: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """新增（或替换同ID的）订阅，返回订阅和当前价格下立即触发的结果"""
+        subscription = self._subscription(subscription_id, buy, sell, target, event_type, url, data)
+        self.remove(subscription['id'])
+        self.subscriptions[subscription['id']] = subscription
+        if subscription['buy'] is not None:
+            self.buy.insert(subscription['buy'], subscription['id'])
+        if subscription['sell'] is not None:
+            self.sell.insert(subscription['sell'], subscription['id'])
+        return subscription, self._already_crossed([subscription])
+
+    def add_many(self, items: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """批量新增订阅：合并后整体排序一次，而不是逐个插入；同一批中重复的ID以最后一个为准（与 add 相同）"""
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for item in items:
+            subscription = self._subscription(item.get('id'), item.get('buy'), item.get('sell'),
+                                              item.get('target', 'trigger'), item.get('event_type'),
+                                              item.get('url'), item.get('data'))
+            by_id.pop(subscription['id'], None)
+            by_id[subscription['id']] = subscription
+        added = list(by_id.values())
+        for subscription in added:
+            self.remove(subscription['id'])
+            self.subscriptions[subscription['id']] = subscription
+        for side, book in (('buy', self.buy), ('sell', self.sell)):
+            book.rebuild(list(zip(book.prices, book.ids)) + [(subscription[side], subscription['id'])
+                                                             for subscription in added
+                                                             if subscription[side] is not None])
+        return added, self._already_crossed(added)
+
+    def remove(self, subscription_id: str) -> bool:
+        subscription = self.subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return False
+        if subscription['buy'] is not None and not self.buy.remove(subscription['buy'], subscription_id):
+            self.buy_rearm.remove(self._rearm_price('buy', subscription['buy']), subscription_id)
+        if subscription['sell'] is not None and not self.sell.remove(subscription['sell'], subscription_id):
+            self.sell_rearm.remove(self._rearm_price('sell', subscription['sell']), subscription_id)
+        return True
+
+    def _rearm_price(self, side: str, threshold: float) -> float:
+        return threshold * (1 + self.hysteresis) if side == 'buy' else threshold * (1 - self.hysteresis)
+
+    def _disarm(self, side: str, subscription_ids: List[str]):
+        """已触发的阈值移到待重新启用数组"""
+        rearm = self.buy_rearm if side == 'buy' else self.sell_rearm
+        for subscription_id in subscription_ids:
+            rearm.insert(self._rearm_price(side, self.subscriptions[subscription_id][side]), subscription_id)
+
+    def _rearm(self, price: float):
+        """价格回到区间外超过 hysteresis 的阈值重新启用：买入要求 价格 > 阈值*(1+h)，卖出要求 价格 < 阈值*(1-h)"""
+        for subscription_id in self.buy_rearm.pop_range(0, bisect_left(self.buy_rearm.prices, price)):
+            self.buy.insert(self.subscriptions[subscription_id]['buy'], subscription_id)
+        for subscription_id in self.sell_rearm.pop_range(bisect_right(self.sell_rearm.prices, price),
+                                                         len(self.sell_rearm)):
+            self.sell.insert(self.subscriptions[subscription_id]['sell'], subscription_id)
+
+    def _crossing(self, subscription_id: str, side: str, price: float,
+                  previous: Optional[float]) -> Dict[str, Any]:
+        subscription = self.subscriptions[subscription_id]
+        return {'subscription': subscription, 'side': side, 'threshold': subscription[side],
+                'price': price, 'previous_price': previous}
+
+    def _already_crossed(self, subscriptions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        price = self.last_price
+        if price is None:
+            return []
+        crossings = []
+        for subscription in subscriptions:
+            for side in ('buy', 'sell'):
+                threshold = subscription[side]
+                if threshold is None or (price > threshold if side == 'buy' else price < threshold):
+                    continue
+                book = self.buy if side == 'buy' else self.sell
+                book.remove(threshold, subscription['id'])
+                self._disarm(side, [subscription['id']])
+                crossings.append(self._crossing(subscription['id'], side, price, None))
+                break
+        self.crossings += len(crossings)
+        return crossings
+
+    def update(self, price: float) -> List[Dict[str, Any]]:
+        """处理一个新报价，返回被穿越的订阅"""
+        previous = self.last_price
+        self.last_price = price
+        self.updates += 1
+        if price == previous:
+            return []
+        self._rearm(price)
+        # 等待触发的买入阈值都低于上一价、卖出阈值都高于上一价（第一个报价时全部参与），
+        # 因此只需找出 买入阈值 >= 当前价 和 卖出阈值 <= 当前价 的部分
+        buy_ids = self.buy.pop_range(bisect_left(self.buy.prices, price), len(self.buy))
+        sell_ids = self.sell.pop_range(0, bisect_right(self.sell.prices, price))
+        self._disarm('buy', buy_ids)
+        self._disarm('sell', sell_ids)
+        crossings = [self._crossing(subscription_id, 'buy', price, previous) for subscription_id in buy_ids]
+        crossings += [self._crossing(subscription_id, 'sell', price, previous) for subscription_id in sell_ids]
+        self.crossings += len(crossings)
+        return crossings
+
+    def distance(self, price: float) -> Optional[float]:
+        """到最近阈值的相对距离（对数），没有订阅时返回None"""
+        nearest = []
+        for book in (self.buy, self.sell):
+            position = bisect_left(book.prices, price)
+            nearest += book.prices[max(0, position - 1):position + 1]
+        if not nearest or price <= 0:
+            return None
+        return min(abs(math.log(threshold / price)) for threshold in nearest)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'subscriptions': len(self.subscriptions), 'buy_thresholds': len(self.buy),
+                'sell_thresholds': len(self.sell), 'rearming': len(self.buy_rearm) + len(self.sell_rearm),
+                'hysteresis': self.hysteresis, 'last_price': self.last_price,
+                'updates': self.updates, 'crossings': self.crossings}
+
+class CrossingNotifier:
+    """把触发结果合并后批量推送到后端工作流事件接口（base_url 含 /api 前缀）"""
+
+    def __init__(self, base_url: str, auth_token: Optional[str] = None, batch_size: int = 500,
+                 flush_interval: float = 0.05, timeout: float = 10.0):
+        self.base_url = base_url.rstrip('/')
+        self.auth_token = auth_token
+        self.batch_size = batch_size          # 每个请求最多携带的触发数
+        self.flush_interval = flush_interval  # 合并这段时间内的触发后再推送
+        self.timeout = timeout
+        self.requests = 0
+        self.delivered = 0
+        self.errors = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def enqueue(self, crossings: List[Dict[str, Any]]):
+        """加入待推送队列（需要在事件循环中调用），后台任务按批推送"""
+        if not crossings:
+            return
+        self._pending.extend(crossings)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        self._wakeup.set()
+
+    @staticmethod
+    def _crossing_record(crossing: Dict[str, Any]) -> Dict[str, Any]:
+        subscription = crossing['subscription']
+        return {'subscriptionId': subscription['id'], 'side': crossing['side'],
+                'threshold': crossing['threshold'], 'data': subscription['data']}
+
+    def build_requests(self, crossings: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any], int]]:
+        """按推送目标分组，返回 (路径, 请求体, 携带的触发数)；btc-price 每批只推最新价格一次"""
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for crossing in crossings:
+            subscription = crossing['subscription']
+            key = subscription['url'] if subscription['target'] == 'webhook' else subscription['event_type']
+            groups.setdefault((subscription['target'], key), []).append(crossing)
+        timestamp = datetime.now().isoformat()
+        requests = []
+        for (target, key), group in groups.items():
+            if target == 'btc-price':
+                requests.append(('/workflow-events/btc-price', {'price': group[-1]['price']}, len(group)))
+                continue
+            for start in range(0, len(group), self.batch_size):
+                chunk = group[start:start + self.batch_size]
+                event = {
+                    'price': chunk[-1]['price'],
+                    'previousPrice': chunk[0]['previous_price'],
+                    'timestamp': timestamp,
+                    'subscriptionIds': [crossing['subscription']['id'] for crossing in chunk],
+                    'crossings': [self._crossing_record(crossing) for crossing in chunk]
+                }
+                if target == 'trigger':
+                    requests.append(('/workflow-events/trigger', {'eventType': key, 'eventData': event}, len(chunk)))
+                else:
+                    requests.append(('/workflow-events/webhook',
+                                     {'url': key, 'method': 'POST', 'headers': {}, 'body': event}, len(chunk)))
+        return requests
+
+    async def _post(self, path: str, body: Dict[str, Any], count: int):
+        try:
+            async with self._session.post(self.base_url + path, json=body) as response:
+                response.raise_for_status()
+            self.delivered += count
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.errors += 1
+            print(f"Threshold push {path} error: {e!r}", file=sys.stderr)
+        self.requests += 1
+
+    async def flush(self):
+        """立即推送队列中的全部触发"""
+        crossings, self._pending = self._pending, []
+        if not crossings:
+            return
+        if self._session is None:
+            headers = {'Authorization': f'Bearer {self.auth_token}'} if self.auth_token else None
+            self._session = aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        await asyncio.gather(*(self._post(path, body, count) for path, body, count in self.build_requests(crossings)))
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {'requests': self.requests, 'delivered': self.delivered, 'errors': self.errors,
+                'pending': len(self._pending)}
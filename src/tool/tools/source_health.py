@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+数据源健康状态
+按数据源记录最近的请求延迟，超时时间随观测到的p99自适应调整；
+连续失败达到阈值后熔断（跳过该数据源），冷却期后放行一个半开探测请求，成功则恢复。
+"""
+
+import time
+from collections import deque
+from typing import Dict, Any, Deque, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class SourceHealth:
+    """单个数据源的延迟统计与熔断器"""
+
+    def __init__(self, name: str, max_timeout: float = 10.0, min_timeout: float = 0.5,
+                 timeout_multiplier: float = 2.0, window: int = 200, min_samples: int = 10,
+                 failure_threshold: int = 3, open_seconds: float = 30.0, adaptive: bool = True):
+        self.name = name
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.timeout_multiplier = timeout_multiplier  # 超时时间 = p99 * 倍数
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.adaptive = adaptive  # False 时退化为固定超时、不熔断
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_error: Optional[str] = None
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """最近窗口内成功请求延迟的百分位（秒），样本不足时返回None"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+    def timeout(self) -> float:
+        """本次请求的超时时间"""
+        p99 = self.percentile(99) if self.adaptive else None
+        if p99 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, p99 * self.timeout_multiplier))
+
+    def allow_request(self) -> bool:
+        """熔断中返回False；冷却期结束后只放行一个半开探测请求"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.skipped += 1
+        return False
+
+    def record_success(self, latency: float):
+        self._latencies.append(latency)
+        self.successes += 1
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        self.state = CLOSED
+
+    def record_failure(self, error: str):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        self._probe_in_flight = False
+        if self.adaptive and (self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold):
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        """请求被取消（不计入成功或失败），释放半开探测名额"""
+        self._probe_in_flight = False
+
+    def report(self) -> Dict[str, Any]:
+        p50 = self.percentile(50)
+        p99 = self.percentile(99)
+        return {
+            'state': self.state,
+            'successes': self.successes,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'consecutive_failures': self.consecutive_failures,
+            'p50_ms': round(p50 * 1000, 2) if p50 is not None else None,
+            'p99_ms': round(p99 * 1000, 2) if p99 is not None else None,
+            'timeout_ms': round(self.timeout() * 1000, 2),
+            'last_error': self.last_error
+        }
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+本地模拟交易所
+在本机提供 CoinGecko / Binance / Coinbase 行情接口的替身（含Binance深度快照和增量深度推送），
+用于离线测试和基准测试
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+from typing import Dict, Any, Optional, Union, Callable, Set
+
+from aiohttp import web
+
+from price_symbols import DEFAULT_SYMBOLS
+
+COINGECKO_PATH = '/api/v3/simple/price'
+BINANCE_PATH = '/api/v3/ticker/24hr'
+COINBASE_PATH = '/v2/exchange-rates'
+BINANCE_WS_PATH = '/ws/btcusdt@ticker'
+COINBASE_WS_PATH = '/ws/coinbase'
+BINANCE_DEPTH_PATH = '/api/v3/depth'
+BINANCE_DEPTH_WS_PATH = '/ws/btcusdt@depth'
+
+def latency_distribution(spec: str) -> Union[float, Callable[[], float]]:
+    """解析延迟分布（秒）：'0.05' 固定延迟；'uniform:0.02,0.08'；'gauss:均值,标准差'；
+    'lognormal:中位数,sigma'（长尾）；'tail:基础延迟,长尾概率,长尾延迟'"""
+    kind, _, values = spec.partition(':')
+    if not values:
+        return float(kind)
+    args = [float(value) for value in values.split(',')]
+    if kind == 'uniform':
+        low, high = args
+        return lambda: random.uniform(low, high)
+    if kind == 'gauss':
+        mean, stdev = args
+        return lambda: max(0.0, random.gauss(mean, stdev))
+    if kind == 'lognormal':
+        median, sigma = args
+        return lambda: median * random.lognormvariate(0, sigma)
+    if kind == 'tail':
+        base, rate, slow = args
+        return lambda: slow if random.random() < rate else base
+    raise ValueError(f'Unknown latency distribution: {spec}')
+
+class StubExchangeServer:
+    """模拟交易所服务，在后台线程中运行"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: Optional[Dict[str, Union[float, Callable[[], float]]]] = None,
+                 base_price: float = 100000.0, feed_rate: float = 1000.0, drop_after: int = 0,
+                 faults: Optional[Dict[str, Dict[str, float]]] = None,
+                 depth_rate: float = 1000.0, depth_levels: int = 1000, depth_skip_rate: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency or {}  # 每个数据源的响应延迟（秒），也可以是返回延迟的函数（延迟分布）
+        # 故障注入：{source: {'error_rate': 0.1, 'hang_rate': 0.05, 'hang_seconds': 60}}，运行中可修改
+        self.faults = faults or {}
+        self.base_price = base_price
+        # 多币种价格：BTC为 base_price，其余币种按内置映射的顺序取固定价格
+        self.symbol_prices = {
+            symbol: base_price if symbol == 'BTC' else round(base_price / (20 * (i + 1)), 4)
+            for i, symbol in enumerate(DEFAULT_SYMBOLS)
+        }
+        self.feed_rate = feed_rate  # WebSocket行情每个连接每秒推送的消息数
+        self.drop_after = drop_after  # 每个WebSocket连接推送多少条后主动断开（0表示不断开），用于测试重连
+        self.feed_messages = 0
+        self.feed_connections = 0
+        # 深度簿：买卖各 depth_levels 档（$1一档），depth_rate 为每秒增量消息数；
+        # depth_skip_rate 为每条增量对某个订阅方不送达的概率，用于测试缺口重同步
+        self.depth_rate = depth_rate
+        self.depth_skip_rate = depth_skip_rate
+        self.depth_paused = False
+        self.depth_book = {
+            'bids': {float(base_price - i): round(random.uniform(0.01, 2.0), 4) for i in range(1, depth_levels + 1)},
+            'asks': {float(base_price + i): round(random.uniform(0.01, 2.0), 4) for i in range(1, depth_levels + 1)}
+        }
+        self.depth_levels = depth_levels
+        self.depth_update_id = 1
+        self.depth_messages = 0
+        self._depth_subscribers: Set[asyncio.Queue] = set()
+        self._depth_task: Optional[asyncio.Task] = None
+        self.request_counts = {'coingecko': 0, 'binance': 0, 'coinbase': 0}
+        self._peers = set()  # 客户端(ip, port)，用于统计新建的TCP连接数
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def connection_count(self) -> int:
+        """累计接受的TCP连接数"""
+        return len(self._peers)
+
+    @property
+    def ws_endpoints(self) -> Dict[str, str]:
+        """可直接传给 build_feeds(ws_endpoints=...) 的WebSocket URL映射"""
+        ws_base = self.base_url.replace('http://', 'ws://')
+        return {
+            'binance': ws_base + BINANCE_WS_PATH,
+            'coinbase': ws_base + COINBASE_WS_PATH
+        }
+
+    @property
+    def depth_endpoints(self) -> Dict[str, str]:
+        """可直接传给 DepthFeed(snapshot_url=..., stream_url=...) 的URL"""
+        return {
+            'snapshot': self.base_url + BINANCE_DEPTH_PATH,
+            'stream': self.base_url.replace('http://', 'ws://') + BINANCE_DEPTH_WS_PATH
+        }
+
+    @property
+    def endpoints(self) -> Dict[str, str]:
+        """可直接传给 BTCPriceService(endpoints=...) 的URL映射"""
+        return {
+            'coingecko': self.base_url + COINGECKO_PATH,
+            'binance': self.base_url + BINANCE_PATH,
+            'coinbase': self.base_url + COINBASE_PATH
+        }
+
+    async def _respond(self, request: web.Request, source: str, payload: Dict[str, Any]) -> web.Response:
+        self.request_counts[source] += 1
+        self._peers.add(request.transport.get_extra_info('peername'))
+        fault = self.faults.get(source, {})
+        if random.random() < fault.get('hang_rate', 0):
+            await asyncio.sleep(fault.get('hang_seconds', 60))  # 模拟无响应，客户端应超时
+        if random.random() < fault.get('error_rate', 0):
+            return web.json_response({'error': 'Injected fault'}, status=503)
+        delay = self.latency.get(source, 0)
+        if callable(delay):
+            delay = delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return web.json_response(payload)
+
+    def _price_of(self, source: str, identifier: str) -> Optional[float]:
+        for symbol, ids in DEFAULT_SYMBOLS.items():
+            if ids[source] == identifier:
+                return self.symbol_prices[symbol]
+        return None
+
+    async def _coingecko(self, request: web.Request) -> web.Response:
+        # ids 为逗号分隔的列表，批量查询时一次返回多个币种
+        payload = {}
+        for coin_id in request.query.get('ids', 'bitcoin').split(','):
+            price = self.base_price if coin_id == 'bitcoin' else self._price_of('coingecko', coin_id)
+            if price is not None:
+                payload[coin_id] = {
+                    'usd': price,
+                    'usd_24h_change': 1.25,
+                    'usd_24h_vol': 35000000000.0,
+                    'last_updated_at': 1700000000
+                }
+        return await self._respond(request, 'coingecko', payload)
+
+    def _binance_ticker(self, symbol: str, price: float) -> Dict[str, Any]:
+        return {
+            'symbol': symbol,
+            'lastPrice': f'{price:.2f}',
+            'priceChangePercent': '1.300',
+            'volume': '25000.50000000',
+            'highPrice': f'{price * 1.02:.2f}',
+            'lowPrice': f'{price * 0.98:.2f}'
+        }
+
+    async def _binance(self, request: web.Request) -> web.Response:
+        # symbol 查询单个交易对；symbols（JSON数组）批量查询；都不带时返回全部交易对。
+        # 与Binance一致，只要有一个无效交易对，整个请求返回400
+        pairs = {ids['binance']: self.symbol_prices[symbol] + (5 if symbol == 'BTC' else 0)
+                 for symbol, ids in DEFAULT_SYMBOLS.items()}
+        wanted = [request.query['symbol']] if 'symbol' in request.query else json.loads(request.query.get('symbols', '[]'))
+        if any(pair not in pairs for pair in wanted):
+            self.request_counts['binance'] += 1
+            return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+        if 'symbol' in request.query:
+            return await self._respond(request, 'binance', self._binance_ticker(
+                request.query['symbol'], self.base_price + 5))
+        if wanted:
+            pairs = {pair: price for pair, price in pairs.items() if pair in wanted}
+        return await self._respond(request, 'binance', [
+            self._binance_ticker(pair, price) for pair, price in pairs.items()
+        ])
+
+    async def _coinbase(self, request: web.Request) -> web.Response:
+        # currency=USD 时返回以USD为基准的全部汇率（1 USD 可兑换的各币种数量）
+        currency = request.query.get('currency', 'BTC')
+        if currency == 'USD':
+            rates = {ids['coinbase']: f'{1 / (self.symbol_prices[symbol] - (5 if symbol == "BTC" else 0)):.12f}'
+                     for symbol, ids in DEFAULT_SYMBOLS.items()}
+        else:
+            rates = {'USD': f'{1 / (self.base_price - 5):.12f}'}
+        return await self._respond(request, 'coinbase', {
+            'data': {
+                'currency': currency,
+                'rates': rates
+            }
+        })
+
+    async def _stream(self, request: web.Request, make_message, wait_subscribe: bool) -> web.WebSocketResponse:
+        """按 feed_rate 推送随机游走的ticker消息"""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.feed_connections += 1
+        if wait_subscribe:
+            await ws.receive()
+        price = self.base_price
+        batch = max(1, int(self.feed_rate / 100))  # 每10ms发送一批
+        sent = 0
+        start = asyncio.get_running_loop().time()
+        try:
+            while not ws.closed:
+                for _ in range(batch):
+                    price = max(1.0, price + random.uniform(-5, 5))
+                    await ws.send_str(json.dumps(make_message(price)))
+                    sent += 1
+                    self.feed_messages += 1
+                    if self.drop_after and sent >= self.drop_after:
+                        await ws.close()
+                        return ws
+                delay = start + sent / self.feed_rate - asyncio.get_running_loop().time()
+                await asyncio.sleep(max(0.0, delay))
+        except ConnectionResetError:
+            pass
+        return ws
+
+    async def _binance_ws(self, request: web.Request) -> web.WebSocketResponse:
+        return await self._stream(request, lambda price: {
+            'e': '24hrTicker',
+            's': 'BTCUSDT',
+            'c': f'{price:.2f}',
+            'P': '1.300',
+            'v': '25000.50000000',
+            'h': f'{self.base_price * 1.02:.2f}',
+            'l': f'{self.base_price * 0.98:.2f}',
+            'Q': f'{random.uniform(0.001, 0.5):.8f}'
+        }, wait_subscribe=False)
+
+    async def _coinbase_ws(self, request: web.Request) -> web.WebSocketResponse:
+        return await self._stream(request, lambda price: {
+            'type': 'ticker',
+            'product_id': 'BTC-USD',
+            'price': f'{price:.2f}',
+            'open_24h': f'{self.base_price:.2f}',
+            'volume_24h': '12000.5',
+            'high_24h': f'{self.base_price * 1.02:.2f}',
+            'low_24h': f'{self.base_price * 0.98:.2f}',
+            'last_size': f'{random.uniform(0.001, 0.5):.8f}'
+        }, wait_subscribe=True)
+
+    def _depth_diff(self) -> Dict[str, Any]:
+        """随机修改1-4档（靠近最优价的档位更常变化，约1/4为删除），返回Binance depthUpdate消息"""
+        first = self.depth_update_id + 1
+        changes = {'b': [], 'a': []}
+        for _ in range(random.randint(1, 4)):
+            key = random.choice('ba')
+            offset = min(self.depth_levels, int(random.expovariate(1 / 20)) + 1)
+            price = float(self.base_price - offset if key == 'b' else self.base_price + offset)
+            quantity = 0.0 if random.random() < 0.25 else round(random.uniform(0.01, 2.0), 4)
+            levels = self.depth_book['bids' if key == 'b' else 'asks']
+            if quantity:
+                levels[price] = quantity
+            else:
+                levels.pop(price, None)
+            changes[key].append([f'{price:.2f}', f'{quantity:.8f}'])
+            self.depth_update_id += 1
+        return {'e': 'depthUpdate', 'E': 0, 's': 'BTCUSDT', 'U': first, 'u': self.depth_update_id,
+                'b': changes['b'], 'a': changes['a']}
+
+    async def _depth_loop(self):
+        """按 depth_rate 生成增量并分发给所有订阅方（所有连接看到同一个深度簿）"""
+        batch = max(1, int(self.depth_rate / 100))
+        sent = 0
+        start = asyncio.get_running_loop().time()
+        while self._depth_subscribers:
+            if not self.depth_paused:
+                for _ in range(batch):
+                    message = json.dumps(self._depth_diff())
+                    self.depth_messages += 1
+                    for queue in self._depth_subscribers:
+                        if random.random() >= self.depth_skip_rate:
+                            queue.put_nowait(message)
+                sent += batch
+            delay = start + sent / self.depth_rate - asyncio.get_running_loop().time()
+            await asyncio.sleep(max(0.01 if self.depth_paused else 0.0, delay))
+        self._depth_task = None
+
+    async def _depth_ws(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.feed_connections += 1
+        queue: asyncio.Queue = asyncio.Queue()
+        self._depth_subscribers.add(queue)
+        if self._depth_task is None:
+            self._depth_task = asyncio.ensure_future(self._depth_loop())
+        try:
+            while not ws.closed:
+                await ws.send_str(await queue.get())
+        except ConnectionResetError:
+            pass
+        finally:
+            self._depth_subscribers.discard(queue)
+        return ws
+
+    async def _depth_snapshot(self, request: web.Request) -> web.Response:
+        limit = int(request.query.get('limit', 100))
+        bids = sorted(self.depth_book['bids'].items(), reverse=True)[:limit]
+        asks = sorted(self.depth_book['asks'].items())[:limit]
+        return await self._respond(request, 'binance', {
+            'lastUpdateId': self.depth_update_id,
+            'bids': [[f'{price:.2f}', f'{quantity:.8f}'] for price, quantity in bids],
+            'asks': [[f'{price:.2f}', f'{quantity:.8f}'] for price, quantity in asks]
+        })
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(BINANCE_WS_PATH, self._binance_ws)
+        app.router.add_get(BINANCE_DEPTH_WS_PATH, self._depth_ws)
+        app.router.add_get(BINANCE_DEPTH_PATH, self._depth_snapshot)
+        app.router.add_get(COINBASE_WS_PATH, self._coinbase_ws)
+        app.router.add_get(COINGECKO_PATH, self._coingecko)
+        app.router.add_get(BINANCE_PATH, self._binance)
+        app.router.add_get(COINBASE_PATH, self._coinbase)
+        return app
+
+    async def _serve(self):
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def start(self) -> 'StubExchangeServer':
+        """启动服务并等待端口就绪"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait(timeout=10)
+        return self
+
+    def stop(self):
+        """停止服务"""
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def __enter__(self) -> 'StubExchangeServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Stub exchange server')
+    parser.add_argument('--host', default='127.0.0.1', help='Listen host')
+    parser.add_argument('--port', type=int, default=8765, help='Listen port')
+    parser.add_argument('--price', type=float, default=100000.0, help='Base BTC price')
+    parser.add_argument('--latency', default='0',
+                        help='Response latency for every source: seconds, or uniform:/gauss:/lognormal:/tail: distribution')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability a request returns HTTP 503')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='Probability a request hangs')
+    parser.add_argument('--hang-seconds', type=float, default=60.0, help='How long a hanging request stalls')
+    parser.add_argument('--feed-rate', type=float, default=1000.0, help='WebSocket ticker messages per second per connection')
+    parser.add_argument('--depth-rate', type=float, default=1000.0, help='Depth diff messages per second')
+    args = parser.parse_args()
+
+    latency = {name: latency_distribution(args.latency) for name in ('coingecko', 'binance', 'coinbase')}
+    fault = {'error_rate': args.error_rate, 'hang_rate': args.hang_rate, 'hang_seconds': args.hang_seconds}
+    server = StubExchangeServer(args.host, args.port, latency, args.price, args.feed_rate,
+                                faults={name: dict(fault) for name in latency}, depth_rate=args.depth_rate)
+    web.run_app(server.build_app(), host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    main()
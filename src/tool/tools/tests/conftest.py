@@ -0,0 +1,10 @@
+"""
+工具脚本的单元测试：工具之间按同目录模块名互相导入，这里把工具目录加入 sys.path
+"""
+
+import os
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if TOOLS_DIR not in sys.path:
+    sys.path.insert(0, TOOLS_DIR)
@@ -0,0 +1,52 @@
+"""限价单簿：价格优先、时间优先撮合，部分成交与撤单"""
+
+from order_book import LimitOrderBook, RestingOrder
+
+def _order(order_id: str, action: str, limit: float, quantity: float = 1.0) -> RestingOrder:
+    return RestingOrder(order_id, action, limit, quantity, quantity)
+
+def test_only_crossing_orders_fill():
+    """买单在价格 <= 限价时成交，卖单在价格 >= 限价时成交"""
+    book = LimitOrderBook()
+    book.add(_order('b1', 'buy', 99000))
+    book.add(_order('s1', 'sell', 101000))
+    assert book.match(100000) == []
+    assert [(order.order_id, quantity) for order, quantity in book.match(99000)] == [('b1', 1.0)]
+    assert [(order.order_id, quantity) for order, quantity in book.match(101500)] == [('s1', 1.0)]
+    assert len(book) == 0
+
+def test_price_then_time_priority():
+    """限价高的买单先成交，同一限价按下单先后成交"""
+    book = LimitOrderBook()
+    book.add(_order('low', 'buy', 98000))
+    book.add(_order('first', 'buy', 99000))
+    book.add(_order('second', 'buy', 99000))
+    fills = book.match(97000)
+    assert [order.order_id for order, _ in fills] == ['first', 'second', 'low']
+
+def test_partial_fill_keeps_remaining():
+    """tick可成交数量不足时部分成交，剩余部分保持在队首"""
+    book = LimitOrderBook()
+    book.add(_order('a', 'sell', 100000, 1.0))
+    book.add(_order('b', 'sell', 100000, 1.0))
+    fills = book.match(100000, volume=1.5)
+    assert [(order.order_id, quantity) for order, quantity in fills] == [('a', 1.0), ('b', 0.5)]
+    assert book.get('b').remaining == 0.5
+    assert book.open_orders()[0]['status'] == 'partially_filled'
+    fills = book.match(100000, volume=2.0)
+    assert [(order.order_id, quantity) for order, quantity in fills] == [('b', 0.5)]
+    assert len(book) == 0
+
+def test_cancel_removes_order_from_matching():
+    """撤单后订单不再成交；档位上最后一笔被撤时档位移除"""
+    book = LimitOrderBook()
+    book.add(_order('a', 'buy', 99000))
+    book.add(_order('b', 'buy', 99000))
+    book.add(_order('c', 'buy', 98000))
+    assert book.cancel('a').order_id == 'a'
+    assert book.cancel('a') is None
+    assert [order.order_id for order, _ in book.match(99000)] == ['b']
+    assert book.cancel('c') is not None
+    assert book.match(90000) == []
+    assert len(book) == 0
+    assert book.bids.best() is None
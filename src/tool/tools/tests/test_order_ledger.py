@@ -0,0 +1,76 @@
+"""订单账本：进程崩溃后的余额恢复与订单索引"""
+
+import os
+import subprocess
+import sys
+import textwrap
+import uuid
+
+import pytest
+
+from order_ledger import OrderLedger, KIND_FILL
+
+TOOLS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _crash_after_fills(ledger_dir: str, fills: int, snapshot_every: int):
+    """在子进程中写入 fills 笔成交后直接 os._exit，不关闭账本"""
+    script = textwrap.dedent(f'''
+        import os, sys, uuid
+        sys.path.insert(0, {TOOLS_DIR!r})
+        from order_ledger import OrderLedger
+        ledger = OrderLedger({ledger_dir!r}, snapshot_every={snapshot_every})
+        balance = ledger.attach({{'usd': 10000.0, 'btc': 0.0}})
+        for i in range({fills}):
+            with ledger.transaction():
+                cost = 10.0 + i
+                balance['usd'] -= cost
+                balance['btc'] += 0.0001
+                ledger.record_fill(str(uuid.UUID(int=i + 1)), 'buy', 'market', 100000.0, 0.0001,
+                                   cost, 0.0, -cost, 0.0001)
+        print(repr(balance['usd']), repr(balance['btc']), flush=True)
+        os._exit(0)
+    ''')
+    output = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True).stdout
+    usd, btc = output.split()
+    return float(usd), float(btc)
+
+@pytest.mark.parametrize('snapshot_every', [1000, 7])
+def test_balance_recovered_after_crash(tmp_path, snapshot_every):
+    """崩溃前写入的成交在重启后全部重放（有无中间快照都一样）"""
+    usd, btc = _crash_after_fills(str(tmp_path), 50, snapshot_every)
+    ledger = OrderLedger(str(tmp_path), snapshot_every=snapshot_every)
+    balance = ledger.attach({'usd': 10000.0, 'btc': 0.0})
+    assert balance['usd'] == pytest.approx(usd)
+    assert balance['btc'] == pytest.approx(btc)
+    assert balance['usd'] == pytest.approx(10000.0 - sum(10.0 + i for i in range(50)))
+    if snapshot_every < 50:
+        assert ledger.replayed < 50
+    ledger.close()
+
+def test_index_rebuilt_when_missing(tmp_path):
+    """索引文件丢失（或落后于记录）时，重新打开账本会补建索引"""
+    _crash_after_fills(str(tmp_path), 20, 1000)
+    os.remove(os.path.join(str(tmp_path), 'orders.index'))
+    ledger = OrderLedger(str(tmp_path))
+    ledger.attach({'usd': 10000.0, 'btc': 0.0})
+    with ledger.reading():
+        for i in range(20):
+            record = ledger.find(str(uuid.UUID(int=i + 1)))
+            assert record is not None and record[2] == KIND_FILL
+        assert ledger.find(str(uuid.uuid4())) is None
+    ledger.close()
+
+def test_second_process_sees_committed_fills(tmp_path):
+    """两个进程共用账本：写事务开始时先追上其他进程的记录"""
+    first = OrderLedger(str(tmp_path))
+    first_balance = first.attach({'usd': 10000.0, 'btc': 0.0})
+    second = OrderLedger(str(tmp_path))
+    second_balance = second.attach({'usd': 10000.0, 'btc': 0.0})
+    with first.transaction():
+        first_balance['usd'] -= 100.0
+        first.record_fill(str(uuid.uuid4()), 'buy', 'market', 100000.0, 0.001, 100.0, 0.0, -100.0, 0.001)
+    with second.transaction():
+        assert second_balance['usd'] == pytest.approx(9900.0)
+        assert second_balance['btc'] == pytest.approx(0.001)
+    first.close()
+    second.close()
@@ -0,0 +1,47 @@
+"""本地深度簿：快照之后的增量连续性与缺口处理"""
+
+from depth_book import DepthBook
+
+def _book() -> DepthBook:
+    book = DepthBook()
+    book.load_snapshot({'lastUpdateId': 100,
+                        'bids': [['99999', '1.0'], ['99998', '2.0']],
+                        'asks': [['100001', '1.0'], ['100002', '2.0']]})
+    return book
+
+def _diff(first: int, last: int, bids=(), asks=()):
+    return {'U': first, 'u': last, 'b': list(bids), 'a': list(asks)}
+
+def test_diffs_before_snapshot_are_ignored():
+    book = _book()
+    assert book.apply_diff(_diff(90, 100, bids=[['99999', '5.0']]))
+    assert book.bids.quantities[99999.0] == 1.0
+    assert book.last_update_id == 100
+
+def test_first_diff_may_straddle_snapshot():
+    """第一条增量 U <= lastUpdateId+1 <= u 时应用"""
+    book = _book()
+    assert book.apply_diff(_diff(95, 105, bids=[['99999', '0'], ['99997', '3.0']]))
+    assert book.synced and book.last_update_id == 105
+    assert book.bids.best() == 99998.0
+    assert 99999.0 not in book.bids.quantities
+
+def test_contiguous_diffs_apply():
+    book = _book()
+    assert book.apply_diff(_diff(101, 102, asks=[['100001', '0.5']]))
+    assert book.apply_diff(_diff(103, 110, asks=[['100000.5', '0.2']]))
+    assert book.asks.best() == 100000.5
+    assert book.asks.quantities[100001.0] == 0.5
+    assert book.updates == 2
+
+def test_gap_unsyncs_until_new_snapshot():
+    """出现缺口时返回 False 且不应用；重新加载快照前后续增量也不应用"""
+    book = _book()
+    assert book.apply_diff(_diff(101, 102))
+    assert not book.apply_diff(_diff(104, 105, bids=[['99999', '9.0']]))
+    assert not book.synced
+    assert book.bids.quantities[99999.0] == 1.0
+    assert not book.apply_diff(_diff(103, 103))
+    book.load_snapshot({'lastUpdateId': 105, 'bids': [['99990', '1.0']], 'asks': [['100010', '1.0']]})
+    assert book.apply_diff(_diff(106, 106, bids=[['99991', '1.0']]))
+    assert book.synced and book.bids.best() == 99991.0
@@ -0,0 +1,93 @@
+"""阈值订阅索引：穿越判断、迟滞与增删订阅"""
+
+import random
+
+from price_thresholds import ThresholdIndex
+
+def _sides(crossings):
+    return sorted((crossing['subscription']['id'], crossing['side']) for crossing in crossings)
+
+def test_crossings_only_on_threshold_cross():
+    """下行穿越买入阈值、上行穿越卖出阈值时触发，未穿越不触发"""
+    index = ThresholdIndex(hysteresis=0.0)
+    index.add('a', buy=95000, sell=105000)
+    assert index.update(100000) == []
+    assert index.update(96000) == []
+    assert _sides(index.update(95000)) == [('a', 'buy')]
+    assert index.update(94000) == []
+    assert _sides(index.update(106000)) == [('a', 'sell')]
+
+def test_subscription_already_inside_triggers_once():
+    """新增订阅时价格已处于区间内：立即触发一次，之后不重复触发"""
+    index = ThresholdIndex()
+    index.update(90000)
+    subscription, crossings = index.add('a', buy=95000)
+    assert _sides(crossings) == [('a', 'buy')]
+    assert index.update(89000) == []
+
+def test_flapping_between_exchange_prices_triggers_once():
+    """价格在阈值两侧来回波动（例如两个交易所价差）时，迟滞内只触发一次"""
+    index = ThresholdIndex(hysteresis=0.001)
+    index.add('a', buy=100000)
+    crossings = []
+    for _ in range(100):
+        crossings += index.update(100005)
+        crossings += index.update(99995)
+    assert _sides(crossings) == [('a', 'buy')]
+    # 回到阈值上方超过迟滞后重新启用
+    assert index.update(100000 * 1.0011) == []
+    assert _sides(index.update(99990)) == [('a', 'buy')]
+
+def test_flapping_without_hysteresis_triggers_each_cross():
+    index = ThresholdIndex(hysteresis=0.0)
+    index.add('a', buy=100000)
+    crossings = []
+    for _ in range(10):
+        crossings += index.update(100005)
+        crossings += index.update(99995)
+    assert len(crossings) == 10
+
+def test_matches_naive_check_without_hysteresis():
+    """无迟滞时与逐个订阅判断 price <= buy < previous / previous < sell <= price 一致"""
+    rng = random.Random(3)
+    items = [{'id': f's{i}', 'buy': rng.uniform(95000, 100000), 'sell': rng.uniform(100000, 105000)}
+             for i in range(200)]
+    index = ThresholdIndex(hysteresis=0.0)
+    index.add_many(items)
+    previous = 100000.0
+    index.update(previous)
+    for _ in range(500):
+        price = previous * (1 + rng.gauss(0, 0.01))
+        expected = sorted([(item['id'], 'buy') for item in items if price <= item['buy'] < previous] +
+                          [(item['id'], 'sell') for item in items if previous < item['sell'] <= price])
+        assert _sides(index.update(price)) == expected
+        previous = price
+
+def test_remove_and_replace_while_rearming():
+    """已触发、等待重新启用的订阅同样可以删除或替换"""
+    index = ThresholdIndex(hysteresis=0.01)
+    index.add('a', buy=100000)
+    index.update(101000)
+    assert _sides(index.update(99000)) == [('a', 'buy')]
+    assert index.stats()['rearming'] == 1
+    index.add_many([{'id': 'a', 'buy': 98000}])
+    assert index.stats()['rearming'] == 0
+    assert _sides(index.update(97000)) == [('a', 'buy')]
+    assert index.remove('a')
+    stats = index.stats()
+    assert (stats['subscriptions'], stats['buy_thresholds'], stats['rearming']) == (0, 0, 0)
+
+def test_duplicate_ids_in_one_batch_keep_the_last():
+    """同一批中重复的ID只保留最后一个：只触发一次，删除后不留下残余阈值"""
+    index = ThresholdIndex(hysteresis=0.0)
+    index.update(100000)
+    added, _ = index.add_many([{'id': 'a', 'buy': 99000}, {'id': 'b', 'sell': 101000},
+                               {'id': 'a', 'buy': 98000, 'sell': 102000}])
+    assert [subscription['id'] for subscription in added] == ['b', 'a']
+    stats = index.stats()
+    assert (stats['subscriptions'], stats['buy_thresholds'], stats['sell_thresholds']) == (2, 1, 2)
+    assert index.update(98500) == []
+    assert _sides(index.update(97000)) == [('a', 'buy')]
+    assert index.remove('a')
+    stats = index.stats()
+    assert (stats['buy_thresholds'], stats['sell_thresholds']) == (0, 1)
@@ -0,0 +1,30 @@
+"""tick文件：二进制与CSV互转，tick存储的段文件不按tick文件读取"""
+
+import os
+
+import numpy as np
+import pytest
+
+from tick_files import convert, read_ticks, write_ticks
+from tick_store import TickStore
+
+def test_csv_binary_round_trip(tmp_path):
+    binary = str(tmp_path / 'ticks.bin')
+    write_ticks(binary, [1.0, 2.0, 3.0], [100000.0, 100001.0, 99999.5], [0.1, 0.2, 0.3])
+    csv = str(tmp_path / 'ticks.csv')
+    assert convert(binary, csv) == 3
+    ticks = read_ticks(csv)
+    np.testing.assert_allclose(ticks['price'], [100000.0, 100001.0, 99999.5])
+    np.testing.assert_allclose(ticks['volume'], [0.1, 0.2, 0.3])
+
+def test_tick_store_segments_are_rejected(tmp_path):
+    """tick存储的 .ticks 段文件是列式格式，按定长记录解析会得到错误数据"""
+    store = TickStore(str(tmp_path))
+    store.append(1700092800.0, 'binance', 100000.0, 0.1)
+    store.close()
+    segment = os.path.join(str(tmp_path), '2023-11-16.ticks')
+    assert os.path.exists(segment)
+    with pytest.raises(ValueError):
+        read_ticks(segment)
+    with pytest.raises(ValueError):
+        convert(segment, str(tmp_path / 'out.csv'))
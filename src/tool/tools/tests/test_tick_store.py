@@ -0,0 +1,74 @@
+"""tick存储：跨天的时间范围查询、数据源过滤、扩容和只读打开"""
+
+import numpy as np
+import pytest
+
+from tick_store import DAY_SECONDS, SOURCE_CODES, TickStore
+
+MIDNIGHT = 1700092800.0  # 2023-11-16 00:00 UTC
+
+@pytest.fixture
+def store(tmp_path):
+    store = TickStore(str(tmp_path), day_capacity=16)
+    yield store
+    store.close()
+
+def _fill(store: TickStore, start: float, seconds: int):
+    """每秒 binance、coinbase 各一个tick，价格等于时间偏移"""
+    offsets = np.repeat(np.arange(seconds, dtype=np.float64), 2)
+    sources = np.tile(np.array([SOURCE_CODES['binance'], SOURCE_CODES['coinbase']], dtype=np.uint8), seconds)
+    store.append_many(start + offsets, sources, 100000.0 + offsets, np.full(len(offsets), 0.1))
+    store.flush()
+
+def test_range_across_midnight(store):
+    _fill(store, MIDNIGHT - 60, 120)
+    assert len(store.days()) == 2
+    ticks = store.query(MIDNIGHT - 10, MIDNIGHT + 9)
+    assert len(ticks['timestamp']) == 40
+    assert ticks['timestamp'][0] == MIDNIGHT - 10 and ticks['timestamp'][-1] == MIDNIGHT + 9
+    assert np.all(np.diff(ticks['timestamp']) >= 0)
+    np.testing.assert_array_equal(ticks['price'], 100000.0 + ticks['timestamp'] - (MIDNIGHT - 60))
+
+def test_range_bounds_are_inclusive_and_single_day_is_a_view(store):
+    _fill(store, MIDNIGHT, 30)
+    ticks = store.query(MIDNIGHT + 5, MIDNIGHT + 7)
+    assert len(ticks['timestamp']) == 6
+    assert not ticks['price'].flags.owndata
+    assert not ticks['price'].flags.writeable
+
+def test_source_filter_across_days(store):
+    _fill(store, MIDNIGHT - 5, 10)
+    ticks = store.query(MIDNIGHT - 5, MIDNIGHT + 4, source='coinbase')
+    assert len(ticks['timestamp']) == 10
+    assert set(ticks['source'].tolist()) == {SOURCE_CODES['coinbase']}
+
+def test_empty_and_long_ranges(store):
+    _fill(store, MIDNIGHT - 5, 10)
+    assert len(store.query(MIDNIGHT + 3600, MIDNIGHT + 7200)['timestamp']) == 0
+    # 超过31天的范围只访问已有的段文件
+    ticks = store.query(MIDNIGHT - 400 * DAY_SECONDS, MIDNIGHT + 400 * DAY_SECONDS)
+    assert len(ticks['timestamp']) == 20
+
+def test_out_of_order_append_is_clamped(store):
+    store.append(MIDNIGHT + 10, 'binance', 100000.0)
+    store.append(MIDNIGHT + 5, 'binance', 100001.0)
+    ticks = store.query(MIDNIGHT, MIDNIGHT + 20)
+    assert ticks['timestamp'].tolist() == [MIDNIGHT + 10, MIDNIGHT + 10]
+    assert store.reordered == 1
+
+def test_reader_sees_appends_and_growth(tmp_path):
+    writer = TickStore(str(tmp_path), day_capacity=4)
+    reader = TickStore(str(tmp_path), readonly=True)
+    for i in range(3):
+        writer.append(MIDNIGHT + i, 'aggregated', 100000.0 + i)
+    writer.flush()
+    assert len(reader.query(MIDNIGHT, MIDNIGHT + 100)['timestamp']) == 3
+    for i in range(3, 40):
+        writer.append(MIDNIGHT + i, 'aggregated', 100000.0 + i)
+    writer.flush()
+    ticks = reader.query(MIDNIGHT, MIDNIGHT + 100)
+    assert ticks['price'].tolist() == [100000.0 + i for i in range(40)]
+    with pytest.raises(RuntimeError):
+        TickStore(str(tmp_path))
+    reader.close()
+    writer.close()
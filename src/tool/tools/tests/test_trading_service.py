@@ -0,0 +1,44 @@
+"""交易服务：订单校验与批量下单"""
+
+import pytest
+
+from order_ledger import OrderLedger
+from tool_loader import load_tool
+
+trading = load_tool('btc-trading-tool.py')
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), float('-inf'), 0.0, -1.0])
+def test_non_finite_or_non_positive_values_rejected(tmp_path, value):
+    """NaN、±inf 和非正数的数量或价格在触及余额和账本之前被拒绝"""
+    ledger = OrderLedger(str(tmp_path))
+    service = trading.BTCTradingService(ledger)
+    assert not service.execute_buy_order(value, 50000.0)['success']
+    assert not service.execute_buy_order(100.0, value)['success']
+    assert not service.execute_sell_order(value, 50000.0)['success']
+    assert not service.execute_sell_order(0.001, value)['success']
+    batch = service.execute_batch([{'action': 'buy', 'amount': value, 'price': 50000.0},
+                                   {'action': 'buy', 'amount': 100.0, 'price': value}])
+    assert batch['rejected'] == 2
+    assert service.balance == {'usd': 10000.0, 'btc': 0.0}
+    assert service.get_order_history()['orders'] == []
+    ledger.close()
+
+def test_history_reads_hold_the_service_lock(tmp_path):
+    """账本查询与下单在同一个服务锁内串行，读线程不会释放写事务持有的文件锁"""
+    ledger = OrderLedger(str(tmp_path))
+    service = trading.BTCTradingService(ledger)
+    assert service.execute_buy_order(100.0, 50000.0)['success']
+    reads = []
+    original = ledger.history
+    ledger.history = lambda *args: reads.append(service._lock._is_owned()) or original(*args)
+    assert service.get_order_history()['count'] == 1
+    assert reads == [True]
+    ledger.close()
+
+def test_malformed_batch_entries_rejected_individually():
+    """批量中不是对象的元素只拒绝该笔，其余订单照常执行"""
+    service = trading.BTCTradingService()
+    batch = service.execute_batch([1, {'action': 'buy', 'amount': 100.0, 'price': 50000.0}, None, 'sell'])
+    assert [result['status'] for result in batch['results']] == ['rejected', 'filled', 'rejected', 'rejected']
+    assert batch['results'][0]['error'] == 'order must be an object'
+    assert (batch['accepted'], batch['rejected']) == (1, 3)
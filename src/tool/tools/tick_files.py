@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+行情tick文件
+二进制格式为定长记录（timestamp, price, volume，均为小端float64），可直接内存映射，
+CSV格式为 timestamp,price[,volume]（timestamp为Unix秒，允许一行表头）。
+tick存储（tick_store）的按日段文件 .ticks 是另一种格式，不能在这里读取。
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+TICK_DTYPE = np.dtype([('timestamp', '<f8'), ('price', '<f8'), ('volume', '<f8')])
+BINARY_SUFFIXES = ('.bin',)
+STORE_SEGMENT_SUFFIX = '.ticks'  # tick_store 的段文件
+
+def is_binary(path: str) -> bool:
+    return path.endswith(BINARY_SUFFIXES)
+
+def read_csv_ticks(path: str) -> np.ndarray:
+    """读取CSV tick文件，缺少volume列时成交量为0"""
+    with open(path) as f:
+        first = f.readline()
+    skip = 0 if first.split(',')[0].strip().replace('.', '', 1).isdigit() else 1
+    data = np.loadtxt(path, delimiter=',', skiprows=skip, ndmin=2)
+    ticks = np.zeros(len(data), dtype=TICK_DTYPE)
+    ticks['timestamp'] = data[:, 0]
+    ticks['price'] = data[:, 1]
+    if data.shape[1] > 2:
+        ticks['volume'] = data[:, 2]
+    return ticks
+
+def read_ticks(path: str) -> np.ndarray:
+    """读取tick文件；二进制文件以只读方式内存映射，不复制数据"""
+    if path.endswith(STORE_SEGMENT_SUFFIX):
+        raise ValueError(f'{path} is a tick store segment; read it with tick_store.TickStore')
+    if is_binary(path):
+        return np.memmap(path, dtype=TICK_DTYPE, mode='r')
+    return read_csv_ticks(path)
+
+def write_ticks(path: str, timestamps, prices, volumes=None):
+    """写入二进制tick文件"""
+    ticks = np.zeros(len(prices), dtype=TICK_DTYPE)
+    ticks['timestamp'] = timestamps
+    ticks['price'] = prices
+    if volumes is not None:
+        ticks['volume'] = volumes
+    ticks.tofile(path)
+
+def convert(source: str, target: str) -> int:
+    """CSV与二进制格式互相转换，返回tick数"""
+    if target.endswith(STORE_SEGMENT_SUFFIX):
+        raise ValueError(f'{target}: the .ticks suffix is reserved for tick store segments')
+    ticks = read_ticks(source)
+    if is_binary(target):
+        np.asarray(ticks).tofile(target)
+    else:
+        np.savetxt(target, np.column_stack([ticks['timestamp'], ticks['price'], ticks['volume']]),
+                   delimiter=',', fmt=['%.3f', '%.2f', '%.8f'], header='timestamp,price,volume', comments='')
+    return len(ticks)
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Tick file conversion (CSV <-> binary)')
+    parser.add_argument('source', help='Input file (.csv, or .bin binary)')
+    parser.add_argument('target', help='Output file (.csv, or .bin binary)')
+    args = parser.parse_args()
+
+    count = convert(args.source, args.target)
+    print(json.dumps({'success': True, 'ticks': count, 'target': args.target}))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+行情tick存储
+按UTC日期每天一个定长列式段文件（内存映射）：64字节文件头之后依次是 timestamp（float64）、price（float64）、
+volume（float64）、source（uint8）四列，每列预留 capacity 个位置（稀疏文件，未写入的部分不占磁盘），
+写满后容量翻倍重建。读取直接返回映射上的NumPy视图，不复制数据；时间范围查询在每天的
+timestamp列上二分查找（同一天内时间戳单调不减）。
+
+只打开被查询到的日期，最多保持 max_open_days 个映射，常驻内存只与被访问的页有关，与总tick数无关。
+同一个目录只允许一个写入方（文件锁），其他进程可以只读打开并看到已提交的tick。
+"""
+
+import argparse
+import calendar
+import fcntl
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, List, Optional
+
+import numpy as np
+
+DEFAULT_STORE_DIR = os.path.join(tempfile.gettempdir(), 'joyhouse-btc-ticks')
+
+STORE_MAGIC = b'JHTICK01'
+# 文件头：magic, 已提交tick数, 每列容量, 当天0点（Unix秒）
+HEADER = struct.Struct('<8sQQd')
+HEADER_SIZE = 64
+DAY_SECONDS = 24 * 60 * 60
+
+COLUMNS = (('timestamp', np.float64), ('price', np.float64), ('volume', np.float64), ('source', np.uint8))
+TICK_BYTES = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+
+# 数据源编码（source列）
+SOURCES = ('aggregated', 'coingecko', 'binance', 'coinbase')
+SOURCE_CODES = {name: code for code, name in enumerate(SOURCES)}
+
+def day_name(day: int) -> str:
+    return time.strftime('%Y-%m-%d', time.gmtime(day * DAY_SECONDS))
+
+def _column_offsets(capacity: int) -> Dict[str, int]:
+    offsets, offset = {}, HEADER_SIZE
+    for name, dtype in COLUMNS:
+        offsets[name] = offset
+        offset += capacity * np.dtype(dtype).itemsize
+    return offsets
+
+class DaySegment:
+    """一天的段文件"""
+
+    def __init__(self, path: str, writable: bool):
+        self.path = path
+        self.writable = writable
+        self._fd = os.open(path, os.O_RDWR if writable else os.O_RDONLY)
+        self._map()
+
+    def _map(self):
+        self.inode = os.fstat(self._fd).st_ino
+        access = mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+        self._mm = mmap.mmap(self._fd, 0, access=access)
+        magic, _, self.capacity, self.day_start = HEADER.unpack_from(self._mm, 0)
+        if magic != STORE_MAGIC:
+            raise ValueError(f'Not a tick segment: {self.path}')
+        offsets = _column_offsets(self.capacity)
+        self.columns = {name: np.frombuffer(self._mm, dtype, self.capacity, offsets[name])
+                        for name, dtype in COLUMNS}
+
+    @staticmethod
+    def create(path: str, day: int, capacity: int):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            os.ftruncate(fd, HEADER_SIZE + capacity * TICK_BYTES)
+            os.pwrite(fd, HEADER.pack(STORE_MAGIC, 0, capacity, float(day * DAY_SECONDS)), 0)
+        finally:
+            os.close(fd)
+
+    @property
+    def count(self) -> int:
+        return HEADER.unpack_from(self._mm, 0)[1]
+
+    def commit(self, count: int):
+        """先写列再更新计数，只读方看到的总是完整的前缀"""
+        HEADER.pack_into(self._mm, 0, STORE_MAGIC, count, self.capacity, self.day_start)
+
+    def refresh(self):
+        """写入方扩容（替换了文件）后重新映射"""
+        if os.stat(self.path).st_ino != self.inode:
+            self._release()
+            self._fd = os.open(self.path, os.O_RDWR if self.writable else os.O_RDONLY)
+            self._map()
+
+    def view(self, name: str, lo: int = 0, hi: Optional[int] = None) -> np.ndarray:
+        """列的只读视图（不复制）"""
+        column = self.columns[name][lo:self.count if hi is None else hi]
+        if self.writable:
+            column = column.view()
+            column.flags.writeable = False
+        return column
+
+    def grow(self):
+        """容量翻倍：写入新文件后原子替换"""
+        count, capacity = self.count, self.capacity * 2
+        tmp = self.path + '.tmp'
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, HEADER_SIZE + capacity * TICK_BYTES)
+            with mmap.mmap(fd, 0) as mm:
+                HEADER.pack_into(mm, 0, STORE_MAGIC, count, capacity, self.day_start)
+                offsets = _column_offsets(capacity)
+                for name, dtype in COLUMNS:
+                    np.frombuffer(mm, dtype, count, offsets[name])[:] = self.columns[name][:count]
+        finally:
+            os.close(fd)
+        os.replace(tmp, self.path)
+        self.refresh()
+
+    def flush(self):
+        self._mm.flush()
+
+    def _release(self):
+        self.columns = {}
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # 调用方仍持有视图时由垃圾回收关闭映射
+        os.close(self._fd)
+
+    def close(self):
+        self._release()
+
+class TickStore:
+    """按天分段的列式tick存储"""
+
+    def __init__(self, store_dir: Optional[str] = None, readonly: bool = False,
+                 day_capacity: int = 1 << 18, max_open_days: int = 64):
+        self.store_dir = store_dir or os.environ.get('BTC_TICK_STORE_DIR', DEFAULT_STORE_DIR)
+        self.readonly = readonly
+        self.day_capacity = day_capacity  # 新建段文件的初始容量（3个数据源每秒一个tick约为 1<<18）
+        self.max_open_days = max_open_days
+        self.appended = 0
+        self.reordered = 0  # 时间戳早于当天最后一个tick、被调整为该时间的tick数
+        self._segments: 'OrderedDict[int, DaySegment]' = OrderedDict()
+        self._lock_fd: Optional[int] = None
+        if not readonly:
+            os.makedirs(self.store_dir, exist_ok=True)
+            self._lock_fd = os.open(os.path.join(self.store_dir, 'store.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(self._lock_fd)
+                raise RuntimeError(f'Tick store is locked by another writer: {self.store_dir}')
+
+    def _path(self, day: int) -> str:
+        return os.path.join(self.store_dir, f'{day_name(day)}.ticks')
+
+    def days(self) -> List[int]:
+        """已有数据的日期（自1970-01-01起的天数），升序"""
+        if not os.path.isdir(self.store_dir):
+            return []
+        days = []
+        for name in os.listdir(self.store_dir):
+            if name.endswith('.ticks'):
+                days.append(calendar.timegm(time.strptime(name[:-6], '%Y-%m-%d')) // DAY_SECONDS)
+        return sorted(days)
+
+    def segment(self, day: int, create: bool = False) -> Optional[DaySegment]:
+        """打开（或创建）一天的段文件；超过 max_open_days 时关闭最久未用的映射"""
+        segment = self._segments.get(day)
+        if segment is not None:
+            self._segments.move_to_end(day)
+            if self.readonly:
+                segment.refresh()
+            return segment
+        path = self._path(day)
+        if not os.path.exists(path):
+            if not create:
+                return None
+            DaySegment.create(path, day, self.day_capacity)
+        segment = self._segments[day] = DaySegment(path, not self.readonly)
+        while len(self._segments) > self.max_open_days:
+            self._segments.popitem(last=False)[1].close()
+        return segment
+
+    # ---- 写入 ----
+
+    def append(self, timestamp: float, source: str, price: float, volume: float = 0.0):
+        """追加一个tick（同一天内时间戳不能倒退，早到的tick按当天最后的时间戳记录）"""
+        segment = self.segment(int(timestamp // DAY_SECONDS), create=True)
+        count = segment.count
+        if count == segment.capacity:
+            segment.grow()
+        columns = segment.columns
+        if count and timestamp < columns['timestamp'][count - 1]:
+            timestamp = columns['timestamp'][count - 1]
+            self.reordered += 1
+        columns['timestamp'][count] = timestamp
+        columns['price'][count] = price
+        columns['volume'][count] = volume
+        columns['source'][count] = SOURCE_CODES[source]
+        segment.commit(count + 1)
+        self.appended += 1
+
+    def append_many(self, timestamps, sources, prices, volumes=None) -> int:
+        """批量追加（按时间升序），sources 为数据源名或编码的数组，按天整段复制"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.zeros(len(timestamps)) if volumes is None else np.asarray(volumes, dtype=np.float64)
+        if isinstance(sources, str):
+            codes = np.full(len(timestamps), SOURCE_CODES[sources], dtype=np.uint8)
+        else:
+            codes = np.asarray(sources)
+            if codes.dtype.kind in 'US':
+                codes = np.array([SOURCE_CODES[name] for name in codes.tolist()], dtype=np.uint8)
+        days = (timestamps // DAY_SECONDS).astype(np.int64)
+        bounds = np.flatnonzero(np.diff(days)) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(timestamps)]):
+            segment = self.segment(int(days[lo]), create=True)
+            count = segment.count
+            while count + hi - lo > segment.capacity:
+                segment.grow()
+            columns = segment.columns
+            columns['timestamp'][count:count + hi - lo] = timestamps[lo:hi]
+            columns['price'][count:count + hi - lo] = prices[lo:hi]
+            columns['volume'][count:count + hi - lo] = volumes[lo:hi]
+            columns['source'][count:count + hi - lo] = codes[lo:hi]
+            segment.commit(count + hi - lo)
+        self.appended += len(timestamps)
+        return len(timestamps)
+
+    def append_quote(self, result: Dict[str, Any], timestamp: Optional[float] = None):
+        """追加一次聚合查询的结果：聚合价格和各数据源的价格各记一个tick"""
+        if not result.get('success'):
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        for name, quote in (result.get('sources') or {}).items():
+            if name in SOURCE_CODES and quote.get('price'):
+                self.append(timestamp, name, float(quote['price']), float(quote.get('last_size') or 0.0))
+        self.append(timestamp, 'aggregated', float(result['price']))
+
+    def flush(self):
+        """把已写入的页同步到磁盘"""
+        for segment in self._segments.values():
+            segment.flush()
+
+    # ---- 查询 ----
+
+    def iter_range(self, start: float, end: float) -> Iterator[Dict[str, np.ndarray]]:
+        """按天返回 [start, end] 内各列的视图（不复制）"""
+        first, last = int(start // DAY_SECONDS), int(end // DAY_SECONDS)
+        # 跨度很大时只看已有的日期，而不是逐天检查文件是否存在
+        days = range(first, last + 1) if last - first <= 31 else [day for day in self.days() if first <= day <= last]
+        for day in days:
+            segment = self.segment(day)
+            if segment is None:
+                continue
+            timestamps = segment.view('timestamp')
+            lo = int(np.searchsorted(timestamps, start, 'left'))
+            hi = int(np.searchsorted(timestamps, end, 'right'))
+            if hi > lo:
+                yield {name: segment.view(name, lo, hi) for name, _ in COLUMNS}
+
+    def query(self, start: float, end: float, source: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """[start, end]（Unix秒，含起止）内的tick；只涉及一天且不按数据源过滤时返回视图，否则拼接为新数组"""
+        parts = list(self.iter_range(start, end))
+        if source is not None:
+            code = SOURCE_CODES[source]
+            parts = [{name: column[part['source'] == code] for name, column in part.items()} for part in parts]
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0, dtype)
+                for name, dtype in COLUMNS}
+
+    def stats(self) -> Dict[str, Any]:
+        days = self.days()
+        ticks, disk = 0, 0
+        for day in days:
+            path = self._path(day)
+            with open(path, 'rb') as f:
+                ticks += HEADER.unpack(f.read(HEADER.size))[1]
+            disk += os.stat(path).st_blocks * 512
+        return {
+            'store_dir': self.store_dir,
+            'days': len(days),
+            'first_day': day_name(days[0]) if days else None,
+            'last_day': day_name(days[-1]) if days else None,
+            'ticks': ticks,
+            'disk_bytes': disk,
+            'open_days': len(self._segments),
+            'appended': self.appended,
+            'reordered': self.reordered
+        }
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Query the on-disk tick store')
+    parser.add_argument('--store-dir', default=None, help='Tick store directory')
+    parser.add_argument('--start', type=float, help='Range start (Unix seconds); omit for stats only')
+    parser.add_argument('--end', type=float, help='Range end (Unix seconds, defaults to now)')
+    parser.add_argument('--source', choices=SOURCES, help='Only ticks from this source')
+    parser.add_argument('--limit', type=int, default=20, help='Ticks to print from the end of the range')
+    args = parser.parse_args()
+
+    store = TickStore(args.store_dir, readonly=True)
+    result: Dict[str, Any] = {'success': True, 'stats': store.stats()}
+    if args.start is not None:
+        ticks = store.query(args.start, args.end if args.end is not None else time.time(), args.source)
+        result['count'] = len(ticks['timestamp'])
+        result['ticks'] = [
+            {'timestamp': float(ts), 'source': SOURCES[int(code)], 'price': float(price), 'volume': float(volume)}
+            for ts, code, price, volume in zip(*(ticks[name][-args.limit:] for name in
+                                                 ('timestamp', 'source', 'price', 'volume')))
+        ]
+    store.close()
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
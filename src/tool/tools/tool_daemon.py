@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+工具常驻服务公共部分
+把工具的操作暴露为本地HTTP接口，进程常驻以保留连接池、缓存和模拟余额等状态，
+并统计每个接口的调用延迟（p50/p99）
+"""
+
+import time
+from collections import deque
+from typing import Dict, Any, Deque
+
+from aiohttp import web
+
+class LatencyRecorder:
+    """按接口记录最近的调用耗时"""
+
+    def __init__(self, window: int = 10000):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, route: str, seconds: float):
+        samples = self._samples.get(route)
+        if samples is None:
+            samples = self._samples[route] = deque(maxlen=self.window)
+        samples.append(seconds)
+        self._counts[route] = self._counts.get(route, 0) + 1
+
+    @staticmethod
+    def _percentile(ordered: list, pct: float) -> float:
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def report(self) -> Dict[str, Any]:
+        """各接口的调用次数和最近窗口内的p50/p99延迟（毫秒）"""
+        report = {}
+        for route, samples in self._samples.items():
+            ordered = sorted(samples)
+            report[route] = {
+                'count': self._counts[route],
+                'p50_ms': round(self._percentile(ordered, 50) * 1000, 3),
+                'p99_ms': round(self._percentile(ordered, 99) * 1000, 3)
+            }
+        return report
+
+async def read_params(request: web.Request) -> Dict[str, Any]:
+    """合并查询参数和JSON请求体（ToolService只能通过URL替换传入动态参数）"""
+    params: Dict[str, Any] = dict(request.query)
+    if request.can_read_body:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text='Request body must be JSON')
+        if isinstance(body, dict):
+            params.update(body)
+    return params
+
+def create_app(recorder: LatencyRecorder) -> web.Application:
+    """创建带延迟统计中间件和 /stats、/health 接口的应用"""
+    @web.middleware
+    async def timing_middleware(request: web.Request, handler):
+        start = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            route = request.match_info.route.resource
+            name = route.canonical if route is not None else request.path
+            recorder.record(f'{request.method} {name}', time.perf_counter() - start)
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response({'success': True, 'latency': recorder.report()})
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response({'success': True, 'status': 'ok'})
+
+    app = web.Application(middlewares=[timing_middleware])
+    app.router.add_get('/stats', stats)
+    app.router.add_get('/health', health)
+    return app
+
+def run_app(app: web.Application, host: str, port: int):
+    """启动常驻服务（阻塞直到进程退出）"""
+    web.run_app(app, host=host, port=port, print=lambda msg: print(msg, flush=True))
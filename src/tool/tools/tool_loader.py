@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+工具模块加载器
+工具脚本文件名带连字符（如 btc-price-tool.py），无法直接 import，这里按文件路径加载
+"""
+
+import importlib.util
+import os
+import sys
+from types import ModuleType
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TOOLS_DIR not in sys.path:
+    sys.path.insert(0, TOOLS_DIR)  # 工具脚本会导入同目录下的辅助模块
+
+def load_tool(filename: str) -> ModuleType:
+    """按文件名加载工具脚本，重复加载时返回同一模块"""
+    module_name = filename[:-3].replace('-', '_')
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(TOOLS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
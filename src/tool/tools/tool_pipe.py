@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+NDJSON管道模式
+从标准输入逐行读取JSON命令，每条命令向标准输出写一行紧凑JSON结果。进程在整个会话中保持运行，
+余额、连接池等状态在命令之间保留；调用方可以保持一个进程打开，连续发送大量命令。
+命令中的 id 字段会原样带回，便于调用方把结果与请求对应。
+"""
+
+import json
+import sys
+from typing import Dict, Any, Callable, Optional, TextIO
+
+def run_pipe(handle: Callable[[Dict[str, Any]], Dict[str, Any]],
+             stdin: Optional[TextIO] = None, stdout: Optional[TextIO] = None) -> int:
+    """处理标准输入中的全部命令，返回处理的命令数；单条命令出错只影响该条结果"""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    count = 0
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            command = json.loads(line)
+        except ValueError:
+            command, result = None, {'success': False, 'error': 'Invalid JSON'}
+        if isinstance(command, dict):
+            try:
+                result = handle(command)
+            except Exception as e:
+                result = {'success': False, 'error': f'{type(e).__name__}: {e}'}
+            if 'id' in command:
+                result = {'id': command['id'], **result}
+        elif command is not None:
+            result = {'success': False, 'error': 'Command must be a JSON object'}
+        # 每行立即刷新，调用方可以一问一答地使用
+        stdout.write(json.dumps(result, separators=(',', ':')) + '\n')
+        stdout.flush()
+        count += 1
+    return count
@@ -1 +1,70 @@
- 
\ No newline at end of file
+#!/usr/bin/env python3
+"""
+测试并行工作流功能
+创建 parallel_start / parallel_end 工作流（wait_all 和 wait_any 各一个），执行并等待结束。
+加 --stub 时使用本地API替身；并发压测见 workflow_load.py
+"""
+
+import argparse
+import asyncio
+import json
+
+from workflow_load import BASE_URL, WorkflowClient, parallel_workflow, run_execution
+from workflow_stub_server import WorkflowStubServer
+
+async def test_parallel(client: WorkflowClient, strategy: str, branches: int):
+    """测试一种并行策略"""
+    print(f"\n🔀 测试并行工作流 ({strategy}, {branches} 个分支)...")
+    definition = parallel_workflow(branches)
+    definition["name"] = f"测试并行-{strategy}"
+    for node in definition["nodes"]:
+        if node["type"] == "parallel_start":
+            node["data"]["parallelStrategy"] = strategy
+
+    workflow_id = await client.prepare(definition)
+    print(f"✅ 创建、验证并发布工作流: {workflow_id}")
+    result = await run_execution(client, workflow_id, {}, poll_interval=0.5, timeout=60)
+    if result['status'] == 'completed':
+        print(f"✅ 工作流执行完成，耗时 {result['seconds']:.2f} 秒")
+    else:
+        print(f"❌ 工作流执行结束状态: {result['status']}")
+    return result
+
+async def run(args):
+    server = None
+    base_url = args.base_url
+    if args.stub:
+        server = WorkflowStubServer()
+        await server.start()
+        base_url = server.base_url
+    client = WorkflowClient(base_url, args.auth_token)
+    try:
+        results = {strategy: await test_parallel(client, strategy, args.branches)
+                   for strategy in ('wait_all', 'wait_any')}
+    finally:
+        await client.close()
+        if server is not None:
+            await server.stop()
+    return results
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Parallel workflow test')
+    parser.add_argument('--base-url', default=BASE_URL, help='API base URL (including the /api prefix)')
+    parser.add_argument('--auth-token', help='JWT used as the Bearer token')
+    parser.add_argument('--stub', action='store_true', help='Run against an in-process stand-in API server')
+    parser.add_argument('--branches', type=int, default=3, help='Number of parallel branches')
+    args = parser.parse_args()
+
+    print("🚀 开始测试并行工作流功能...")
+    try:
+        results = asyncio.run(run(args))
+        print(json.dumps(results, indent=2))
+        print("\n✅ 并行工作流测试完成!")
+    except KeyboardInterrupt:
+        print("\n⏹️ 测试被用户中断")
+    except Exception as e:
+        print(f"\n❌ 测试过程中发生错误: {str(e)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+工作流执行负载生成工具
+与 test_loop_workflow.py 使用相同的接口（/workflows、/publish、/execute、/executions/{id}）：
+先创建、验证并发布循环 / 并行 / 条件三种工作流，再通过共享连接池并发发起大量执行，
+轮询每个执行直到结束，统计吞吐量和完成耗时的 p50/p95/p99。
+
+--stub 时在本进程内启动 workflow_stub_server.py 的API替身，无需后端即可运行。
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+
+# API基础URL（后端全局前缀为 /api）
+BASE_URL = "http://localhost:1666/api"
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+def _node(node_id: str, node_type: str, label: str, x: int, y: int = 100, **data) -> Dict[str, Any]:
+    return {"id": node_id, "type": node_type, "label": label, "position": {"x": x, "y": y}, "data": data}
+
+def _edge(source: str, target: str, condition: Optional[str] = None) -> Dict[str, Any]:
+    edge = {"id": f"{source}-to-{target}", "source": source, "target": target}
+    if condition:
+        edge["condition"] = condition
+    return edge
+
+def loop_workflow(iterations: int = 5) -> Dict[str, Any]:
+    """计数循环：与 test_loop_workflow.py 的简单循环相同"""
+    return {
+        "name": "负载测试-计数循环",
+        "description": f"循环 {iterations} 次",
+        "nodes": [
+            _node("start", "start", "开始", 100),
+            _node("init-counter", "script", "初始化计数器", 300, script="return { counter: 0 };"),
+            _node("loop-start", "loop_start", "循环开始", 500,
+                  loopId="counter-loop", maxIterations=iterations, exitCondition=f"counter >= {iterations}"),
+            _node("increment", "script", "递增计数器", 700,
+                  script="return { counter: (context.counter || 0) + 1 };"),
+            _node("loop-end", "loop_end", "循环结束", 900, loopId="counter-loop"),
+            _node("end", "end", "结束", 1100)
+        ],
+        "edges": [
+            _edge("start", "init-counter"),
+            _edge("init-counter", "loop-start"),
+            _edge("loop-start", "increment"),
+            _edge("increment", "loop-end"),
+            _edge("loop-end", "end", "loopExited === true")
+        ],
+        "variables": {}
+    }
+
+def parallel_workflow(branches: int = 3) -> Dict[str, Any]:
+    """并行分支：parallel_start（wait_all）-> 多个分支 -> parallel_end 汇总"""
+    nodes = [
+        _node("start", "start", "开始", 100),
+        _node("parallel-start", "parallel_start", "并发处理", 300,
+              parallelId="load-parallel", parallelStrategy="wait_all", parallelTimeout=30000)
+    ]
+    edges = [_edge("start", "parallel-start")]
+    for i in range(branches):
+        branch, work = f"branch-{i}", f"work-{i}"
+        nodes.append(_node(branch, "parallel_branch", f"分支{i}", 500, 100 * i,
+                           parallelId="load-parallel", branchName=f"branch{i}"))
+        nodes.append(_node(work, "script", f"处理{i}", 700, 100 * i, script=f"return {{ branch: {i} }};"))
+        edges += [_edge("parallel-start", branch), _edge(branch, work), _edge(work, "parallel-end")]
+    nodes += [
+        _node("parallel-end", "parallel_end", "汇总结果", 900,
+              parallelId="load-parallel", aggregationScript="return { branches: Object.keys(branches).length };"),
+        _node("end", "end", "结束", 1100)
+    ]
+    edges.append(_edge("parallel-end", "end"))
+    return {"name": "负载测试-并行分支", "description": f"{branches} 个分支，wait_all",
+            "nodes": nodes, "edges": edges, "variables": {}}
+
+def condition_workflow() -> Dict[str, Any]:
+    """条件分支：按输入的 value 走高 / 低两条路径"""
+    return {
+        "name": "负载测试-条件分支",
+        "description": "value > 50 走高分支，否则走低分支",
+        "nodes": [
+            _node("start", "start", "开始", 100),
+            _node("check", "condition", "判断数值", 300, condition="value > 50", conditionType="simple"),
+            _node("high", "script", "高分支", 500, 50, script="return { branch: 'high' };"),
+            _node("low", "script", "低分支", 500, 150, script="return { branch: 'low' };"),
+            _node("end", "end", "结束", 700)
+        ],
+        "edges": [
+            _edge("start", "check"),
+            _edge("check", "high", "result === true"),
+            _edge("check", "low", "result === false"),
+            _edge("high", "end"),
+            _edge("low", "end")
+        ],
+        "variables": {}
+    }
+
+def input_workflow(rounds: int = 3) -> Dict[str, Any]:
+    """人工输入循环：每轮在 user_input 节点等待 /continue 提交输入（不在 WORKFLOWS 中，负载生成不会提交输入）"""
+    return {
+        "name": "负载测试-人工输入",
+        "description": f"等待 {rounds} 次用户输入",
+        "nodes": [
+            _node("start", "start", "开始", 100),
+            _node("loop-start", "loop_start", "循环开始", 300,
+                  loopId="input-loop", maxIterations=rounds, exitCondition="userInput === 'stop'"),
+            _node("ask", "user_input", "等待输入", 500, prompt="请输入内容"),
+            _node("loop-end", "loop_end", "循环结束", 700, loopId="input-loop"),
+            _node("end", "end", "结束", 900)
+        ],
+        "edges": [
+            _edge("start", "loop-start"),
+            _edge("loop-start", "ask"),
+            _edge("ask", "loop-end"),
+            _edge("loop-end", "end", "loopExited === true")
+        ],
+        "variables": {}
+    }
+
+WORKFLOWS = {
+    'loop': lambda args: loop_workflow(args.loop_iterations),
+    'parallel': lambda args: parallel_workflow(args.branches),
+    'condition': lambda args: condition_workflow()
+}
+
+def _percentiles(samples: List[float]) -> Dict[str, Any]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+    return {
+        'p50_ms': round(pick(50) * 1000, 1),
+        'p95_ms': round(pick(95) * 1000, 1),
+        'p99_ms': round(pick(99) * 1000, 1),
+        'max_ms': round(ordered[-1] * 1000, 1),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 1)
+    }
+
+class WorkflowClient:
+    """共享一个连接池的异步API客户端；兼容后端 {code, message, data} 包装和未包装的响应"""
+
+    def __init__(self, base_url: str, auth_token: Optional[str] = None, connections: int = 100):
+        self.base_url = base_url.rstrip('/')
+        headers = {"Content-Type": "application/json"}
+        if auth_token:
+            headers["Authorization"] = f"Bearer {auth_token}"
+        self.session = aiohttp.ClientSession(headers=headers, connector=aiohttp.TCPConnector(limit=connections))
+
+    async def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        async with self.session.request(method, self.base_url + path, json=body) as response:
+            payload = await response.json(content_type=None)
+            if response.status >= 400:
+                message = payload.get('message') if isinstance(payload, dict) else payload
+                raise RuntimeError(f'{method} {path}: {response.status} {message}')
+        if isinstance(payload, dict) and 'code' in payload and 'data' in payload:
+            return payload['data']
+        return payload
+
+    async def prepare(self, definition: Dict[str, Any]) -> str:
+        """创建、验证并发布工作流，返回工作流ID"""
+        workflow = await self.request('POST', '/workflows', definition)
+        validation = await self.request('GET', f"/workflows/{workflow['id']}/validate")
+        if not validation.get('valid'):
+            raise RuntimeError(f"Workflow {definition['name']} is invalid: {validation.get('errors')}")
+        await self.request('POST', f"/workflows/{workflow['id']}/publish")
+        return workflow['id']
+
+    async def close(self):
+        await self.session.close()
+
+async def run_execution(client: WorkflowClient, workflow_id: str, input_data: Dict[str, Any],
+                        poll_interval: float, timeout: float) -> Dict[str, Any]:
+    """发起一次执行并轮询到结束，返回状态、完成耗时和轮询次数"""
+    start = time.perf_counter()
+    execution = await client.request('POST', f'/workflows/{workflow_id}/execute',
+                                     {"input": input_data, "triggerType": "manual"})
+    submitted = time.perf_counter() - start
+    polls = 0
+    status = execution.get('status')
+    while status not in TERMINAL_STATUSES:
+        if time.perf_counter() - start > timeout:
+            status = 'timeout'
+            break
+        await asyncio.sleep(poll_interval)
+        execution = await client.request('GET', f"/workflows/executions/{execution['id']}")
+        polls += 1
+        status = execution.get('status')
+    return {'status': status, 'seconds': time.perf_counter() - start, 'submit_seconds': submitted, 'polls': polls}
+
+async def generate_load(client: WorkflowClient, workflow_ids: Dict[str, str], executions: int,
+                        concurrency: int, poll_interval: float, timeout: float) -> Dict[str, Any]:
+    """concurrency 个协程从队列中取任务，保持同时进行的执行数不超过 concurrency"""
+    kinds = list(workflow_ids)
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(executions):
+        queue.put_nowait(kinds[i % len(kinds)])
+    results: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in kinds}
+    errors: List[str] = []
+
+    async def worker():
+        while not queue.empty():
+            kind = queue.get_nowait()
+            try:
+                results[kind].append(await run_execution(
+                    client, workflow_ids[kind], {"value": random.randint(0, 100)}, poll_interval, timeout))
+            except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+                errors.append(f'{kind}: {e}')
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    def summary(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        completed = [run for run in runs if run['status'] == 'completed']
+        return {
+            'executions': len(runs),
+            'completed': len(completed),
+            'failed': sum(1 for run in runs if run['status'] in ('failed', 'cancelled')),
+            'timeouts': sum(1 for run in runs if run['status'] == 'timeout'),
+            'completed_per_s': round(len(completed) / elapsed, 1),
+            'time_to_completion': _percentiles([run['seconds'] for run in completed]),
+            'submit_latency': _percentiles([run['submit_seconds'] for run in runs]),
+            'mean_polls': round(sum(run['polls'] for run in runs) / len(runs), 2) if runs else 0
+        }
+
+    every = [run for runs in results.values() for run in runs]
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'overall': summary(every),
+        'by_workflow': {kind: summary(runs) for kind, runs in results.items()},
+        'request_errors': len(errors),
+        'first_errors': errors[:5]
+    }
+
+async def run(args) -> Dict[str, Any]:
+    server = None
+    base_url = args.base_url
+    if args.stub:
+        from workflow_stub_server import WorkflowStubServer
+        server = WorkflowStubServer(args.node_latency, args.jitter)
+        await server.start()
+        base_url = server.base_url
+    client = WorkflowClient(base_url, args.auth_token, args.connections)
+    try:
+        kinds = [kind for kind in args.workflows.split(',') if kind]
+        workflow_ids = {kind: await client.prepare(WORKFLOWS[kind](args)) for kind in kinds}
+        report = await generate_load(client, workflow_ids, args.executions, args.concurrency,
+                                     args.poll_interval, args.timeout)
+    finally:
+        await client.close()
+        if server is not None:
+            await server.stop()
+    report['config'] = {
+        'base_url': base_url,
+        'stub': args.stub,
+        'workflows': kinds,
+        'executions': args.executions,
+        'concurrency': args.concurrency,
+        'connections': args.connections,
+        'poll_interval_s': args.poll_interval
+    }
+    if server is not None:
+        report['server_requests'] = server.request_counts
+    return report
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Concurrent workflow execution load generator')
+    parser.add_argument('--base-url', default=BASE_URL, help='API base URL (including the /api prefix)')
+    parser.add_argument('--auth-token', help='JWT used as the Bearer token')
+    parser.add_argument('--stub', action='store_true', help='Run against an in-process stand-in API server')
+    parser.add_argument('--workflows', default=','.join(WORKFLOWS),
+                        help=f'Comma-separated workflow kinds to drive ({", ".join(WORKFLOWS)})')
+    parser.add_argument('--executions', type=int, default=600, help='Total executions')
+    parser.add_argument('--concurrency', type=int, default=200, help='Executions in flight at once')
+    parser.add_argument('--connections', type=int, default=100, help='HTTP connection pool size')
+    parser.add_argument('--poll-interval', type=float, default=0.05, help='Seconds between status polls')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Give up on an execution after this many seconds')
+    parser.add_argument('--loop-iterations', type=int, default=5, help='Iterations of the loop workflow')
+    parser.add_argument('--branches', type=int, default=3, help='Branches of the parallel workflow')
+    parser.add_argument('--node-latency', type=float, default=0.005, help='Stand-in server: seconds per node')
+    parser.add_argument('--jitter', type=float, default=0.5, help='Stand-in server: node latency variation (fraction)')
+    args = parser.parse_args()
+
+    unknown = [kind for kind in args.workflows.split(',') if kind and kind not in WORKFLOWS]
+    if unknown:
+        parser.error(f'Unknown workflow kinds: {", ".join(unknown)}')
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if report['overall']['completed'] < args.executions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
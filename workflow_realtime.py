@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+工作流执行实时监控客户端
+连接后端 workflow-realtime.service.ts 的Socket.IO网关（路径 /workflow-socket.io，命名空间 /workflow-monitor），
+在一个连接上订阅多个执行（subscribe-execution），收到 workflow-completed / workflow-failed 即结束，
+收到 node-waiting（等待 user_input）时立即调用 /continue 提交输入。
+
+轮询只作为兜底：订阅确认后查询一次状态（补上订阅前已发生的事件），连接正常时每 fallback_interval 秒
+查一次，连接断开时按 poll_interval 轮询；不传连接时即为纯轮询（与 test_loop_workflow.py 的 monitor_execution 相同）。
+
+网关只开放 websocket 传输，这里直接实现所需的 Engine.IO v4 / Socket.IO v5 报文（握手、心跳、命名空间连接、事件），
+不依赖 socket.io 客户端库。
+"""
+
+import asyncio
+import json
+import time
+from typing import Dict, Any, Callable, Optional, Tuple
+from urllib.parse import urlencode
+
+import aiohttp
+
+from workflow_load import TERMINAL_STATUSES, WorkflowClient
+
+SOCKET_PATH = '/workflow-socket.io'
+NAMESPACE = '/workflow-monitor'
+
+# Socket.IO 报文类型
+CONNECT, DISCONNECT, EVENT, ACK, CONNECT_ERROR = 0, 1, 2, 3, 4
+
+def encode_packet(packet_type: int, namespace: str = '/', data: Any = None) -> str:
+    """编码Socket.IO报文（外层为Engine.IO的 message 类型 '4'）"""
+    text = '4' + str(packet_type)
+    if namespace != '/':
+        text += namespace + ','
+    if data is not None:
+        text += json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+    return text
+
+def decode_packet(text: str) -> Optional[Tuple[int, str, Any]]:
+    """解析Engine.IO message 中的Socket.IO报文，返回 (类型, 命名空间, 数据)；不是 message 时返回 None"""
+    if not text.startswith('4') or len(text) < 2:
+        return None
+    packet_type = int(text[1])
+    rest = text[2:]
+    namespace = '/'
+    if rest.startswith('/'):
+        namespace, _, rest = rest.partition(',')
+    while rest[:1].isdigit():  # 跳过ack ID
+        rest = rest[1:]
+    return packet_type, namespace, json.loads(rest) if rest else None
+
+class RealtimeConnection:
+    """一个Socket.IO连接，事件交给 handler(event, data) 处理"""
+
+    def __init__(self, server_url: str, token: Optional[str] = None, namespace: str = NAMESPACE,
+                 path: str = SOCKET_PATH, session: Optional[aiohttp.ClientSession] = None):
+        query = {'EIO': '4', 'transport': 'websocket'}
+        if token:
+            query['token'] = token
+        self.url = server_url.rstrip('/').replace('http', 'ws', 1) + path + '/?' + urlencode(query)
+        self.token = token
+        self.namespace = namespace
+        self.handler: Callable[[str, Any], None] = lambda event, data: None
+        self.on_disconnect: Callable[[], None] = lambda: None
+        self.connected = False
+        self.messages_received = 0
+        self.messages_sent = 0
+        self._session = session
+        self._own_session = session is None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def connect(self, timeout: float = 10.0):
+        """完成Engine.IO握手并连接命名空间（auth 中带token）"""
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        headers = {'Authorization': f'Bearer {self.token}'} if self.token else None
+        self._ws = await self._session.ws_connect(self.url, headers=headers, timeout=timeout)
+        opened = await self._ws.receive_str(timeout=timeout)
+        if not opened.startswith('0'):
+            raise ConnectionError(f'Unexpected Engine.IO handshake: {opened[:80]}')
+        await self._send(encode_packet(CONNECT, self.namespace, {'token': self.token} if self.token else None))
+        while True:
+            text = await self._ws.receive_str(timeout=timeout)
+            if text == '2':
+                await self._send('3')
+                continue
+            packet = decode_packet(text)
+            if packet and packet[1] == self.namespace:
+                if packet[0] == CONNECT:
+                    break
+                if packet[0] == CONNECT_ERROR:
+                    raise ConnectionError(f'Namespace connection refused: {packet[2]}')
+        self.connected = True
+        self._reader = asyncio.ensure_future(self._read())
+
+    async def _send(self, text: str):
+        await self._ws.send_str(text)
+        self.messages_sent += 1
+
+    async def _read(self):
+        try:
+            async for message in self._ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    if message.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSE):
+                        break
+                    continue
+                self.messages_received += 1
+                if message.data == '2':  # 服务端心跳
+                    await self._send('3')
+                    continue
+                packet = decode_packet(message.data)
+                if packet is None or packet[1] != self.namespace:
+                    continue
+                if packet[0] == EVENT and isinstance(packet[2], list) and packet[2]:
+                    self.handler(packet[2][0], packet[2][1] if len(packet[2]) > 1 else None)
+                elif packet[0] == DISCONNECT:
+                    break
+        finally:
+            self.connected = False
+            self.on_disconnect()
+
+    async def emit(self, event: str, data: Any = None):
+        await self._send(encode_packet(EVENT, self.namespace, [event] if data is None else [event, data]))
+
+    async def close(self):
+        if self._ws is not None and not self._ws.closed:
+            try:
+                await self._send(encode_packet(DISCONNECT, self.namespace))
+            except ConnectionError:
+                pass
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+        if self._own_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+class _Watch:
+    __slots__ = ('execution_id', 'future', 'started', 'inputs', 'rejected_inputs', 'polls', 'events',
+                 'last_input', 'submitting', 'subscribed')
+
+    def __init__(self, execution_id: str):
+        self.execution_id = execution_id
+        self.future: asyncio.Future = asyncio.get_event_loop().create_future()
+        self.started = time.perf_counter()
+        self.inputs = 0
+        self.rejected_inputs = 0
+        self.polls = 0
+        self.events = 0
+        self.last_input = 0.0
+        self.submitting = False
+        self.subscribed = False
+
+class ExecutionMonitor:
+    """在一个实时连接上监控多个执行；on_input(execution_id, event) 返回要提交的输入（None 表示不自动提交）"""
+
+    def __init__(self, client: WorkflowClient, connection: Optional[RealtimeConnection] = None,
+                 on_input: Optional[Callable[[str, Dict[str, Any]], Optional[Dict[str, Any]]]] = None,
+                 poll_interval: float = 2.0, fallback_interval: float = 10.0):
+        self.client = client
+        self.connection = connection
+        self.on_input = on_input
+        self.poll_interval = poll_interval          # 无实时连接时的轮询间隔
+        self.fallback_interval = fallback_interval  # 实时连接正常时的兜底轮询间隔
+        self._watches: Dict[str, _Watch] = {}
+        self._tasks: set = set()
+        self._poller: Optional[asyncio.Task] = None
+        if connection is not None:
+            connection.handler = self._on_event
+
+    @property
+    def realtime(self) -> bool:
+        return self.connection is not None and self.connection.connected
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def watch(self, execution_id: str) -> Dict[str, Any]:
+        """等待执行结束，返回状态、耗时、提交输入次数、轮询次数和收到的事件数"""
+        watch = self._watches[execution_id] = _Watch(execution_id)
+        if self._poller is None:
+            self._poller = asyncio.ensure_future(self._poll_loop())
+        if self.realtime:
+            await self.connection.emit('subscribe-execution', {'executionId': execution_id})
+        try:
+            status = await watch.future
+        finally:
+            self._watches.pop(execution_id, None)
+        if self.realtime and watch.subscribed:
+            await self.connection.emit('unsubscribe-execution', {'executionId': execution_id})
+        return {
+            'status': status,
+            'seconds': time.perf_counter() - watch.started,
+            'inputs': watch.inputs,
+            'rejected_inputs': watch.rejected_inputs,
+            'polls': watch.polls,
+            'events': watch.events
+        }
+
+    def _finish(self, watch: _Watch, status: str):
+        if not watch.future.done():
+            watch.future.set_result(status)
+
+    def _on_event(self, event: str, data: Any):
+        if not isinstance(data, dict):
+            return
+        watch = self._watches.get(data.get('executionId'))
+        if watch is None:
+            return
+        watch.events += 1
+        if event == 'subscription-confirmed':
+            # 订阅之前发生的事件收不到，查询一次当前状态
+            watch.subscribed = True
+            self._spawn(self._check(watch))
+        elif event == 'workflow-completed':
+            self._finish(watch, 'completed')
+        elif event == 'workflow-failed':
+            self._finish(watch, 'failed')
+        elif event == 'node-waiting' and (data.get('metadata') or {}).get('waitingFor') == 'user_input':
+            self._spawn(self._submit_input(watch, data))
+        elif event == 'error':
+            # 无权订阅等错误：该执行改为轮询
+            watch.subscribed = False
+
+    async def _submit_input(self, watch: _Watch, event: Dict[str, Any]):
+        if self.on_input is None or watch.submitting or watch.future.done():
+            return
+        user_input = self.on_input(watch.execution_id, event)
+        if user_input is None:
+            return
+        watch.submitting = True
+        try:
+            await self.client.request('POST', f'/workflows/executions/{watch.execution_id}/continue',
+                                      {'input': user_input})
+            watch.inputs += 1
+        except RuntimeError:
+            watch.rejected_inputs += 1  # 状态已变化（例如轮询和事件重复处理了同一次等待）
+        finally:
+            watch.last_input = time.perf_counter()
+            watch.submitting = False
+
+    async def _check(self, watch: _Watch, stale_after: float = 0.0):
+        """查询一次状态；等待输入且超过 stale_after 秒没有提交过输入时补交"""
+        try:
+            execution = await self.client.request('GET', f'/workflows/executions/{watch.execution_id}')
+        except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError):
+            return
+        watch.polls += 1
+        status = execution.get('status')
+        if status in TERMINAL_STATUSES:
+            self._finish(watch, status)
+        elif status == 'waiting_input' and time.perf_counter() - watch.last_input >= stale_after:
+            await self._submit_input(watch, {'executionId': watch.execution_id, 'nodeId': execution.get('currentNodeId')})
+
+    async def _poll_loop(self):
+        """兜底轮询：有实时订阅的执行按 fallback_interval，其余按 poll_interval"""
+        last_poll: Dict[str, float] = {}
+        while True:
+            await asyncio.sleep(min(self.poll_interval, self.fallback_interval) / 4)
+            now = time.perf_counter()
+            for execution_id, watch in list(self._watches.items()):
+                interval = self.fallback_interval if self.realtime and watch.subscribed else self.poll_interval
+                if now - last_poll.get(execution_id, watch.started) >= interval:
+                    last_poll[execution_id] = now
+                    self._spawn(self._check(watch, stale_after=interval if self.realtime and watch.subscribed else 0.0))
+            for execution_id in list(last_poll):
+                if execution_id not in self._watches:
+                    del last_poll[execution_id]
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
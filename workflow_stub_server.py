@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+本地工作流API替身
+提供与后端相同的工作流接口（/api/workflows、/publish、/validate、/execute、/executions/{id}、/continue），
+响应同样包在 {code, message, data} 中，用于离线测试负载生成工具和实时监控客户端。
+/workflow-socket.io 上的 /workflow-monitor 命名空间模拟 workflow-realtime.service.ts：
+subscribe-execution 订阅后推送 workflow-* 和 node-* 事件（只支持websocket传输）。
+
+执行器只模拟控制流，不运行节点里的脚本：
+- 每个普通节点耗时 node_latency 秒；
+- loop_start ... loop_end 之间的节点重复 maxIterations 次；
+- parallel_start 的各分支并发执行，wait_all 等待全部分支到达 parallel_end，wait_any / wait_first 等待第一个；
+- user_input 节点把执行置为 waiting_input，直到 /continue 提交输入（记录从进入等待到收到输入的反应时间）；
+- condition 节点和边上的条件只支持“变量 比较符 字面量”形式（如 value > 50、result === true）。
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from aiohttp import web
+
+from workflow_realtime import CONNECT, EVENT, NAMESPACE, SOCKET_PATH, decode_packet, encode_packet
+
+_COMPARISON = re.compile(r'^\s*([\w.]+)\s*(===|!==|==|!=|>=|<=|>|<)\s*(.+?)\s*$')
+
+def _literal(text: str, context: Dict[str, Any]) -> Any:
+    if text in ('true', 'false'):
+        return text == 'true'
+    if text in ('null', 'undefined'):
+        return None
+    if text[:1] in ('"', "'") and text[-1:] == text[:1]:
+        return text[1:-1]
+    try:
+        return float(text)
+    except ValueError:
+        return _lookup(text, context)
+
+def _lookup(path: str, context: Dict[str, Any]) -> Any:
+    value: Any = context
+    for part in path.split('.'):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+def evaluate(expression: Optional[str], context: Dict[str, Any]) -> bool:
+    """求值简单条件；不支持的表达式视为 False"""
+    match = _COMPARISON.match(expression or '')
+    if not match:
+        return False
+    left, operator, right = _lookup(match.group(1), context), match.group(2), _literal(match.group(3), context)
+    try:
+        if operator in ('===', '=='):
+            return left == right
+        if operator in ('!==', '!='):
+            return left != right
+        return {'>': left > right, '<': left < right, '>=': left >= right, '<=': left <= right}[operator]
+    except TypeError:
+        return False
+
+class WorkflowStubServer:
+    """工作流API替身，执行在服务自身的事件循环中以协程模拟"""
+
+    def __init__(self, node_latency: float = 0.005, jitter: float = 0.0, ping_interval: float = 25.0):
+        self.node_latency = node_latency  # 每个普通节点的模拟耗时（秒）
+        self.jitter = jitter              # 节点耗时的随机浮动比例
+        self.ping_interval = ping_interval
+        self.workflows: Dict[str, Dict[str, Any]] = {}
+        self.executions: Dict[str, Dict[str, Any]] = {}
+        self.request_counts: Dict[str, int] = {}
+        self.input_reactions: List[float] = []  # 进入 waiting_input 到收到 /continue 的秒数
+        self.socket_messages = 0                # 推送给客户端的事件数
+        self._waiting: Dict[str, asyncio.Future] = {}
+        self._subscribers: Dict[str, Set[web.WebSocketResponse]] = {}
+        self._tasks: set = set()
+        self._runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+    @property
+    def server_url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    @property
+    def base_url(self) -> str:
+        return self.server_url + '/api'
+
+    # ---- 执行器 ----
+
+    @staticmethod
+    def _outgoing(workflow: Dict[str, Any], node_id: str) -> List[Dict[str, Any]]:
+        return workflow['_edges'].get(node_id, [])
+
+    def _next(self, workflow: Dict[str, Any], node_id: str, context: Dict[str, Any]) -> Optional[str]:
+        """选择下一个节点：条件成立的边优先，其次是没有条件的边"""
+        edges = self._outgoing(workflow, node_id)
+        for edge in edges:
+            if edge.get('condition') and evaluate(edge['condition'], context):
+                return edge['target']
+        for edge in edges:
+            if not edge.get('condition'):
+                return edge['target']
+        return None
+
+    def _node_event(self, execution: Dict[str, Any], node: Dict[str, Any], status: str, **extra) -> Dict[str, Any]:
+        return {'executionId': execution['id'], 'nodeId': node['id'], 'nodeType': node['type'],
+                'nodeLabel': node.get('label') or node['type'], 'status': status,
+                'timestamp': datetime.now().isoformat(), **extra}
+
+    async def _wait_input(self, execution: Dict[str, Any], node: Dict[str, Any], context: Dict[str, Any]):
+        future = self._waiting[execution['id']] = asyncio.get_event_loop().create_future()
+        execution['status'] = 'waiting_input'
+        execution['waitingSince'] = time.monotonic()
+        await self._broadcast(execution['id'], 'node-waiting',
+                              self._node_event(execution, node, 'waiting', metadata={'waitingFor': 'user_input'}))
+        context.update(await future)
+        execution['status'] = 'running'
+
+    async def _run_node(self, execution: Dict[str, Any], node: Dict[str, Any], context: Dict[str, Any]):
+        execution['currentNodeId'] = node['id']
+        execution['steps'] += 1
+        await self._broadcast(execution['id'], 'node-started', self._node_event(execution, node, 'started'))
+        if node['type'] == 'condition':
+            context['result'] = evaluate(node.get('data', {}).get('condition'), context)
+        if node['type'] == 'user_input':
+            await self._wait_input(execution, node, context)
+        elif node['type'] not in ('start', 'end', 'parallel_branch'):
+            delay = self.node_latency * (1 + random.uniform(-self.jitter, self.jitter))
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await self._broadcast(execution['id'], 'node-completed', self._node_event(execution, node, 'completed'))
+
+    async def _run_path(self, execution: Dict[str, Any], workflow: Dict[str, Any], node_id: Optional[str],
+                        context: Dict[str, Any], stop: Optional[Tuple[str, str]] = None) -> Optional[str]:
+        """从 node_id 执行到 end；stop=(节点类型, 分组ID) 时执行到对应的 loop_end / parallel_end 并返回其ID"""
+        nodes = workflow['_nodes']
+        while node_id:
+            node = nodes[node_id]
+            data = node.get('data', {})
+            if stop and node['type'] == stop[0] and stop[1] in (data.get('loopId'), data.get('parallelId')):
+                return node_id
+            if node['type'] == 'end':
+                await self._run_node(execution, node, context)
+                return None
+            if node['type'] == 'loop_start':
+                await self._run_node(execution, node, context)
+                end_id = None
+                for iteration in range(int(data.get('maxIterations', 1))):
+                    context['currentIteration'] = iteration + 1
+                    end_id = await self._run_path(execution, workflow, self._next(workflow, node_id, context),
+                                                  context, ('loop_end', data.get('loopId')))
+                    if end_id is None:
+                        return None
+                    await self._run_node(execution, nodes[end_id], context)
+                context['loopExited'] = True
+                node_id = self._next(workflow, end_id, context)
+                continue
+            if node['type'] == 'parallel_start':
+                await self._run_node(execution, node, context)
+                branches = [asyncio.ensure_future(self._run_path(execution, workflow, edge['target'], dict(context),
+                                                                  ('parallel_end', data.get('parallelId'))))
+                            for edge in self._outgoing(workflow, node_id)]
+                if data.get('parallelStrategy', 'wait_all') == 'wait_all':
+                    ends = await asyncio.gather(*branches)
+                else:
+                    done, pending = await asyncio.wait(branches, return_when=asyncio.FIRST_COMPLETED)
+                    for task in pending:
+                        task.cancel()
+                    ends = [task.result() for task in done]
+                end_id = next((end for end in ends if end), None)
+                if end_id is None:
+                    return None
+                await self._run_node(execution, nodes[end_id], context)
+                node_id = self._next(workflow, end_id, context)
+                continue
+            await self._run_node(execution, node, context)
+            node_id = self._next(workflow, node_id, context)
+        return None
+
+    async def _execute(self, execution: Dict[str, Any], workflow: Dict[str, Any]):
+        start = next(node['id'] for node in workflow['nodes'] if node['type'] == 'start')
+        event = {'executionId': execution['id'], 'workflowId': workflow['id'], 'workflowName': workflow['name']}
+        await self._broadcast(execution['id'], 'workflow-started',
+                              {**event, 'status': 'started', 'timestamp': datetime.now().isoformat()})
+        try:
+            await self._run_path(execution, workflow, start, execution['context'])
+            execution['status'] = 'completed'
+            execution['output'] = {key: value for key, value in execution['context'].items() if key != 'result'}
+        except Exception as e:
+            execution['status'] = 'failed'
+            execution['error'] = str(e)
+        execution['completedAt'] = datetime.now().isoformat()
+        if execution['status'] == 'completed':
+            await self._broadcast(execution['id'], 'workflow-completed',
+                                  {**event, 'status': 'completed', 'timestamp': execution['completedAt']})
+        else:
+            await self._broadcast(execution['id'], 'workflow-failed',
+                                  {**event, 'status': 'failed', 'timestamp': execution['completedAt'],
+                                   'error': execution['error']})
+        self._subscribers.pop(execution['id'], None)
+        self._waiting.pop(execution['id'], None)
+
+    # ---- 实时推送（Socket.IO） ----
+
+    async def _broadcast(self, execution_id: str, event: str, data: Dict[str, Any]):
+        subscribers = self._subscribers.get(execution_id)
+        if not subscribers:
+            return
+        text = encode_packet(EVENT, NAMESPACE, [event, data])
+        for ws in list(subscribers):
+            if ws.closed:
+                subscribers.discard(ws)
+                continue
+            try:
+                await ws.send_str(text)
+                self.socket_messages += 1
+            except ConnectionError:
+                subscribers.discard(ws)
+
+    async def socket(self, request: web.Request) -> web.WebSocketResponse:
+        """Engine.IO v4 websocket传输：握手、心跳，以及 /workflow-monitor 命名空间的订阅事件"""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        sid = uuid.uuid4().hex
+        await ws.send_str('0' + json.dumps({'sid': sid, 'upgrades': [], 'pingInterval': int(self.ping_interval * 1000),
+                                            'pingTimeout': 20000, 'maxPayload': 1000000}))
+
+        async def ping():
+            while not ws.closed:
+                await asyncio.sleep(self.ping_interval)
+                await ws.send_str('2')
+
+        pinger = asyncio.ensure_future(ping())
+        subscribed: Set[str] = set()
+        try:
+            async for message in ws:
+                if message.type != web.WSMsgType.TEXT:
+                    continue
+                packet = decode_packet(message.data)
+                if packet is None or packet[1] != NAMESPACE:
+                    continue
+                packet_type, _, data = packet
+                if packet_type == CONNECT:
+                    await ws.send_str(encode_packet(CONNECT, NAMESPACE, {'sid': sid}))
+                    await ws.send_str(encode_packet(EVENT, NAMESPACE, ['connected', {
+                        'socketId': sid, 'timestamp': datetime.now().isoformat(),
+                        'message': 'Connected to workflow monitor'}]))
+                elif packet_type == EVENT and isinstance(data, list) and len(data) > 1:
+                    event, payload = data[0], data[1] or {}
+                    execution_id = payload.get('executionId')
+                    if event == 'subscribe-execution':
+                        if execution_id not in self.executions:
+                            await ws.send_str(encode_packet(EVENT, NAMESPACE, ['error', {
+                                'message': 'Workflow execution not found or access denied',
+                                'executionId': execution_id}]))
+                            continue
+                        self._subscribers.setdefault(execution_id, set()).add(ws)
+                        subscribed.add(execution_id)
+                        await ws.send_str(encode_packet(EVENT, NAMESPACE, ['subscription-confirmed', {
+                            'executionId': execution_id, 'timestamp': datetime.now().isoformat(),
+                            'message': f'Subscribed to execution {execution_id}'}]))
+                    elif event == 'unsubscribe-execution':
+                        self._subscribers.get(execution_id, set()).discard(ws)
+                        subscribed.discard(execution_id)
+                        await ws.send_str(encode_packet(EVENT, NAMESPACE, ['unsubscription-confirmed', {
+                            'executionId': execution_id, 'timestamp': datetime.now().isoformat()}]))
+        finally:
+            pinger.cancel()
+            for execution_id in subscribed:
+                self._subscribers.get(execution_id, set()).discard(ws)
+        return ws
+
+    # ---- 接口 ----
+
+    @staticmethod
+    def _ok(data: Any, status: int = 200) -> web.Response:
+        return web.json_response({'code': 0, 'message': 'success', 'data': data}, status=status)
+
+    @staticmethod
+    def _error(message: str, status: int) -> web.Response:
+        return web.json_response({'code': status, 'message': message, 'data': None}, status=status)
+
+    def _count(self, name: str):
+        self.request_counts[name] = self.request_counts.get(name, 0) + 1
+
+    async def create(self, request: web.Request) -> web.Response:
+        self._count('create')
+        body = await request.json()
+        workflow = {
+            'id': str(uuid.uuid4()),
+            'name': body.get('name'),
+            'description': body.get('description'),
+            'nodes': body.get('nodes', []),
+            'edges': body.get('edges', []),
+            'variables': body.get('variables', {}),
+            'status': 'draft'
+        }
+        workflow['_nodes'] = {node['id']: node for node in workflow['nodes']}
+        workflow['_edges'] = {}
+        for edge in workflow['edges']:
+            workflow['_edges'].setdefault(edge['source'], []).append(edge)
+        self.workflows[workflow['id']] = workflow
+        return self._ok(self._public(workflow), 201)
+
+    @staticmethod
+    def _public(workflow: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in workflow.items() if not key.startswith('_')}
+
+    def _workflow(self, request: web.Request) -> Dict[str, Any]:
+        workflow = self.workflows.get(request.match_info['id'])
+        if workflow is None:
+            raise web.HTTPNotFound(text='Workflow not found')
+        return workflow
+
+    async def validate(self, request: web.Request) -> web.Response:
+        self._count('validate')
+        workflow = self._workflow(request)
+        types = [node['type'] for node in workflow['nodes']]
+        errors = []
+        if 'start' not in types:
+            errors.append('Workflow must have a start node')
+        if 'end' not in types:
+            errors.append('Workflow must have an end node')
+        for edge in workflow['edges']:
+            if edge['source'] not in workflow['_nodes'] or edge['target'] not in workflow['_nodes']:
+                errors.append(f'Edge "{edge.get("id")}" references a missing node')
+        return self._ok({'valid': not errors, 'errors': errors})
+
+    async def publish(self, request: web.Request) -> web.Response:
+        self._count('publish')
+        workflow = self._workflow(request)
+        workflow['status'] = 'published'
+        return self._ok(self._public(workflow))
+
+    async def execute(self, request: web.Request) -> web.Response:
+        self._count('execute')
+        workflow = self._workflow(request)
+        if workflow['status'] != 'published':
+            return self._error('Only published workflows can be executed', 400)
+        body = await request.json() if request.can_read_body else {}
+        execution = {
+            'id': str(uuid.uuid4()),
+            'workflowId': workflow['id'],
+            'status': 'running',
+            'input': body.get('input') or {},
+            'triggerType': body.get('triggerType', 'manual'),
+            'context': {**workflow['variables'], **(body.get('input') or {})},
+            'currentNodeId': None,
+            'steps': 0,
+            'output': None,
+            'error': None,
+            'startedAt': datetime.now().isoformat(),
+            'completedAt': None
+        }
+        self.executions[execution['id']] = execution
+        task = asyncio.ensure_future(self._execute(execution, workflow))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return self._ok(execution, 201)
+
+    async def get_execution(self, request: web.Request) -> web.Response:
+        self._count('get_execution')
+        execution = self.executions.get(request.match_info['execution_id'])
+        if execution is None:
+            return self._error('Execution not found', 404)
+        return self._ok(execution)
+
+    async def continue_execution(self, request: web.Request) -> web.Response:
+        self._count('continue')
+        execution_id = request.match_info['execution_id']
+        execution = self.executions.get(execution_id)
+        if execution is None:
+            return self._error('Execution not found', 404)
+        future = self._waiting.get(execution_id)
+        if execution['status'] != 'waiting_input' or future is None or future.done():
+            return self._error('Execution is not waiting for input', 400)
+        body = await request.json()
+        if not isinstance(body.get('input'), dict):
+            return self._error('input must be an object', 400)
+        self.input_reactions.append(time.monotonic() - execution['waitingSince'])
+        future.set_result(body['input'])
+        return self._ok(None)
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(SOCKET_PATH + '/', self.socket)
+        app.router.add_post('/api/workflows', self.create)
+        app.router.add_get('/api/workflows/executions/{execution_id}', self.get_execution)
+        app.router.add_post('/api/workflows/executions/{execution_id}/continue', self.continue_execution)
+        app.router.add_get('/api/workflows/{id}/validate', self.validate)
+        app.router.add_post('/api/workflows/{id}/publish', self.publish)
+        app.router.add_post('/api/workflows/{id}/execute', self.execute)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        """在当前事件循环中启动（port=0 时随机端口）"""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+def main():
+    """主函数 - 命令行接口"""
+    parser = argparse.ArgumentParser(description='Stand-in workflow API server')
+    parser.add_argument('--host', default='127.0.0.1', help='Listen host')
+    parser.add_argument('--port', type=int, default=1666, help='Listen port')
+    parser.add_argument('--node-latency', type=float, default=0.005, help='Simulated seconds per node')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random node latency variation (fraction)')
+    args = parser.parse_args()
+    server = WorkflowStubServer(args.node_latency, args.jitter)
+    web.run_app(server.build_app(), host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    main()